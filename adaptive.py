@@ -0,0 +1,285 @@
+"""
+Adaptive concurrency for Tor fetches: AIMD on a latency gradient.
+
+Each kind of fetch (search, scrape) has its own process-wide AdaptiveLimiter.
+While requests succeed and the short-term latency average stays within
+`tolerance` times the long-term average, the limit grows by about one per
+round trip (only while it is actually the bottleneck). A failed request
+(timeout, connection or SOCKS error, 5xx) or a latency spike cuts the limit by
+`backoff`, at most once per round trip. The limit stays within [min_limit,
+max_limit].
+
+Runs don't change the shared limiter's bounds: each takes a RunLimiter view
+that clamps the learned limit to its own min/max threads, so concurrent runs
+(UI sessions, service jobs) with different bounds don't affect each other.
+
+AdaptiveExecutor puts a limiter in front of any executor. Fetch code running on
+it reports failures it handles itself with note_failure().
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, wait as futures_wait
+from typing import Dict, Optional
+
+from config import ADAPTIVE_MAX_THREADS, ADAPTIVE_MIN_THREADS
+from metrics import registry
+
+
+_local = threading.local()
+
+
+def note_failure() -> None:
+    """Mark the fetch running on this thread as failed (no-op outside an AdaptiveExecutor)."""
+    outcome = getattr(_local, "outcome", None)
+    if outcome is not None:
+        outcome[0] = False
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for one kind of fetch, adjusted from completed requests."""
+
+    def __init__(self, name: str, initial: int = 5, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, backoff: float = 0.7, tolerance: float = 2.0):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._short: Optional[float] = None  # fast EWMA of successful latencies
+        self._long: Optional[float] = None   # slow EWMA (baseline)
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._waiters: list = []
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def set_bounds(self, min_limit: Optional[int] = None, max_limit: Optional[int] = None) -> None:
+        with self._lock:
+            if min_limit is not None:
+                self.min_limit = max(1, min_limit)
+            if max_limit is not None:
+                self.max_limit = max(self.min_limit, max_limit)
+            self._limit = min(max(self._limit, self.min_limit), self.max_limit)
+
+    def reseed(self, initial: int) -> None:
+        """Start from initial instead, unless a limit has been learned already."""
+        with self._lock:
+            if self._long is None and not self._in_flight:
+                self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+
+    def try_acquire(self, force: bool = False) -> bool:
+        """Take a slot if the limit allows; force takes one regardless (a run's guaranteed minimum)."""
+        with self._lock:
+            if force or self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    def release(self, latency: Optional[float] = None, ok: bool = True) -> None:
+        """Free a slot; latency None means the request never ran (no sample)."""
+        with self._lock:
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            if latency is not None:
+                self._update(latency, ok, saturated)
+            waiters = self._waiters[:]
+            # Rotate so runs sharing this limiter take turns at freed slots
+            if len(self._waiters) > 1:
+                self._waiters.append(self._waiters.pop(0))
+        for executor in waiters:
+            executor._dispatch()
+
+    def _update(self, latency: float, ok: bool, saturated: bool) -> None:
+        if ok:
+            self._short = latency if self._short is None else 0.7 * self._short + 0.3 * latency
+            self._long = latency if self._long is None else 0.95 * self._long + 0.05 * latency
+        congested = not ok or self._short > self.tolerance * self._long
+        now = time.monotonic()
+        if congested:
+            if now - self._last_decrease >= (self._short or 1.0):
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = now
+                registry.inc("adaptive_decrease_total", kind=self.name)
+        elif saturated:
+            self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+        registry.observe("adaptive_limit", self._limit, kind=self.name)
+
+    def _register(self, executor) -> None:
+        with self._lock:
+            self._waiters.append(executor)
+
+    def _unregister(self, executor) -> None:
+        with self._lock:
+            if executor in self._waiters:
+                self._waiters.remove(executor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "min": self.min_limit,
+                "max": self.max_limit,
+                "latency_short": self._short,
+                "latency_long": self._long,
+            }
+
+
+class RunLimiter:
+    """
+    One run's view of a shared AdaptiveLimiter: the learned limit clamped to
+    the run's own [min_limit, max_limit]. Slots are taken from the shared
+    limiter, except that the run always gets up to min_limit of them.
+    """
+
+    def __init__(self, shared: AdaptiveLimiter, min_limit: int = 1, max_limit: int = 32):
+        self.shared = shared
+        self.name = shared.name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return min(max(self.shared.limit, self.min_limit), self.max_limit)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.limit:
+                return False
+            if not self.shared.try_acquire(force=self._in_flight < self.min_limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: Optional[float] = None, ok: bool = True) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self.shared.release(latency, ok)
+
+    def _register(self, executor) -> None:
+        self.shared._register(executor)
+
+    def _unregister(self, executor) -> None:
+        self.shared._unregister(executor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+        return {**self.shared.stats(), "limit": self.limit, "run_in_flight": in_flight,
+                "min": self.min_limit, "max": self.max_limit}
+
+
+class AdaptiveExecutor(Executor):
+    """
+    Queues submitted calls and hands them to `inner` only while the limiter has
+    room, timing each one to feed the limiter. inner should allow max_limit
+    concurrent tasks.
+    """
+
+    def __init__(self, inner: Executor, limiter):
+        self._inner = inner
+        self._limiter = limiter
+        self._queue: deque = deque()
+        self._futures: list = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+        limiter._register(self)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._queue.append((future, fn, args, kwargs))
+            self._futures.append(future)
+        self._dispatch()
+        return future
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                while self._queue and self._queue[0][0].cancelled():
+                    self._queue.popleft()
+                if not self._queue or not self._limiter.try_acquire():
+                    return
+                task = self._queue.popleft()
+            try:
+                inner_future = self._inner.submit(self._run, *task)
+            except RuntimeError:  # inner executor already shut down
+                task[0].cancel()
+                self._limiter.release()
+                continue
+            inner_future.add_done_callback(lambda f, future=task[0]: self._inner_done(f, future))
+
+    def _inner_done(self, inner_future: Future, future: Future) -> None:
+        # Cancelled while queued in the inner executor: _run never ran, so free its slot here
+        if inner_future.cancelled():
+            future.cancel()
+            self._limiter.release()
+
+    def _run(self, future: Future, fn, args, kwargs) -> None:
+        if not future.set_running_or_notify_cancel():
+            self._limiter.release()
+            return
+        outcome = [True]
+        _local.outcome = outcome
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome[0] = False
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            _local.outcome = None
+            self._limiter.release(time.perf_counter() - start, outcome[0])
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for future, _, _, _ in self._queue:
+                    future.cancel()
+                self._queue.clear()
+            futures = list(self._futures)
+        if wait:
+            futures_wait(futures)
+        self._limiter._unregister(self)
+        self._inner.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(kind: str, initial: int = 5, min_limit: Optional[int] = None,
+                max_limit: Optional[int] = None) -> RunLimiter:
+    """
+    A run's limiter for a kind of fetch ('search', 'scrape'). The limit is
+    learned by one process-wide limiter, so it carries over between runs;
+    `initial` is where it starts until something has been learned. The run's
+    bounds default to ROBIN_MIN_THREADS / ROBIN_MAX_THREADS and apply to this
+    run only.
+    """
+    min_limit = min_limit or ADAPTIVE_MIN_THREADS
+    max_limit = max(max_limit or ADAPTIVE_MAX_THREADS, min_limit)
+    with _limiters_lock:
+        shared = _limiters.get(kind)
+        if shared is None:
+            shared = _limiters[kind] = AdaptiveLimiter(
+                kind, initial=initial, min_limit=1, max_limit=max(max_limit, ADAPTIVE_MAX_THREADS)
+            )
+    # Widening the shared range never restricts other runs; their own bounds still apply
+    if max_limit > shared.max_limit:
+        shared.set_bounds(max_limit=max_limit)
+    shared.reseed(initial)
+    return RunLimiter(shared, min_limit, max_limit)
@@ -0,0 +1,221 @@
+"""
+Persistent cross-run inverted index of artifacts (wallets, emails, onion hosts,
+PGP fingerprints, watchlist terms, ...) to the pages, runs and queries they were
+seen in. Filled from ioc extraction over scraped text after every run; backs the
+`robin pivot` command.
+
+Lives in the same SQLite file as the local full-text index (LOCAL_INDEX_PATH).
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from config import LOCAL_INDEX_PATH
+from ioc import iter_artifacts
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_key TEXT NOT NULL UNIQUE,
+    query TEXT NOT NULL DEFAULT '',
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    UNIQUE (kind, value)
+);
+CREATE INDEX IF NOT EXISTS artifacts_value ON artifacts(value);
+CREATE TABLE IF NOT EXISTS sightings (
+    artifact_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (artifact_id, run_id, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sightings_url ON sightings(url, artifact_id);
+CREATE INDEX IF NOT EXISTS sightings_run ON sightings(run_id);
+"""
+
+
+def normalize_lookup(value: str) -> List[tuple]:
+    """
+    Candidate (kind, value) keys for a user-supplied artifact. Values the ioc
+    extractor recognizes are normalized the same way as at index time; anything
+    else (e.g. a watchlist term) is matched across kinds by its lower-cased form.
+    """
+    value = value.strip()
+    found = [(kind, v) for kind, v in iter_artifacts(value) if len(v) >= len(value) - 2]
+    if found:
+        return found[:1]
+    return [(None, value), (None, value.lower())]
+
+
+class ArtifactIndex:
+    """
+    Thread-safe handle on the artifact tables. Writes go through one connection
+    behind a lock, in one transaction per run.
+    """
+
+    def __init__(self, path: str = LOCAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_run(self, query: str, extracted: dict, run_key: Optional[str] = None) -> int:
+        """
+        Record one run's extract_page_artifacts() output. Returns the number of
+        (artifact, page) sightings written.
+        """
+        now = time.time()
+        sightings: Dict[tuple, Dict[str, int]] = {}
+        for kind, values in extracted.get("artifacts", {}).items():
+            for value, urls in values.items():
+                sightings[(kind, value)] = {url: 1 for url in urls}
+        for term, per_url in extracted.get("watchlist", {}).items():
+            sightings[("watchlist", term.lower())] = dict(per_url)
+
+        with self._lock, self._conn:
+            # A resumed run re-indexes under its existing run key
+            run_id = self._conn.execute(
+                "INSERT INTO runs (run_key, query, started_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(run_key) DO UPDATE SET query = excluded.query RETURNING id",
+                (run_key or uuid.uuid4().hex, query, now),
+            ).fetchone()[0]
+            ids = {
+                (kind, value): self._conn.execute(
+                    "INSERT INTO artifacts (kind, value, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(kind, value) DO UPDATE SET last_seen = excluded.last_seen RETURNING id",
+                    (kind, value, now, now),
+                ).fetchone()[0]
+                for kind, value in sightings
+            }
+            rows = [
+                (ids[key], run_id, url, count, now)
+                for key, per_url in sightings.items()
+                for url, count in per_url.items()
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sightings (artifact_id, run_id, url, count, seen_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def _find(self, value: str) -> List[tuple]:
+        found = []
+        for kind, candidate in normalize_lookup(value):
+            if kind is None:
+                found += self._conn.execute(
+                    "SELECT id, kind, value, first_seen, last_seen FROM artifacts WHERE value = ?", (candidate,)
+                ).fetchall()
+            else:
+                found += self._conn.execute(
+                    "SELECT id, kind, value, first_seen, last_seen FROM artifacts WHERE kind = ? AND value = ?",
+                    (kind, candidate),
+                ).fetchall()
+            if found:
+                break
+        return found
+
+    def lookup(self, value: str, limit: int = 100) -> List[dict]:
+        """
+        Every indexed artifact matching value, with first/last seen times and the
+        pages, runs and queries it was seen in (most recent first).
+        """
+        with self._lock:
+            results = []
+            for artifact_id, kind, norm, first_seen, last_seen in self._find(value):
+                pages = self._conn.execute(
+                    """
+                    SELECT s.url, r.run_key, r.query, s.count, s.seen_at
+                    FROM sightings s JOIN runs r ON r.id = s.run_id
+                    WHERE s.artifact_id = ?
+                    ORDER BY s.seen_at DESC
+                    LIMIT ?
+                    """,
+                    (artifact_id, limit),
+                ).fetchall()
+                runs, queries = self._conn.execute(
+                    """
+                    SELECT COUNT(DISTINCT s.run_id), COUNT(DISTINCT r.query)
+                    FROM sightings s JOIN runs r ON r.id = s.run_id
+                    WHERE s.artifact_id = ?
+                    """,
+                    (artifact_id,),
+                ).fetchone()
+                results.append({
+                    "kind": kind,
+                    "value": norm,
+                    "first_seen": first_seen,
+                    "last_seen": last_seen,
+                    "runs": runs,
+                    "queries": queries,
+                    "sightings": [
+                        {"url": url, "run": run_key, "query": query, "count": count, "seen_at": seen_at}
+                        for url, run_key, query, count, seen_at in pages
+                    ],
+                })
+            return results
+
+    def cooccurring(self, value: str, limit: int = 25) -> List[dict]:
+        """
+        Artifacts seen on the same pages as value, ranked by the number of shared pages.
+        """
+        with self._lock:
+            ids = [row[0] for row in self._find(value)]
+            if not ids:
+                return []
+            marks = ",".join("?" * len(ids))
+            rows = self._conn.execute(
+                f"""
+                SELECT a.kind, a.value, COUNT(DISTINCT s2.url) AS shared_pages, a.last_seen
+                FROM sightings s1
+                JOIN sightings s2 ON s2.url = s1.url AND s2.artifact_id != s1.artifact_id
+                JOIN artifacts a ON a.id = s2.artifact_id
+                WHERE s1.artifact_id IN ({marks}) AND s2.artifact_id NOT IN ({marks})
+                GROUP BY s2.artifact_id
+                ORDER BY shared_pages DESC, a.last_seen DESC
+                LIMIT ?
+                """,
+                (*ids, *ids, limit),
+            ).fetchall()
+        return [
+            {"kind": kind, "value": norm, "shared_pages": shared, "last_seen": last_seen}
+            for kind, norm, shared, last_seen in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            artifacts, runs = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM artifacts), (SELECT COUNT(*) FROM runs)"
+            ).fetchone()
+        return {"artifacts": artifacts, "runs": runs}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_index: Optional[ArtifactIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_artifact_index() -> Optional[ArtifactIndex]:
+    """Process-wide artifact index at LOCAL_INDEX_PATH, or None when indexing is disabled."""
+    global _default_index
+    if not LOCAL_INDEX_PATH:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            _default_index = ArtifactIndex(LOCAL_INDEX_PATH)
+        return _default_index
@@ -0,0 +1,149 @@
+"""
+Page-budget benchmark: how much of the per-page character budget carries the
+page's own content, with plain truncation versus main-content block selection.
+
+Synthetic onion sites share a template per host (menu, login box, captcha and
+cookie notices, rules and footer) around unique listing or forum-post text that
+contains artifacts. Pages are parsed in order, so later pages of a host benefit
+from the template learned on earlier ones.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_content --hosts 10 --pages 4
+    python -m benchmarks.bench_content --budget 1000 --json content_bench.json
+"""
+import json
+import random
+import time
+
+import click
+
+import content
+from ioc import iter_artifacts
+
+
+_WORDS = (
+    "vendor escrow shipping stealth package review feedback listing price wallet leak database "
+    "access panel invite forum thread seller buyer dispute refund tracking order quality batch"
+).split()
+# Template text uses its own vocabulary so content words can be told apart
+_TEMPLATE_WORDS = (
+    "home about news support faq rules staff banned members guide mirrors status canary pgp "
+    "account settings messages wishlist categories search latest popular sitemap contact"
+).split()
+
+
+def _words(rng: random.Random, n: int, vocabulary=_WORDS) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(n))
+
+
+def _onion(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz234567") for _ in range(56)) + ".onion"
+
+
+def _template(rng: random.Random, host: str) -> tuple:
+    menu = "".join(f'<li><a href="http://{host}/{w}">{w.title()}</a></li>' for w in rng.sample(_TEMPLATE_WORDS, 12))
+    head = (
+        f'<div class="header"><h1>{_words(rng, 2, _TEMPLATE_WORDS).title()} Market</h1>'
+        f'<ul class="menu">{menu}</ul>'
+        '<form class="login">Username <input> Password <input> <a href="/login">Log in</a> '
+        '<a href="/register">Register</a> Forgot password?</form>'
+        '<div class="cookie-banner">This site uses cookies. Enable JavaScript for the best experience.</div>'
+        '<div class="captcha">Solve the captcha to continue browsing. Captcha refreshes every 5 minutes.</div>'
+        "</div>"
+    )
+    rules = f'<div class="rules"><h3>Market rules</h3><p>{_words(rng, 45, _TEMPLATE_WORDS)}.</p></div>'
+    foot = (
+        f'<div id="footer">Mirrors: <a href="http://{_onion(rng)}/">mirror 1</a> '
+        f'<a href="http://{_onion(rng)}/">mirror 2</a> | All rights reserved © 2024 | Powered by onionshop</div>'
+    )
+    return head, rules, foot
+
+
+def _listing(rng: random.Random) -> tuple:
+    """Unique page body and the artifacts it contains."""
+    email = f"{rng.choice(_WORDS)}{rng.randint(10, 99)}@protonmail.com"
+    artifacts = {("email", email)}
+    paragraphs = [f"<p>{_words(rng, 60)}. Contact {email} for bulk orders.</p>"]
+    paragraphs += [f"<p>{_words(rng, 50)}. {_words(rng, 30)}.</p>" for _ in range(2)]
+    paragraphs.append(f"<table><tr><td>Batch</td><td>{_words(rng, 6)}</td></tr><tr><td>Price</td><td>0.0{rng.randint(1, 9)} BTC</td></tr></table>")
+    body = f'<div class="content"><h2>{_words(rng, 5).title()}</h2>{"".join(paragraphs)}</div>'
+    return body, artifacts
+
+
+def synthetic_site(rng: random.Random, pages: int) -> list:
+    host = _onion(rng)
+    head, rules, foot = _template(rng, host)
+    site = []
+    for n in range(pages):
+        body, artifacts = _listing(rng)
+        html = f"<html><head><title>t</title><style>.x{{}}</style></head><body>{head}{rules}{body}{foot}</body></html>"
+        site.append((f"http://{host}/listing/{n}", html, body, artifacts))
+    return site
+
+
+def _signal_share(selected: str, body_text: str) -> float:
+    # Share of selected characters whose words come from the page's own content
+    body_words = set(body_text.split())
+    words = selected.split()
+    return sum(len(w) for w in words if w in body_words) / max(1, sum(len(w) for w in words))
+
+
+def run(hosts: int, pages: int, budget: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    content.get_host_templates().clear()
+    totals = {"plain": [0.0, 0, 0.0], "blocks": [0.0, 0, 0.0]}  # signal share, artifacts kept, seconds
+    all_artifacts = 0
+    for _ in range(hosts):
+        for url, html, body, artifacts in synthetic_site(rng, pages):
+            body_text = " ".join(b.text for b in content.html_to_blocks(body))
+            all_artifacts += len(artifacts)
+
+            started = time.perf_counter()
+            text = "title\n" + content.extract_text(html, url)
+            selected = content.fill_budget(text, budget, url)
+            totals["blocks"][2] += time.perf_counter() - started
+
+            flat = "title - " + " ".join(text.split("\n")[1:])
+            started = time.perf_counter()
+            plain = flat[:budget]
+            totals["plain"][2] += time.perf_counter() - started
+
+            for name, out in (("plain", plain), ("blocks", selected)):
+                totals[name][0] += _signal_share(out, body_text)
+                totals[name][1] += len(artifacts & {a for a in iter_artifacts(out) if a[0] == "email"})
+    count = hosts * pages
+    return {
+        "pages": count,
+        "budget": budget,
+        "artifacts": all_artifacts,
+        **{
+            name: {
+                "signal_share": round(values[0] / count, 3),
+                "artifacts_kept": values[1],
+                "ms_per_page": round(values[2] / count * 1000, 3),
+            }
+            for name, values in totals.items()
+        },
+    }
+
+
+@click.command()
+@click.option("--hosts", default=10, show_default=True, type=int, help="Number of synthetic onion sites")
+@click.option("--pages", default=4, show_default=True, type=int, help="Pages per site")
+@click.option("--budget", default=2000, show_default=True, type=int, help="Per-page character budget")
+@click.option("--json", "json_path", type=str, help="Write results as JSON")
+def main(hosts, pages, budget, json_path):
+    result = run(hosts, pages, budget)
+    click.echo(f"{result['pages']} pages, {budget}-char budget, {result['artifacts']} artifacts in page content")
+    click.echo(f"{'method':>8}{'signal share':>14}{'artifacts kept':>16}{'ms/page':>10}")
+    for name in ("plain", "blocks"):
+        row = result[name]
+        click.echo(f"{name:>8}{row['signal_share']:>14.3f}{row['artifacts_kept']:>16}{row['ms_per_page']:>10.3f}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        click.echo(f"[OUTPUT] Benchmark results saved to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
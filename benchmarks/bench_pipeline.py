@@ -0,0 +1,236 @@
+"""
+Offline throughput benchmark for get_search_results, scrape_multiple and the
+full pipeline, run against the simulated Tor/onion network and a fake LLM.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --threads 1,4,8,16 --mode all
+    python -m benchmarks.bench_pipeline --json bench.json
+    python -m benchmarks.bench_pipeline --baseline bench.json --tolerance 0.25
+    python -m benchmarks.bench_pipeline --mode pipeline --threads 8 --check-cancel
+
+With --baseline the command exits non-zero when throughput for any mode/thread
+count drops more than --tolerance below the saved baseline. With --check-cancel
+it also cancels a job mid-summary and exits non-zero unless the stream stops
+early.
+"""
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+import click
+
+import scrape
+import search
+from benchmarks.fake_llm import FakeLatencyChatModel
+from benchmarks.simnet import SimConfig, SimProfile, SimulatedTorNetwork
+from jobs import CANCELLED, JobManager
+from llm import generate_summary
+from metrics import registry
+from pipeline import run_investigation
+
+
+class _FirstResultClock:
+    """Wrap a fetch function to record when the first non-empty result arrives."""
+
+    def __init__(self, fn, started: float):
+        self.fn = fn
+        self.started = started
+        self.first = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        result = self.fn(*args, **kwargs)
+        payload = result[1] if isinstance(result, tuple) else result
+        if payload:
+            with self._lock:
+                if self.first is None:
+                    self.first = time.perf_counter() - self.started
+        return result
+
+
+def _run_search(threads, **_):
+    original = search.fetch_search_results
+    clock = _FirstResultClock(original, time.perf_counter())
+    search.fetch_search_results = clock
+    try:
+        results = search.get_search_results("bench+market", max_workers=threads)
+    finally:
+        search.fetch_search_results = original
+    return len(results), clock.first
+
+
+def _run_scrape(threads, urls, **_):
+    original = scrape.scrape_single
+    clock = _FirstResultClock(original, time.perf_counter())
+    scrape.scrape_single = clock
+    try:
+        pages = scrape.scrape_multiple(urls, max_workers=threads)
+    finally:
+        scrape.scrape_single = original
+    return len(pages), clock.first
+
+
+def _run_pipeline(threads, llm, **_):
+    result = run_investigation(llm, "bench market leak", threads=threads, callbacks=[])
+    return len(result["scraped"]), None
+
+
+_MODES = {"search": _run_search, "scrape": _run_scrape, "pipeline": _run_pipeline}
+
+
+def _measure(mode, threads, repeat, **kwargs) -> dict:
+    registry.reset()
+    tracemalloc.start()
+    elapsed, produced, first_results = 0.0, 0, []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count, first = _MODES[mode](threads, **kwargs)
+        elapsed += time.perf_counter() - started
+        produced += count
+        if first is not None:
+            first_results.append(first)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    row = {
+        "mode": mode,
+        "threads": threads,
+        "runs": repeat,
+        "results": produced,
+        "elapsed_s": elapsed,
+        "results_per_s": produced / elapsed if elapsed else 0.0,
+        "time_to_first_result_s": sum(first_results) / len(first_results) if first_results else None,
+        "peak_memory_mb": peak / (1024 * 1024),
+        "errors": sum(c["value"] for c in registry.snapshot()["counters"] if c["name"] == "errors_total"),
+        "stages": {},
+    }
+    for name in ("search_engine_seconds", "fetch_seconds"):
+        stats = registry.aggregate_timing(name)
+        if stats:
+            row["stages"][name] = {"p50": stats["p50"], "p95": stats["p95"], "count": stats["count"]}
+    for stage in ("refine", "search", "filter", "scrape", "extract", "summarize"):
+        stats = registry.timing_stats("stage_seconds", stage=stage)
+        if stats:
+            row["stages"][stage] = {"p50": stats["p50"], "p95": stats["p95"], "count": stats["count"]}
+    return row
+
+
+def _check_cancel(llm, cancel_after: float = 0.2) -> list:
+    """Cancel a job while its summary streams; the stream must stop instead of running to the end."""
+    full = llm.time_to_first_token + llm.summary_tokens / llm.tokens_per_second
+    manager = JobManager(
+        lambda job, handler: {"summary": generate_summary(llm, job.query, {"http://bench.onion": "text"},
+                                                          callbacks=[handler])},
+        workers=1,
+    )
+    job = manager.submit("bench market leak", "fake", 1)
+    try:
+        time.sleep(llm.time_to_first_token + cancel_after)
+        manager.cancel(job.id)
+        deadline = time.monotonic() + full
+        while not job.finished and time.monotonic() < deadline:
+            job.events_since(0, timeout=0.05)
+    finally:
+        manager.shutdown()
+    streamed = job.finished_at - job.started_at if job.finished else full
+    click.echo(f"cancel check: {job.status} after {streamed:.2f}s (full stream {full:.2f}s)")
+    if job.status != CANCELLED:
+        return [f"cancelled job ended as {job.status!r}, not {CANCELLED!r}"]
+    if streamed > llm.time_to_first_token + cancel_after + (full - llm.time_to_first_token) / 2:
+        return [f"cancelled summary kept streaming for {streamed:.2f}s of {full:.2f}s"]
+    return []
+
+
+def _fmt(value, pattern="{:.3f}"):
+    return pattern.format(value) if value is not None else "-"
+
+
+def _print_table(rows) -> None:
+    click.echo(f"{'mode':<9}{'threads':>8}{'results':>9}{'res/s':>10}{'ttfr s':>9}{'p50 s':>9}{'p95 s':>9}{'peak MB':>9}{'errors':>8}")
+    for row in rows:
+        key = {"search": "search_engine_seconds", "scrape": "fetch_seconds", "pipeline": "scrape"}[row["mode"]]
+        stage = row["stages"].get(key, {})
+        click.echo(
+            f"{row['mode']:<9}{row['threads']:>8}{row['results']:>9}{row['results_per_s']:>10.2f}"
+            f"{_fmt(row['time_to_first_result_s']):>9}{_fmt(stage.get('p50')):>9}{_fmt(stage.get('p95')):>9}"
+            f"{row['peak_memory_mb']:>9.1f}{row['errors']:>8.0f}"
+        )
+
+
+def _check_baseline(rows, baseline_path, tolerance) -> list:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["mode"], r["threads"]): r for r in json.load(f)["rows"]}
+    regressions = []
+    for row in rows:
+        ref = baseline.get((row["mode"], row["threads"]))
+        if ref and row["results_per_s"] < ref["results_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{row['mode']}@{row['threads']}: {row['results_per_s']:.2f} res/s "
+                f"< baseline {ref['results_per_s']:.2f} (-{tolerance:.0%} allowed)"
+            )
+    return regressions
+
+
+@click.command()
+@click.option("--mode", type=click.Choice(["search", "scrape", "pipeline", "all"]), default="all", show_default=True)
+@click.option("--threads", default="1,4,8,16", show_default=True, help="Comma-separated thread counts")
+@click.option("--repeat", default=1, show_default=True, type=int, help="Runs per mode/thread count")
+@click.option("--pages", default=20, show_default=True, type=int, help="Pages per scrape-mode run")
+@click.option("--latency-median", default=0.2, show_default=True, type=float, help="Content page median latency (s)")
+@click.option("--search-latency-median", default=0.4, show_default=True, type=float, help="Search engine median latency (s)")
+@click.option("--latency-sigma", default=0.6, show_default=True, type=float, help="Lognormal latency spread")
+@click.option("--failure-rate", default=0.05, show_default=True, type=float, help="Fraction of 503 responses")
+@click.option("--drop-rate", default=0.02, show_default=True, type=float, help="Fraction of dropped connections")
+@click.option("--page-kb", default=20.0, show_default=True, type=float, help="Content page size")
+@click.option("--results-per-engine", default=40, show_default=True, type=int)
+@click.option("--llm-ttft", default=0.5, show_default=True, type=float, help="Fake LLM time to first token (s)")
+@click.option("--llm-tps", default=200.0, show_default=True, type=float, help="Fake LLM tokens per second")
+@click.option("--seed", default=1234, show_default=True, type=int)
+@click.option("--json", "json_path", type=str, help="Write results as JSON (usable as a baseline)")
+@click.option("--baseline", type=str, help="Fail if throughput regresses against this JSON")
+@click.option("--tolerance", default=0.25, show_default=True, type=float, help="Allowed fractional throughput drop")
+@click.option("--check-cancel", is_flag=True, help="Fail if cancelling a job does not stop its summary stream")
+def main(mode, threads, repeat, pages, latency_median, search_latency_median, latency_sigma,
+         failure_rate, drop_rate, page_kb, results_per_engine, llm_ttft, llm_tps, seed,
+         json_path, baseline, tolerance, check_cancel):
+    """Benchmark search/scrape/pipeline throughput against a simulated Tor network."""
+    config = SimConfig(
+        search=SimProfile(search_latency_median, latency_sigma, failure_rate, drop_rate, 0),
+        content=SimProfile(latency_median, latency_sigma, failure_rate, drop_rate, page_kb),
+        results_per_engine=results_per_engine,
+        seed=seed,
+    )
+    thread_counts = [int(t) for t in threads.split(",") if t.strip()]
+    modes = ["search", "scrape", "pipeline"] if mode == "all" else [mode]
+    llm = FakeLatencyChatModel(streaming=True, time_to_first_token=llm_ttft, tokens_per_second=llm_tps)
+
+    with SimulatedTorNetwork(config) as net:
+        search.TOR_SOCKS_PROXY = scrape.TOR_SOCKS_PROXY = net.proxy_url
+        urls = [
+            {"link": f"http://{host}/listing/{i}", "title": f"bench listing {i}"}
+            for i, host in enumerate(net.onion_pool[:pages])
+        ]
+        rows = [
+            _measure(m, t, repeat, urls=urls, llm=llm)
+            for m in modes
+            for t in thread_counts
+        ]
+
+    _print_table(rows)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": {"seed": seed, "page_kb": page_kb}, "rows": rows}, f, indent=2)
+        click.echo(f"[OUTPUT] Benchmark results saved to {json_path}")
+    regressions = _check_baseline(rows, baseline, tolerance) if baseline else []
+    if check_cancel:
+        regressions += _check_cancel(llm)
+    for line in regressions:
+        click.echo(f"[REGRESSION] {line}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
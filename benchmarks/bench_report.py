@@ -0,0 +1,105 @@
+"""
+PDF report rendering benchmark on synthetic summaries sized like map-reduce
+outputs (hundreds of KB of headings, tables, nested lists and inline markup).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_report --sizes 50,200,500
+    python -m benchmarks.bench_report --json report_bench.json
+
+For each size it reports markdown -> flowables conversion time, full PDF build
+time, page count and PDF size, and the time of a repeat request served from
+the render cache.
+"""
+import json
+import random
+import time
+
+import click
+
+import report_pdf
+
+
+_WORDS = (
+    "ransomware affiliate panel leak forum vendor escrow wallet onion mirror "
+    "actor credential dump exploit broker listing market invite access loader"
+).split()
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _onion(rng: random.Random) -> str:
+    return "http://" + "".join(rng.choice("abcdefghijklmnopqrstuvwxyz234567") for _ in range(56)) + ".onion/"
+
+
+def synthetic_summary(target_kb: float, seed: int = 7) -> str:
+    """Markdown in the shape of a merged map-reduce summary, about target_kb in size."""
+    rng = random.Random(seed)
+    parts = ["# Investigation Summary", "", f"**Input Query:** {_words(rng, 4)}", ""]
+    section = 0
+    while sum(len(p) + 1 for p in parts) < target_kb * 1024:
+        section += 1
+        parts += [f"## Section {section}: {_words(rng, 3).title()}", ""]
+        for _ in range(3):
+            parts.append(f"{_words(rng, 40)} with **{_words(rng, 2)}** and *{_words(rng, 2)}* near `{_words(rng, 1)}`.")
+            parts.append("")
+        parts += ["### Source Links", ""]
+        parts += [f"- [{_words(rng, 3)}]({_onion(rng)}) - {_words(rng, 8)}" for _ in range(8)]
+        parts += ["", "### Investigation Artifacts", "", "| Artifact | Type | Context | Source |", "|---|---|---|---|"]
+        parts += [
+            f"| bc1q{rng.getrandbits(120):030x} | btc | {_words(rng, 10)} | {_onion(rng)} |"
+            for _ in range(12)
+        ]
+        parts += ["", "### Key Insights", ""]
+        for n in range(1, 5):
+            parts.append(f"{n}. **{_words(rng, 3)}**: {_words(rng, 25)}")
+            parts += [f"   - {_words(rng, 12)}" for _ in range(2)]
+        parts.append("")
+    return "\n".join(parts)
+
+
+def _measure(size_kb: float) -> dict:
+    summary = synthetic_summary(size_kb)
+    started = time.perf_counter()
+    flowables = report_pdf.markdown_to_flowables(summary)
+    convert_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pdf = report_pdf.build_report_pdf(summary)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    report_pdf.build_report_pdf(summary)
+    cached_s = time.perf_counter() - started
+
+    return {
+        "size_kb": round(len(summary) / 1024, 1),
+        "flowables": len(flowables),
+        "convert_s": round(convert_s, 4),
+        "build_s": round(build_s, 4),
+        "cached_s": round(cached_s, 6),
+        "pages": pdf.count(b"/Type /Page\n") or pdf.count(b"/Type /Page"),
+        "pdf_kb": round(len(pdf) / 1024, 1),
+    }
+
+
+@click.command()
+@click.option("--sizes", default="50,200,500", show_default=True, help="Comma-separated summary sizes in KB")
+@click.option("--json", "json_path", type=str, help="Write results as JSON")
+def main(sizes, json_path):
+    rows = [_measure(float(size)) for size in sizes.split(",") if size.strip()]
+    click.echo(f"{'size KB':>8}{'flowables':>11}{'convert s':>11}{'build s':>10}{'cached s':>11}{'pages':>7}{'PDF KB':>9}")
+    for row in rows:
+        click.echo(
+            f"{row['size_kb']:>8}{row['flowables']:>11}{row['convert_s']:>11.3f}{row['build_s']:>10.3f}"
+            f"{row['cached_s']:>11.6f}{row['pages']:>7}{row['pdf_kb']:>9}"
+        )
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"rows": rows}, f, indent=2)
+        click.echo(f"[OUTPUT] Benchmark results saved to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Fake chat model with configurable latency for offline benchmarks.
+
+It recognizes which pipeline stage is calling it from the system prompt and
+answers plausibly (a short refined query, a list of indices, or a streamed
+summary of configurable length), sleeping to mimic provider latency.
+"""
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    streaming: bool = False
+    time_to_first_token: float = 0.5
+    tokens_per_second: float = 60.0
+    summary_tokens: int = 400
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    @staticmethod
+    def _stage(messages: List[BaseMessage]) -> str:
+        system = str(messages[0].content) if messages else ""
+        if "refine the provided user query" in system:
+            return "refine"
+        if "Top 20" in system:
+            return "filter"
+        return "summary"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        stage = self._stage(messages)
+        if stage == "refine":
+            return ["bench ", "market ", "leak"]
+        if stage == "filter":
+            return [", ".join(str(i) for i in range(1, 21))]
+        words = ["## ", "Summary\n"] + [f"finding{i} " for i in range(self.summary_tokens)]
+        return words[: self.summary_tokens]
+
+    def _usage(self, messages, tokens) -> dict:
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        input_tokens = max(1, prompt_chars // 4)
+        return {"input_tokens": input_tokens, "output_tokens": len(tokens), "total_tokens": input_tokens + len(tokens)}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.time_to_first_token + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages)
+        time.sleep(self.time_to_first_token)
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(delay)
+            usage = self._usage(messages, tokens) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
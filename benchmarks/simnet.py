@@ -0,0 +1,254 @@
+"""
+Simulated Tor + onion network for offline benchmarks.
+
+Starts two local servers:
+  * a SOCKS5 stand-in that accepts socks5h CONNECTs to any *.onion name and
+    routes them to the fake onion web server, with configurable circuit setup
+    latency and unreachable-service rate;
+  * a fake onion web server that answers as every host in DEFAULT_SEARCH_ENGINES
+    (synthetic result pages linking to synthetic onion services) and as those
+    services (synthetic content pages), with configurable latency distribution,
+    failure rate and page size.
+
+Nothing leaves the loopback interface, so the suite runs without network access.
+"""
+import hashlib
+import base64
+import math
+import random
+import select
+import socket
+import socketserver
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from search import DEFAULT_SEARCH_ENGINES
+
+
+@dataclass
+class SimProfile:
+    """Latency/failure/size knobs for one class of simulated endpoint."""
+
+    latency_median: float = 0.2   # seconds, lognormal median
+    latency_sigma: float = 0.6    # lognormal shape; 0 = constant latency
+    failure_rate: float = 0.05    # fraction of requests answered with 503 / dropped
+    drop_rate: float = 0.02       # fraction of requests where the connection is cut
+    page_kb: float = 20.0         # content page size (search pages scale with results)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_median
+        return rng.lognormvariate(math.log(max(self.latency_median, 1e-6)), self.latency_sigma)
+
+
+@dataclass
+class SimConfig:
+    search: SimProfile = None
+    content: SimProfile = None
+    circuit_latency: float = 0.05      # SOCKS CONNECT delay (circuit build)
+    unreachable_rate: float = 0.02     # SOCKS "host unreachable" replies
+    results_per_engine: int = 40
+    result_pool: int = 120             # distinct onion services the engines draw from
+    seed: int = 1234
+
+    def __post_init__(self):
+        self.search = self.search or SimProfile(latency_median=0.4, page_kb=0)
+        self.content = self.content or SimProfile()
+
+
+def synthetic_onion(index: int) -> str:
+    """Deterministic, well-formed (56 base32 chars) onion hostname."""
+    digest = hashlib.sha256(f"robin-bench-{index}".encode()).digest() + b"\x00\x00\x03"
+    return base64.b32encode(digest).decode().lower()[:56] + ".onion"
+
+
+_WORDS = (
+    "market vendor escrow listing forum thread leak database dump access credentials "
+    "ransomware affiliate panel wallet bitcoin monero pgp contact mirror invite price "
+    "shipping review feedback admin moderator service exploit botnet carding fullz"
+).split()
+
+
+class _FakeOnionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        net: "SimulatedTorNetwork" = self.server.network
+        host = (self.headers.get("Host") or "").split(":")[0].lower()
+        is_engine = host in net.engine_hosts
+        profile = net.config.search if is_engine else net.config.content
+        rng = random.Random(hash((host, self.path, time.monotonic_ns())))
+
+        time.sleep(profile.sample_latency(rng))
+        roll = rng.random()
+        if roll < profile.drop_rate:
+            self.close_connection = True
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+        if roll < profile.drop_rate + profile.failure_rate:
+            return self._reply(503, "<html><body>Service unavailable</body></html>")
+
+        if is_engine:
+            body = net.search_page(host)
+        else:
+            body = net.content_page(host, self.path, profile.page_kb)
+        self._reply(200, body)
+
+    def _reply(self, status: int, body: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = b""
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed during SOCKS handshake")
+        buf += chunk
+    return buf
+
+
+class _Socks5Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        net: "SimulatedTorNetwork" = self.server.network
+        client = self.request
+        try:
+            _, nmethods = _recv_exact(client, 2)
+            _recv_exact(client, nmethods)
+            client.sendall(b"\x05\x00")  # no auth
+            _, cmd, _, atyp = _recv_exact(client, 4)
+            if atyp == 1:
+                host = socket.inet_ntoa(_recv_exact(client, 4))
+            elif atyp == 3:
+                host = _recv_exact(client, _recv_exact(client, 1)[0]).decode()
+            else:
+                _recv_exact(client, 16)
+                host = ""
+            _recv_exact(client, 2)  # port: everything is served by the fake web server
+
+            if cmd != 1:
+                client.sendall(b"\x05\x07\x00\x01" + b"\x00" * 6)  # command not supported
+                return
+            time.sleep(net.config.circuit_latency)
+            if not host.endswith(".onion") or net.rng_roll() < net.config.unreachable_rate:
+                client.sendall(b"\x05\x04\x00\x01" + b"\x00" * 6)  # host unreachable
+                return
+            upstream = socket.create_connection(net.http_address, timeout=30)
+        except (ConnectionError, OSError):
+            return
+
+        client.sendall(b"\x05\x00\x00\x01" + socket.inet_aton("127.0.0.1") + struct.pack(">H", 0))
+        sockets = [client, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(sockets, [], [], 60)
+                if not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is client else client).sendall(data)
+        except OSError:
+            return
+        finally:
+            upstream.close()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SimulatedTorNetwork:
+    """
+    Context manager running the fake SOCKS proxy and onion web server.
+    Use `proxy_url` as the TOR_SOCKS_PROXY for search.py / scrape.py.
+    """
+
+    def __init__(self, config: Optional[SimConfig] = None):
+        self.config = config or SimConfig()
+        self.engine_hosts = {urlparse(e).hostname for e in DEFAULT_SEARCH_ENGINES}
+        self.onion_pool: List[str] = [synthetic_onion(i) for i in range(self.config.result_pool)]
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._http = None
+        self._socks = None
+        self._threads: List[threading.Thread] = []
+
+    def rng_roll(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    @property
+    def http_address(self):
+        return self._http.server_address
+
+    @property
+    def proxy_url(self) -> str:
+        host, port = self._socks.server_address
+        return f"socks5h://{host}:{port}"
+
+    def search_page(self, engine_host: str) -> str:
+        rng = random.Random(f"{self.config.seed}-{engine_host}")
+        picks = rng.sample(self.onion_pool, min(self.config.results_per_engine, len(self.onion_pool)))
+        rows = "\n".join(
+            f'<li><a href="http://{host}/listing/{i}">{" ".join(rng.choices(_WORDS, k=5)).title()}</a></li>'
+            for i, host in enumerate(picks)
+        )
+        return f"<html><body><form action='/search'></form><ol>{rows}</ol></body></html>"
+
+    def content_page(self, host: str, path: str, page_kb: float) -> str:
+        rng = random.Random(f"{host}{path}")
+        target = int(page_kb * 1024)
+        nav = " | ".join(f'<a href="/{w}">{w}</a>' for w in rng.sample(_WORDS, 8))
+        paragraphs, size = [], 0
+        while size < target:
+            sentence = " ".join(rng.choices(_WORDS, k=rng.randint(8, 20))).capitalize() + "."
+            paragraphs.append(f"<p>{sentence} Contact vendor{rng.randint(1, 999)}@example.com.</p>")
+            size += len(paragraphs[-1])
+        return (
+            f"<html><head><title>{host[:12]}</title><style>p{{margin:0}}</style></head>"
+            f"<body><nav>{nav}</nav><main>{''.join(paragraphs)}</main>"
+            f"<footer>© market {rng.randint(2019, 2025)}</footer></body></html>"
+        )
+
+    def start(self) -> "SimulatedTorNetwork":
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOnionHandler)
+        self._http.daemon_threads = True
+        self._http.network = self
+        self._socks = _ThreadingTCPServer(("127.0.0.1", 0), _Socks5Handler)
+        self._socks.network = self
+        for server in (self._http, self._socks):
+            t = threading.Thread(target=server.serve_forever, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self) -> None:
+        for server in (self._socks, self._http):
+            if server:
+                server.shutdown()
+                server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
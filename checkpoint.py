@@ -0,0 +1,128 @@
+"""
+Per-run checkpoints so an interrupted investigation can be resumed.
+
+Each run gets a directory RUNS_DIR/<run_id>/ holding:
+    meta.json       query, model, threads and options of the run
+    refine.json     refined query
+    search.json     raw search results
+    filter.json     filtered results
+    pages.jsonl     one {"url", "text"} line per scraped page, appended as pages arrive
+    links.jsonl     one {"url", "depth", "links"} line per crawled page, so a crawl
+                    resumes from its frontier instead of starting over
+    scrape.json     marker written once the scrape finished with some real content
+    summary.json    the finished summary (and, for the CLI, where it was saved)
+Completed stages are loaded instead of re-run; a resumed scrape only fetches
+the pages missing from pages.jsonl (pages that previously failed are retried,
+even after the scrape finished).
+"""
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from collections.abc import MutableMapping
+from typing import Optional
+
+from config import RUNS_DIR
+
+
+def new_run_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def _write_json(path: str, data) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # default=dict serializes SearchResult records like the dicts they replace
+        json.dump(data, f, ensure_ascii=False, indent=1, default=dict)
+    os.replace(tmp_path, path)
+
+
+class RunCheckpoint:
+    """Checkpoint directory of one run. Safe to append pages from scraper threads."""
+
+    def __init__(self, run_id: str, root: str = RUNS_DIR):
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, meta: dict, root: str = RUNS_DIR) -> "RunCheckpoint":
+        checkpoint = cls(new_run_id(), root)
+        os.makedirs(checkpoint.path, exist_ok=True)
+        _write_json(os.path.join(checkpoint.path, "meta.json"), meta)
+        return checkpoint
+
+    @classmethod
+    def open(cls, run_id: str, root: str = RUNS_DIR) -> "RunCheckpoint":
+        checkpoint = cls(run_id, root)
+        if not os.path.isfile(os.path.join(checkpoint.path, "meta.json")):
+            raise FileNotFoundError(f"No checkpointed run '{run_id}' in {root}")
+        return checkpoint
+
+    @property
+    def meta(self) -> dict:
+        return self.load("meta")
+
+    def _stage_path(self, stage: str) -> str:
+        return os.path.join(self.path, f"{stage}.json")
+
+    def has(self, stage: str) -> bool:
+        return os.path.isfile(self._stage_path(stage))
+
+    def load(self, stage: str):
+        with open(self._stage_path(stage), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, stage: str, data) -> None:
+        _write_json(self._stage_path(stage), data)
+
+    def add_page(self, url: str, text: str) -> None:
+        line = json.dumps({"url": url, "text": text}, ensure_ascii=False)
+        with self._lock:
+            with open(os.path.join(self.path, "pages.jsonl"), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def add_links(self, url: str, depth: int, links: list) -> None:
+        line = json.dumps({"url": url, "depth": depth, "links": links}, ensure_ascii=False)
+        with self._lock:
+            with open(os.path.join(self.path, "links.jsonl"), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def links(self) -> dict:
+        """{url: (depth, [(link, anchor)])} of crawled pages; a torn last line is ignored."""
+        found = {}
+        path = os.path.join(self.path, "links.jsonl")
+        if not os.path.isfile(path):
+            return found
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except ValueError:
+                    continue
+                found[page["url"]] = (page["depth"], [tuple(link) for link in page["links"]])
+        return found
+
+    def pages(self, store: Optional[MutableMapping] = None) -> MutableMapping:
+        """
+        Pages scraped so far (full text), loaded into store (a dict by default);
+        a torn last line from a crash is ignored.
+        """
+        pages = store if store is not None else {}
+        path = os.path.join(self.path, "pages.jsonl")
+        if not os.path.isfile(path):
+            return pages
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except ValueError:
+                    continue
+                pages[page["url"]] = page["text"]
+        return pages
+
+    def completed_stages(self) -> list:
+        return [s for s in ("refine", "search", "filter", "scrape", "summary") if self.has(s)]
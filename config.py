@@ -10,4 +10,41 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-LLAMA_CPP_BASE_URL= os.getenv("LLAMA_CPP_BASE_URL")
\ No newline at end of file
+LLAMA_CPP_BASE_URL= os.getenv("LLAMA_CPP_BASE_URL")
+
+# Optional newline-separated watchlist of terms to match in scraped pages
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE")
+
+# Tor SOCKS proxy used for onion requests (socks5h so .onion names resolve inside Tor)
+TOR_SOCKS_PROXY = os.getenv("TOR_SOCKS_PROXY", "socks5h://127.0.0.1:9050")
+
+# Tor control port used by `robin warmup` to read bootstrap progress (cookie auth is
+# used when Tor offers it; otherwise the password, if set)
+TOR_CONTROL_PORT = int(os.getenv("TOR_CONTROL_PORT", "9051"))
+TOR_CONTROL_PASSWORD = os.getenv("TOR_CONTROL_PASSWORD")
+
+# SQLite full-text index of collected pages and search hits (empty string disables it)
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "robin_index.db")
+
+# Per-run checkpoint directories used by `robin cli --resume RUN_ID`
+RUNS_DIR = os.getenv("ROBIN_RUNS_DIR", "runs")
+
+# Structured per-run exports (JSONL while running, Parquet when done) written with --export
+EXPORT_DIR = os.getenv("ROBIN_EXPORT_DIR", "exports")
+
+# Process-wide caps for the UI, service and batch mode: concurrent Tor streams across
+# all runs, and concurrent LLM calls per provider (e.g. "anthropic=2,ollama=1" overrides)
+TOR_MAX_STREAMS = int(os.getenv("ROBIN_MAX_TOR_STREAMS", "32"))
+LLM_MAX_CONCURRENCY = int(os.getenv("ROBIN_MAX_LLM_CALLS", "4"))
+LLM_PROVIDER_LIMITS = os.getenv("ROBIN_LLM_PROVIDER_LIMITS", "")
+
+# Default bounds for adaptive search/scrape concurrency (overridable per run)
+ADAPTIVE_MIN_THREADS = int(os.getenv("ROBIN_MIN_THREADS", "1"))
+ADAPTIVE_MAX_THREADS = int(os.getenv("ROBIN_MAX_THREADS", "32"))
+
+# Local inference (Ollama / llama.cpp): parallel requests the server runs at once
+# (0 asks the server), how long it keeps the model loaded between stages, and the
+# largest context window requested from Ollama
+LOCAL_LLM_SLOTS = int(os.getenv("ROBIN_LOCAL_LLM_SLOTS", "0"))
+LOCAL_KEEP_ALIVE = os.getenv("ROBIN_LOCAL_KEEP_ALIVE", "30m")
+LOCAL_MAX_CTX = int(os.getenv("ROBIN_LOCAL_MAX_CTX", "32768"))
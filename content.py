@@ -0,0 +1,270 @@
+"""
+Main-content extraction for scraped pages.
+
+html_to_blocks() splits a page into text blocks (paragraphs, list items, table
+cells, ...) and measures each block's link density and whether it sits inside
+navigation-like markup (nav, header, footer, aside, menus, cookie banners).
+Page text is stored one block per line, so nothing is lost for the indexes,
+exports and artifact extraction.
+
+When a page is cut down to the per-page summary budget, fill_budget() keeps
+the highest-value blocks instead of the first N characters: long,
+sentence-like, artifact-bearing text ranks first, link lists and banners rank
+last, and blocks known to be boilerplate for the page's host are left out
+unless they carry artifacts. A host's boilerplate is learned while pages are
+parsed. Blocks classified from markup are remembered, and so is any block
+that repeats across different pages of the same site (its template: menus,
+footers, captcha notices, rules boxes).
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup, Comment, Declaration, Doctype, NavigableString, ProcessingInstruction
+
+from ioc import iter_artifacts
+from metrics import registry
+
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "object", "head", "select", "button"}
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "br", "caption", "center", "dd", "details", "div", "dl",
+    "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr",
+    "html", "li", "main", "menu", "nav", "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot",
+    "th", "thead", "tr", "ul",
+}
+_NAV_TAGS = {"nav", "header", "footer", "aside", "menu", "form"}
+_NAV_ATTR = re.compile(
+    r"nav|menu|footer|header|sidebar|breadcrumb|cookie|consent|banner|captcha|login|signup|pagination|share|social",
+    re.IGNORECASE,
+)
+_BANNER_TEXT = re.compile(
+    r"cookie|captcha|javascript|enable js|all rights reserved|copyright|©|log ?in|sign ?up|register|"
+    r"forgot password|terms of service|privacy policy|back to top|powered by",
+    re.IGNORECASE,
+)
+_URL = re.compile(r"(?:https?://)?\b[a-z2-7]{16,56}\.onion\S*|https?://\S+", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"[.!?:;](?:\s|$)")
+
+TRUNCATION_MARK = "...(truncated)"
+
+
+class Block(NamedTuple):
+    text: str
+    link_chars: int
+    in_nav: bool
+
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / len(self.text) if self.text else 0.0
+
+
+def _attr_text(tag) -> str:
+    classes = tag.get("class") or []
+    return " ".join(classes if isinstance(classes, list) else [classes]) + " " + (tag.get("id") or "")
+
+
+def html_to_blocks(html: str) -> List[Block]:
+    """Visible text of a page as blocks in document order."""
+    soup = BeautifulSoup(html, "html.parser")
+    parts = []  # (block id, text, in link, in nav)
+    block = 0
+    # Iterative walk (onion pages are often malformed and deeply nested)
+    stack = [(iter(soup.children), False, False, True)]
+    while stack:
+        children, in_link, in_nav, is_block = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if is_block:
+                block += 1  # text after a closed block element starts a new block
+            continue
+        if isinstance(child, NavigableString):
+            if not isinstance(child, (Comment, Declaration, Doctype, ProcessingInstruction)) and child.strip():
+                parts.append((block, str(child), in_link, in_nav))
+            continue
+        name = child.name
+        if name in _SKIP_TAGS:
+            continue
+        if name in _BLOCK_TAGS:
+            block += 1
+        nav = in_nav or name in _NAV_TAGS or bool(_NAV_ATTR.search(_attr_text(child)))
+        stack.append((iter(child.children), in_link or name == "a", nav, name in _BLOCK_TAGS))
+
+    blocks = []
+    current, texts, link_chars, nav = None, [], 0, False
+    for block_id, text, in_link, in_nav in parts + [(None, "", False, False)]:
+        if block_id != current and texts:
+            joined = " ".join(" ".join(texts).split())
+            if joined:
+                blocks.append(Block(joined, min(link_chars, len(joined)), nav))
+            texts, link_chars, nav = [], 0, False
+        current = block_id
+        if text:
+            texts.append(text)
+            nav = nav or in_nav
+            if in_link:
+                link_chars += len(" ".join(text.split())) + 1
+    return blocks
+
+
+def fingerprint(text: str) -> str:
+    """Block identity across pages: case-, whitespace- and number-insensitive."""
+    normalized = re.sub(r"\d+", "0", " ".join(text.lower().split()))
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def is_boilerplate(block: Block) -> bool:
+    """Judge a block from its markup: link lists, navigation and short banners."""
+    size = len(block.text)
+    if block.link_density > 0.5:
+        return True
+    if block.in_nav and (size < 300 or block.link_density > 0.25):
+        return True
+    return size < 200 and bool(_BANNER_TEXT.search(block.text))
+
+
+class HostTemplates:
+    """
+    Boilerplate fingerprints learned per host: blocks judged from markup, and
+    blocks seen on at least `min_pages` different pages of the same host.
+    Bounded LRU over hosts and over fingerprints per host.
+    """
+
+    def __init__(self, min_pages: int = 2, max_hosts: int = 2000, max_blocks: int = 4000):
+        self.min_pages = min_pages
+        self.max_hosts = max_hosts
+        self.max_blocks = max_blocks
+        self._hosts: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _host(self, host: str) -> dict:
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = {"seen": OrderedDict(), "boilerplate": OrderedDict()}
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        self._hosts.move_to_end(host)
+        return entry
+
+    @staticmethod
+    def _remember(table: OrderedDict, key: str, value, limit: int) -> None:
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > limit:
+            table.popitem(last=False)
+
+    def learn(self, host: str, page: str, blocks: List[Block]) -> None:
+        """Record a parsed page of host (page identifies it, e.g. its path)."""
+        if not host:
+            return
+        with self._lock:
+            entry = self._host(host)
+            for block in blocks:
+                key = fingerprint(block.text)
+                pages: Set[str] = entry["seen"].get(key) or set()
+                if len(pages) < self.min_pages:
+                    pages.add(page)
+                self._remember(entry["seen"], key, pages, self.max_blocks)
+                if is_boilerplate(block) or len(pages) >= self.min_pages:
+                    if key not in entry["boilerplate"]:
+                        registry.inc("content_template_blocks_total")
+                    self._remember(entry["boilerplate"], key, True, self.max_blocks)
+
+    def boilerplate(self, host: str) -> Set[str]:
+        with self._lock:
+            entry = self._hosts.get(host)
+            return set(entry["boilerplate"]) if entry else set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+_templates = HostTemplates()
+
+
+def get_host_templates() -> HostTemplates:
+    return _templates
+
+
+def _host_and_page(url: Optional[str]):
+    parsed = urlparse(url or "")
+    return (parsed.hostname or "").lower(), parsed.path.rstrip("/") + ("?" + parsed.query if parsed.query else "")
+
+
+def extract_text(html: str, url: Optional[str] = None) -> str:
+    """Page text one block per line; with url, the blocks also train the host's template."""
+    blocks = html_to_blocks(html)
+    host, page = _host_and_page(url)
+    if host:
+        _templates.learn(host, page, blocks)
+    return "\n".join(block.text for block in blocks)
+
+
+def block_value(text: str, boilerplate: bool = False) -> float:
+    """
+    Information value of one line of page text, per the signals available
+    without markup: length, sentence structure, URL share and artifacts.
+    Known boilerplate is worth nothing unless it carries artifacts.
+    """
+    size = len(text)
+    if not size:
+        return 0.0
+    has_artifacts = any(kind not in ("domain", "onion") for kind, _ in iter_artifacts(text))
+    if boilerplate:
+        return 0.5 if has_artifacts else 0.0
+    url_share = sum(len(m) for m in _URL.findall(text)) / size
+    words = len(text.split())
+    value = min(words, 80) / 80
+    value *= 1.0 - min(url_share, 0.9)
+    if _SENTENCE_END.search(text):
+        value *= 1.3
+    if has_artifacts:
+        value += 0.6
+    if size < 200 and _BANNER_TEXT.search(text):
+        value *= 0.2
+    return value
+
+
+def fill_budget(text: str, max_chars: int, url: Optional[str] = None) -> str:
+    """
+    Cut page text (title on the first line, then one block per line) to about
+    max_chars, keeping the title and then the highest-value blocks, in page
+    order. Text that already fits is returned as is.
+    """
+    if len(text) <= max_chars:
+        return text
+    lines = text.split("\n")
+    if len(lines) == 1:
+        return text[:max_chars] + TRUNCATION_MARK
+
+    host, _ = _host_and_page(url)
+    known = _templates.boilerplate(host) if host else set()
+    title, blocks = lines[0][:max_chars], lines[1:]
+    remaining = max_chars - len(title)
+    values = [block_value(block, bool(known) and fingerprint(block) in known) for block in blocks]
+    ranked = sorted((i for i in range(len(blocks)) if values[i] > 0), key=lambda i: (-values[i], i))
+    chosen: Dict[int, str] = {}
+    skipped = []
+    seen = set()
+    for i in ranked:
+        key = fingerprint(blocks[i])
+        if key in seen:
+            continue  # repeated block within the page
+        seen.add(key)
+        if len(blocks[i]) + 1 <= remaining:
+            chosen[i] = blocks[i]
+            remaining -= len(blocks[i]) + 1
+        else:
+            skipped.append(i)
+    # Then the best block that didn't fit, clipped to the room left
+    if skipped and remaining >= 200:
+        chosen[skipped[0]] = blocks[skipped[0]][:remaining - 1]
+    kept = sum(len(b) for b in chosen.values())
+    registry.inc("content_chars_dropped_total", max(0, len(text) - len(title) - kept))
+    body = "\n".join(chosen[i] for i in sorted(chosen))
+    return f"{title}\n{body}{TRUNCATION_MARK}" if body else title + TRUNCATION_MARK
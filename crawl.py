@@ -0,0 +1,290 @@
+"""
+Bounded-depth crawl on top of the scrape primitives: starting from the filtered
+search results, onion links found in fetched pages are queued in a priority
+frontier scored by relevance to the refined query, and fetched under a page
+budget, a max depth and per-host politeness limits.
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from governor import make_executor
+from metrics import registry, record_error
+from records import SearchResult
+from scrape import fetch_html, html_to_text, truncate_content
+
+
+_ANCHOR = re.compile(r"<a\s[^>]*?href\s*=\s*[\"']([^\"'#>]+)[^>]*>(.*?)</a\s*>", re.IGNORECASE | re.DOTALL)
+_BARE_ONION_URL = re.compile(r"https?://[a-z2-7]{56}\.onion(?:/[^\s\"'<>]*)?", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+_ONION_HOST = re.compile(r"^[a-z2-7]{56}\.onion$")
+_SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".css", ".js",
+    ".zip", ".rar", ".7z", ".gz", ".tar", ".pdf", ".mp4", ".mp3", ".exe", ".apk",
+)
+_SKIP_PATHS = re.compile(r"/(logout|signout|login|register|signup|captcha)\b", re.IGNORECASE)
+
+DEPTH_DECAY = 0.8
+
+
+def _terms(text: str) -> set:
+    return {t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 2}
+
+
+def relevance(query_terms: set, text: str) -> float:
+    """Fraction of query terms that appear in text (anchor text, URL path, ...)."""
+    if not query_terms:
+        return 0.0
+    return len(query_terms & _terms(text)) / len(query_terms)
+
+
+def extract_links(html: str, base_url: str) -> List[Tuple[str, str]]:
+    """
+    (absolute onion URL, anchor text) pairs from a page: <a href> links resolved
+    against the page URL plus bare onion URLs in the text (common on paste sites).
+    Static assets and login/logout style paths are dropped.
+    """
+    found = {}
+    for href, anchor in _ANCHOR.findall(html):
+        url = urldefrag(urljoin(base_url, href.strip()))[0]
+        found.setdefault(url, " ".join(_TAG.sub(" ", anchor).split()))
+    for url in _BARE_ONION_URL.findall(html):
+        found.setdefault(urldefrag(url)[0], "")
+
+    links = []
+    for url, anchor in found.items():
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not _ONION_HOST.match(parsed.hostname or ""):
+            continue
+        path = parsed.path.lower()
+        if path.endswith(_SKIP_EXTENSIONS) or _SKIP_PATHS.search(path):
+            continue
+        links.append((url, anchor))
+    return links
+
+
+class CrawlFrontier:
+    """
+    Priority queue of URLs to fetch (best score first) with URL de-duplication.
+    At most max_in_memory entries are kept in the heap; beyond that the
+    lowest-scored half is spilled to a JSONL file in spill_dir and read back
+    once the in-memory queue runs low. Queued URLs are SearchResult records
+    (interned hosts) and the seen-set holds 8-byte digests, not URL strings.
+    """
+
+    def __init__(self, max_in_memory: int = 5000, spill_dir: Optional[str] = None):
+        self.max_in_memory = max(2, max_in_memory)
+        self._heap: List[tuple] = []
+        self._seen = set()
+        self._seq = itertools.count()
+        self._spill_dir = spill_dir
+        self._own_spill_dir = False
+        self._spills: List[Tuple[float, str, int]] = []  # (best score, path, count)
+
+    def __len__(self) -> int:
+        return len(self._heap) + sum(count for _, _, count in self._spills)
+
+    @staticmethod
+    def _key(url: str) -> bytes:
+        return hashlib.blake2b(url.rstrip("/").lower().encode("utf-8"), digest_size=8).digest()
+
+    def mark_seen(self, url: str) -> None:
+        """Treat url as already queued (e.g. fetched by an earlier, interrupted crawl)."""
+        self._seen.add(self._key(url))
+
+    def push(self, url: str, title: str, depth: int, score: float) -> bool:
+        key = self._key(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        heapq.heappush(self._heap, (-score, next(self._seq), depth, SearchResult(url, title)))
+        if len(self._heap) > self.max_in_memory:
+            self._spill()
+        return True
+
+    def _spill(self) -> None:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="robin_frontier_")
+            self._own_spill_dir = True
+        entries = sorted(self._heap)
+        keep = self.max_in_memory // 2
+        self._heap, spilled = entries[:keep], entries[keep:]
+        heapq.heapify(self._heap)
+        path = os.path.join(self._spill_dir, f"frontier_{next(self._seq)}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for neg_score, _, depth, record in spilled:
+                f.write(json.dumps([-neg_score, depth, record.link, record.title], ensure_ascii=False) + "\n")
+        self._spills.append((-spilled[0][0], path, len(spilled)))
+        registry.inc("crawl_frontier_spills_total")
+
+    def _refill(self) -> None:
+        # Reload the spill file holding the best remaining entry
+        self._spills.sort()
+        _, path, _ = self._spills.pop()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                score, depth, url, title = json.loads(line)
+                heapq.heappush(self._heap, (-score, next(self._seq), depth, SearchResult(url, title)))
+        os.remove(path)
+
+    def pop(self, ready: Callable[[str], bool], lookahead: int = 64) -> Optional[Tuple[str, str, int, float]]:
+        """
+        Pop the best (url, title, depth, score) whose host passes ready(host).
+        Entries skipped because their host is busy are put back.
+        """
+        if self._spills and len(self._heap) < self.max_in_memory // 4:
+            self._refill()
+        skipped, chosen = [], None
+        while self._heap and len(skipped) < lookahead:
+            entry = heapq.heappop(self._heap)
+            if ready(entry[3].host):
+                chosen = entry
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        if chosen is None:
+            return None
+        neg_score, _, depth, record = chosen
+        return record.link, record.title, depth, -neg_score
+
+    def close(self) -> None:
+        for _, path, _ in self._spills:
+            if os.path.exists(path):
+                os.remove(path)
+        self._spills = []
+        if self._own_spill_dir and self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+
+
+def fetch_page(url_data) -> Tuple[str, str, List[Tuple[str, str]]]:
+    """
+    Like scrape_single, but also returns the page's onion links.
+    Returns (url, title and text blocks one per line or the bare title on failure, links).
+    """
+    url = url_data['link']
+    html = fetch_html(url)
+    if html is None:
+        return url, url_data['title'], []
+    return url, f"{url_data['title']}\n{html_to_text(html, url)}", extract_links(html, url)
+
+
+def crawl(
+    seeds: List[dict],
+    refined_query: str,
+    max_workers: int = 5,
+    max_depth: int = 1,
+    max_pages: int = 60,
+    per_host: int = 2,
+    host_delay: float = 1.0,
+    max_in_memory: int = 5000,
+    spill_dir: Optional[str] = None,
+    on_page: Optional[Callable[[str, str], None]] = None,
+    cancel=None,
+    limiter=None,
+    done: Optional[Dict[str, Tuple[int, List[Tuple[str, str]]]]] = None,
+    on_links: Optional[Callable[[str, int, List[Tuple[str, str]]], None]] = None,
+    cache=None,
+) -> Dict[str, str]:
+    """
+    Fetch the seed results, then follow onion links breadth- and relevance-first
+    up to max_depth hops and max_pages fetches in total. At most per_host
+    requests run against one host at a time, spaced at least host_delay seconds
+    apart. Returns {url: text} truncated like scrape_multiple; on_page receives
+    the full text of every fetched page. Setting the cancel event stops the
+    crawl and abandons in-flight fetches. With an AdaptiveLimiter, the number of
+    fetches in flight follows it instead of max_workers. With a ScrapeCache,
+    pages fetched by other runs sharing it are reused. To resume, done maps pages fetched earlier to (depth, links): they are not
+    fetched again (nor returned) and count against max_pages, and their links
+    are queued again. on_links(url, depth, links) receives the links of every
+    page fetched successfully, for that purpose.
+    """
+    query_terms = _terms(refined_query.replace("+", " "))
+    frontier = CrawlFrontier(max_in_memory=max_in_memory, spill_dir=spill_dir)
+    done = done or {}
+
+    def push_links(links, depth, score):
+        for link, anchor in links:
+            link_score = 0.7 * relevance(query_terms, f"{anchor} {urlparse(link).path}") + 0.3 * score
+            frontier.push(link, anchor or link, depth + 1, link_score * DEPTH_DECAY ** (depth + 1))
+
+    for url in done:
+        frontier.mark_seen(url)
+    for seed in seeds:
+        frontier.push(seed["link"], seed.get("title", ""), 0, 1.0)
+    # Earlier pages' scores aren't kept; their depth decays them as before
+    for url, (depth, links) in done.items():
+        if depth < max_depth:
+            push_links(links, depth, DEPTH_DECAY ** depth)
+
+    results: Dict[str, str] = {}
+    host_active: Counter = Counter()
+    host_next: Dict[str, float] = {}
+    active = {}
+    started = len(done)
+
+    def host_ready(host: str) -> bool:
+        return host_active[host] < per_host and host_next.get(host, 0.0) <= time.monotonic()
+
+    executor = make_executor(max_workers, limiter=limiter)
+
+    def capacity() -> int:
+        return limiter.limit if limiter is not None else max_workers
+    try:
+        with registry.timer("stage_seconds", stage="crawl"):
+            while active or (len(frontier) and started < max_pages):
+                if cancel is not None and cancel.is_set():
+                    break
+                while len(active) < capacity() and started < max_pages:
+                    entry = frontier.pop(host_ready)
+                    if entry is None:
+                        break
+                    url, title, depth, score = entry
+                    host = urlparse(url).hostname or ""
+                    host_active[host] += 1
+                    host_next[host] = time.monotonic() + host_delay
+                    url_data = {"link": url, "title": title}
+                    if cache is not None:
+                        future = executor.submit(cache.fetch, url_data, fetch_page)
+                    else:
+                        future = executor.submit(fetch_page, url_data)
+                    active[future] = (host, title, depth, score)
+                    started += 1
+
+                if not active:
+                    # Everything queued is on hosts still inside their politeness delay
+                    pending = [t for t in host_next.values() if t > time.monotonic()]
+                    time.sleep(max(0.01, min(pending) - time.monotonic()) if pending else 0.01)
+                    continue
+
+                done, _ = wait(list(active), timeout=min(host_delay, 0.25) or 0.25, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, title, depth, score = active.pop(future)
+                    host_active[host] -= 1
+                    try:
+                        url, content, links = future.result()
+                    except Exception as e:
+                        record_error("scrape", e)
+                        continue
+                    registry.inc("crawl_pages_total", depth=str(depth))
+                    if on_page is not None:
+                        on_page(url, content)
+                    if on_links is not None and (links or content != title):
+                        on_links(url, depth, links)
+                    results[url] = truncate_content(content, url=url)
+                    if depth < max_depth:
+                        push_links(links, depth, score)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        frontier.close()
+    return results
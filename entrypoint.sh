@@ -1,6 +1,6 @@
 #!/bin/bash
 echo "Starting Tor..."
-tor &
+tor --ControlPort 9051 --CookieAuthentication 1 &
 
 echo "Waiting for Tor to be ready (127.0.0.1:9050)..."
 
@@ -17,6 +17,14 @@ if [ $? -ne 0 ]; then
   exit 1
 fi
 
+echo "Tor is listening; waiting for bootstrap and prewarming search engines..."
+if [ "${ROBIN_SKIP_WARMUP:-0}" = "1" ]; then
+  echo "Skipping warmup (ROBIN_SKIP_WARMUP=1)."
+elif ! python main.py warmup; then
+  echo "ERROR: Tor did not finish bootstrapping."
+  exit 1
+fi
+
 echo "Tor is ready."
 echo "Starting Robin: AI-Powered Dark Web OSINT Tool..."
 exec python main.py "$@"
@@ -0,0 +1,183 @@
+"""
+Structured export of run data for downstream analytics.
+
+While a run is in progress every record is appended to EXPORT_DIR/<run_id>.jsonl
+as soon as it is produced: search hits (per engine), filtered selections,
+scraped pages (full text) and extracted artifacts. When the run ends the JSONL
+is compacted into EXPORT_DIR/<run_id>.parquet (zstd) with the fixed schema
+below, so a directory of runs loads as one dataset, e.g.
+pyarrow.dataset.dataset("exports", format="parquet"). Parquet needs pyarrow
+(in requirements.txt); where it is missing the JSONL file is kept as the export.
+
+Every record has the same columns (null where not applicable):
+    run_id          run ID (the checkpoint run ID for `robin cli`)
+    seq             record number within the run
+    ts              unix time the record was produced
+    kind            'run' | 'search_hit' | 'selection' | 'page' | 'artifact'
+    query           the user query
+    engine          search engine host ('local' for local index hits)
+    rank            position in the engine's results / in the selection
+    url             result, page or sighting URL
+    title           result title
+    text            full page text (page records)
+    chars           length of text
+    artifact_type   artifact kind (email, btc, onion, ..., 'watchlist')
+    artifact_value  normalized artifact value or watchlist term
+    count           occurrences of the artifact on the page
+    detail          JSON object with kind-specific extras (e.g. refined_query)
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Iterable, Mapping, Optional
+
+from config import EXPORT_DIR
+
+
+SCHEMA_FIELDS = (
+    ("run_id", "string"),
+    ("seq", "int64"),
+    ("ts", "float64"),
+    ("kind", "string"),
+    ("query", "string"),
+    ("engine", "string"),
+    ("rank", "int32"),
+    ("url", "string"),
+    ("title", "string"),
+    ("text", "large_string"),
+    ("chars", "int64"),
+    ("artifact_type", "string"),
+    ("artifact_value", "string"),
+    ("count", "int64"),
+    ("detail", "string"),
+)
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in SCHEMA_FIELDS])
+
+
+class RunExporter:
+    """
+    Append-only JSONL record stream for one run. Safe to call from scraper
+    threads. Reopening the same run ID (a resumed run) appends to its export.
+    """
+
+    def __init__(self, run_id: str, query: str, directory: str = EXPORT_DIR):
+        self.run_id = run_id
+        self.query = query
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.jsonl_path = os.path.join(directory, f"{run_id}.jsonl")
+        self.parquet_path = os.path.join(directory, f"{run_id}.parquet")
+        self._seq = itertools.count(_next_seq(self.jsonl_path, self.parquet_path))
+        self._lock = threading.Lock()
+        self._file = open(self.jsonl_path, "a", encoding="utf-8")
+        self.records = 0
+
+    def write(self, kind: str, **fields) -> None:
+        detail = fields.pop("detail", None)
+        with self._lock:
+            record = {"run_id": self.run_id, "seq": next(self._seq), "ts": time.time(), "kind": kind, "query": self.query}
+            record.update(fields)
+            if detail:
+                record["detail"] = json.dumps(detail, ensure_ascii=False)
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.records += 1
+
+    def run_info(self, **detail) -> None:
+        self.write("run", detail=detail)
+
+    def search_hits(self, engine: str, results: Iterable[Mapping]) -> None:
+        for rank, res in enumerate(results, start=1):
+            self.write("search_hit", engine=engine, rank=rank, url=res["link"], title=res.get("title"))
+
+    def selections(self, results: Iterable[Mapping]) -> None:
+        for rank, res in enumerate(results, start=1):
+            self.write("selection", rank=rank, url=res["link"], title=res.get("title"))
+
+    def page(self, url: str, text: str) -> None:
+        self.write("page", url=url, text=text, chars=len(text))
+
+    def artifacts(self, extracted: dict, urls: Optional[set] = None) -> None:
+        """Write extract_page_artifacts() output, limited to pages in urls if given."""
+        for kind, values in extracted.get("artifacts", {}).items():
+            for value, sources in values.items():
+                for url in sources:
+                    if urls is None or url in urls:
+                        self.write("artifact", url=url, artifact_type=kind, artifact_value=value, count=1)
+        for term, per_url in extracted.get("watchlist", {}).items():
+            for url, count in per_url.items():
+                if urls is None or url in urls:
+                    self.write("artifact", url=url, artifact_type="watchlist", artifact_value=term, count=count)
+
+    def close(self, compact: bool = True) -> Optional[str]:
+        """
+        Close the stream and, if requested, compact it to Parquet.
+        Returns the Parquet path, or None when the JSONL file is kept instead.
+        """
+        with self._lock:
+            if self._file.closed:
+                return None
+            self._file.close()
+        return compact_run(self.jsonl_path, self.parquet_path) if compact else None
+
+
+def _next_seq(jsonl_path: str, parquet_path: str) -> int:
+    # Continue numbering after records already exported for this run
+    count = 0
+    if os.path.isfile(jsonl_path):
+        with open(jsonl_path, "rb") as f:
+            count += sum(1 for _ in f)
+    if os.path.isfile(parquet_path):
+        try:
+            import pyarrow.parquet as pq
+
+            count += pq.ParquetFile(parquet_path).metadata.num_rows
+        except ImportError:
+            pass
+    return count
+
+
+def compact_run(jsonl_path: str, parquet_path: str, batch_rows: int = 2000) -> Optional[str]:
+    """
+    Merge a run's JSONL records into its Parquet file (rows already in the
+    Parquet file are kept) and delete the JSONL. Returns None, keeping the
+    JSONL, when pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+
+    schema = parquet_schema()
+    names = [name for name, _ in SCHEMA_FIELDS]
+    tmp_path = parquet_path + ".tmp"
+    with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        if os.path.isfile(parquet_path):
+            for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=batch_rows):
+                writer.write_batch(batch.cast(schema) if batch.schema != schema else batch)
+        if os.path.isfile(jsonl_path):
+            rows = []
+            with open(jsonl_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    rows.append({name: record.get(name) for name in names})
+                    if len(rows) >= batch_rows:
+                        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                        rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    os.replace(tmp_path, parquet_path)
+    if os.path.isfile(jsonl_path):
+        os.remove(jsonl_path)
+    return parquet_path
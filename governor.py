@@ -0,0 +1,250 @@
+"""
+Process-wide concurrency governor for processes that run several investigations
+at once (the Streamlit UI, the service, batch mode).
+
+Inside a governed session (see session()), make_executor() hands out views on
+one shared pool of Tor fetch workers instead of private thread pools. The pool
+size is the global cap on concurrent Tor streams (ROBIN_MAX_TOR_STREAMS); queued
+fetches are taken round-robin across sessions, so one large run cannot starve
+the others, and each run still stays within its own max_workers. LLM calls made
+inside a session hold one of a fixed number of slots for their provider
+(ROBIN_MAX_LLM_CALLS, overridable per provider via ROBIN_LLM_PROVIDER_LIMITS);
+local Ollama / llama.cpp servers default to their own parallel slot count.
+
+Outside a session (plain `robin cli`, benchmarks) nothing changes: executors are
+private ThreadPoolExecutors and LLM calls are not limited.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait as futures_wait
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from adaptive import AdaptiveExecutor, AdaptiveLimiter
+from config import LLM_MAX_CONCURRENCY, LLM_PROVIDER_LIMITS, TOR_MAX_STREAMS
+from local_llm import server_slots
+from metrics import registry
+
+
+_session: contextvars.ContextVar = contextvars.ContextVar("robin_session", default=None)
+
+
+class _Lane:
+    """The tasks of one executor view: its session and its own concurrency limit."""
+
+    __slots__ = ("session", "limit", "active", "futures")
+
+    def __init__(self, session: str, limit: int):
+        self.session = session
+        self.limit = max(1, limit)
+        self.active = 0
+        self.futures = set()
+
+
+class SharedPool:
+    """
+    Fixed set of worker threads shared by all sessions. Workers take the next
+    task round-robin across sessions with queued work, skipping lanes that are
+    already at their own limit.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._threads = []
+
+    def executor(self, max_workers: int, session: str) -> "PoolExecutor":
+        return PoolExecutor(self, _Lane(session, max_workers))
+
+    def _submit(self, lane: _Lane, fn, args, kwargs) -> Future:
+        future = Future()
+        with self._cond:
+            lane.futures.add(future)
+            self._queues.setdefault(lane.session, deque()).append((lane, future, fn, args, kwargs, time.perf_counter()))
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name=f"robin-tor-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _next_task(self):
+        # Called with the lock held; the served session moves to the back of the rotation
+        for session, tasks in self._queues.items():
+            for i, task in enumerate(tasks):
+                lane = task[0]
+                if lane.active < lane.limit:
+                    del tasks[i]
+                    if tasks:
+                        self._queues.move_to_end(session)
+                    else:
+                        del self._queues[session]
+                    lane.active += 1
+                    return task
+        return None
+
+    def _drop_queued(self, lane: _Lane) -> None:
+        with self._cond:
+            tasks = self._queues.get(lane.session)
+            if not tasks:
+                return
+            for task in [t for t in tasks if t[0] is lane]:
+                tasks.remove(task)
+                task[1].cancel()
+                lane.futures.discard(task[1])
+            if not tasks:
+                del self._queues[lane.session]
+
+    def queued(self) -> Dict[str, int]:
+        with self._cond:
+            return {session: len(tasks) for session, tasks in self._queues.items()}
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None:
+                    self._cond.wait()
+                    task = self._next_task()
+            lane, future, fn, args, kwargs, queued_at = task
+            registry.observe("governor_queue_seconds", time.perf_counter() - queued_at)
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self._cond:
+                    lane.active -= 1
+                    lane.futures.discard(future)
+                    self._cond.notify_all()
+
+
+class PoolExecutor(Executor):
+    """
+    Executor view on a SharedPool for one run: at most max_workers of its tasks
+    run at once. shutdown(cancel_futures=True) drops only this view's queued tasks.
+    """
+
+    def __init__(self, pool: SharedPool, lane: _Lane):
+        self._pool = pool
+        self._lane = lane
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return self._pool._submit(self._lane, fn, args, kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._shutdown = True
+        if cancel_futures:
+            self._pool._drop_queued(self._lane)
+        if wait:
+            with self._pool._cond:
+                pending = list(self._lane.futures)
+            futures_wait(pending)
+
+
+def provider_of(llm) -> str:
+    """
+    Provider key used for LLM call limits: openai, anthropic, google, ollama,
+    openrouter, or the host of a custom OpenAI-compatible base URL.
+    """
+    name = type(llm).__name__.lower().replace("chat", "")
+    base_url = str(getattr(llm, "openai_api_base", None) or getattr(llm, "base_url", None) or "")
+    if "openrouter" in base_url:
+        return "openrouter"
+    if name == "openai" and base_url and "api.openai.com" not in base_url:
+        return urlparse(base_url).netloc or name
+    return {"googlegenerativeai": "google"}.get(name, name)
+
+
+def parse_provider_limits(spec: Optional[str]) -> Dict[str, int]:
+    """'anthropic=2,openai=8' -> {'anthropic': 2, 'openai': 8}; malformed entries are ignored."""
+    limits = {}
+    for item in (spec or "").split(","):
+        provider, _, value = item.partition("=")
+        if provider.strip() and value.strip().isdigit():
+            limits[provider.strip().lower()] = max(1, int(value))
+    return limits
+
+
+class Governor:
+    """Shared Tor fetch pool plus per-provider LLM call slots."""
+
+    def __init__(self, tor_streams: int = TOR_MAX_STREAMS, llm_calls: int = LLM_MAX_CONCURRENCY,
+                 provider_limits: Optional[Dict[str, int]] = None):
+        self.pool = SharedPool(tor_streams)
+        self.llm_calls = max(1, llm_calls)
+        self.provider_limits = provider_limits if provider_limits is not None else parse_provider_limits(LLM_PROVIDER_LIMITS)
+        self._llm_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def llm_semaphore(self, provider: str, default: Optional[int] = None) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._llm_slots:
+                limit = self.provider_limits.get(provider, default or self.llm_calls)
+                self._llm_slots[provider] = threading.BoundedSemaphore(limit)
+            return self._llm_slots[provider]
+
+
+_default_governor: Optional[Governor] = None
+_default_lock = threading.Lock()
+
+
+def get_governor() -> Governor:
+    global _default_governor
+    with _default_lock:
+        if _default_governor is None:
+            _default_governor = Governor()
+        return _default_governor
+
+
+@contextmanager
+def session(session_id: str):
+    """Run the enclosed pipeline (on this thread) as a governed session."""
+    token = _session.set(str(session_id))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session() -> Optional[str]:
+    return _session.get()
+
+
+def make_executor(max_workers: int, limiter: Optional[AdaptiveLimiter] = None) -> Executor:
+    """
+    Executor for Tor fetches: a shared-pool view inside a session, else a private
+    pool. With an AdaptiveLimiter, concurrency follows the limiter (up to its max)
+    instead of max_workers.
+    """
+    if limiter is not None:
+        return AdaptiveExecutor(make_executor(limiter.max_limit), limiter)
+    session_id = _session.get()
+    if session_id is None:
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return get_governor().pool.executor(max_workers, session_id)
+
+
+@contextmanager
+def llm_slot(llm):
+    """Hold one of the provider's LLM call slots (inside a session) for the enclosed call."""
+    if _session.get() is None:
+        yield
+        return
+    provider = provider_of(llm)
+    semaphore = get_governor().llm_semaphore(provider, server_slots(llm))
+    started = time.perf_counter()
+    with semaphore:
+        registry.observe("llm_slot_wait_seconds", time.perf_counter() - started, provider=provider)
+        yield
@@ -0,0 +1,437 @@
+"""
+Local, deterministic extraction of investigation artifacts (IOCs) from scraped text.
+
+All patterns are compiled once into a single alternation so each page is scanned
+in one pass, and every candidate is validated before it is reported (Base58Check
+and Bech32 checksums for Bitcoin, Keccak checksums for Monero and mixed-case
+Ethereum addresses, the v3 onion address checksum, etc.). A multi-pattern
+Aho-Corasick matcher handles analyst watchlists in a single pass per page.
+"""
+import base64
+import hashlib
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import WATCHLIST_FILE
+
+
+# --- Keccak-256 (original padding, as used by Monero and Ethereum) ---
+
+_KECCAK_RC = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_KECCAK_ROT = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+_MASK64 = (1 << 64) - 1
+
+
+def _rol64(value: int, shift: int) -> int:
+    shift %= 64
+    return ((value << shift) | (value >> (64 - shift))) & _MASK64
+
+
+def _keccak_f(state: List[int]) -> List[int]:
+    for rc in _KECCAK_RC:
+        c = [state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rol64(c[(x + 1) % 5], 1) for x in range(5)]
+        state = [state[i] ^ d[i % 5] for i in range(25)]
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = _rol64(state[x + 5 * y], _KECCAK_ROT[x][y])
+        state = [
+            b[i] ^ ((~b[(i + 1) % 5 + 5 * (i // 5)]) & b[(i + 2) % 5 + 5 * (i // 5)])
+            for i in range(25)
+        ]
+        state[0] ^= rc
+    return state
+
+
+def keccak256(data: bytes) -> bytes:
+    """
+    Keccak-256 digest. Note this is NOT hashlib.sha3_256 (different padding).
+    """
+    rate = 136
+    padded = bytearray(data) + b"\x01"
+    padded += b"\x00" * (-len(padded) % rate)
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for offset in range(0, len(padded), rate):
+        block = padded[offset:offset + rate]
+        for i in range(rate // 8):
+            state[i] ^= int.from_bytes(block[i * 8:(i + 1) * 8], "little")
+        state = _keccak_f(state)
+    return b"".join(state[i].to_bytes(8, "little") for i in range(4))
+
+
+# --- Validators ---
+
+_B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INDEX = {c: i for i, c in enumerate(_B58_ALPHABET)}
+
+
+def _b58decode(s: str) -> Optional[bytes]:
+    num = 0
+    for ch in s:
+        idx = _B58_INDEX.get(ch)
+        if idx is None:
+            return None
+        num = num * 58 + idx
+    body = num.to_bytes((num.bit_length() + 7) // 8, "big") if num else b""
+    pad = len(s) - len(s.lstrip("1"))
+    return b"\x00" * pad + body
+
+
+def is_valid_btc_base58(address: str) -> bool:
+    """Validate a legacy (P2PKH/P2SH) Bitcoin address via its Base58Check checksum."""
+    raw = _b58decode(address)
+    if raw is None or len(raw) != 25 or raw[0] not in (0x00, 0x05):
+        return False
+    return hashlib.sha256(hashlib.sha256(raw[:-4]).digest()).digest()[:4] == raw[-4:]
+
+
+_BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2BC830A3
+
+
+def _bech32_polymod(values: Iterable[int]) -> int:
+    gen = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+    chk = 1
+    for v in values:
+        top = chk >> 25
+        chk = ((chk & 0x1FFFFFF) << 5) ^ v
+        for i in range(5):
+            if (top >> i) & 1:
+                chk ^= gen[i]
+    return chk
+
+
+def is_valid_btc_bech32(address: str) -> bool:
+    """Validate a SegWit Bitcoin address (Bech32 for v0, Bech32m for v1+)."""
+    if address.lower() != address and address.upper() != address:
+        return False
+    address = address.lower()
+    if not 14 <= len(address) <= 74:
+        return False
+    hrp, _, data_part = address.rpartition("1")
+    if hrp != "bc" or len(data_part) < 7:
+        return False
+    try:
+        data = [_BECH32_CHARSET.index(c) for c in data_part]
+    except ValueError:
+        return False
+    hrp_expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    const = _bech32_polymod(hrp_expanded + data)
+    witness_version = data[0]
+    if witness_version > 16:
+        return False
+    return const == (_BECH32_CONST if witness_version == 0 else _BECH32M_CONST)
+
+
+_XMR_FULL_BLOCK = 8
+_XMR_ENCODED_BLOCK_SIZES = [0, 2, 3, 5, 6, 7, 9, 10, 11]
+
+
+def _xmr_b58decode(s: str) -> Optional[bytes]:
+    out = bytearray()
+    full_chars = _XMR_ENCODED_BLOCK_SIZES[_XMR_FULL_BLOCK]
+    for offset in range(0, len(s), full_chars):
+        chunk = s[offset:offset + full_chars]
+        try:
+            size = _XMR_ENCODED_BLOCK_SIZES.index(len(chunk))
+        except ValueError:
+            return None
+        num = 0
+        for ch in chunk:
+            idx = _B58_INDEX.get(ch)
+            if idx is None:
+                return None
+            num = num * 58 + idx
+        if num >= 1 << (8 * size):
+            return None
+        out += num.to_bytes(size, "big")
+    return bytes(out)
+
+
+def is_valid_xmr(address: str) -> bool:
+    """Validate a Monero standard/subaddress (95 chars) or integrated (106 chars) address."""
+    if len(address) not in (95, 106):
+        return False
+    raw = _xmr_b58decode(address)
+    if raw is None or len(raw) not in (69, 77):
+        return False
+    return keccak256(raw[:-4])[:4] == raw[-4:]
+
+
+def is_valid_eth(address: str) -> bool:
+    """Validate an Ethereum address; mixed-case addresses must pass the EIP-55 checksum."""
+    hex_part = address[2:]
+    if len(hex_part) != 40:
+        return False
+    if hex_part.lower() == hex_part or hex_part.upper() == hex_part:
+        return True
+    digest = keccak256(hex_part.lower().encode("ascii")).hex()
+    for ch, nibble in zip(hex_part, digest):
+        if ch.isalpha() and (ch.isupper() != (int(nibble, 16) >= 8)):
+            return False
+    return True
+
+
+def is_valid_onion_v3(host: str) -> bool:
+    """Validate a v3 onion address: 32-byte key, 2-byte checksum, version 3."""
+    label = host.lower()
+    if label.endswith(".onion"):
+        label = label[:-len(".onion")]
+    label = label.rsplit(".", 1)[-1]
+    if len(label) != 56:
+        return False
+    try:
+        raw = base64.b32decode(label.upper())
+    except ValueError:
+        return False
+    pubkey, checksum, version = raw[:32], raw[32:34], raw[34:]
+    if version != b"\x03":
+        return False
+    expected = hashlib.sha3_256(b".onion checksum" + pubkey + version).digest()[:2]
+    return checksum == expected
+
+
+_FILE_EXTENSION_TLDS = {"py", "md", "sh", "js", "rs", "pl", "cs", "ts", "gz", "so", "db", "7z"}
+_GENERIC_TLDS = {
+    "com", "net", "org", "info", "biz", "edu", "gov", "mil", "int", "xyz", "top",
+    "online", "site", "club", "shop", "store", "app", "dev", "tech", "live", "pro",
+    "link", "icu", "vip", "cloud", "space", "website", "email", "onl", "bit", "i2p",
+}
+
+
+def _is_plausible_domain(domain: str) -> bool:
+    tld = domain.rsplit(".", 1)[-1]
+    if tld == "onion":
+        return False
+    if len(tld) == 2:
+        return tld not in _FILE_EXTENSION_TLDS
+    return tld in _GENERIC_TLDS
+
+
+def _is_plausible_phone(phone: str) -> bool:
+    digits = sum(ch.isdigit() for ch in phone)
+    return 8 <= digits <= 15
+
+
+# --- Single-pass extraction ---
+
+# Order matters: more specific alternatives must come first so, e.g., an email's
+# domain is not reported separately and an onion host is not read as a domain.
+_ARTIFACT_PATTERN = re.compile(
+    r"(?P<pgp_fingerprint>\b(?:[0-9A-Fa-f]{4}[ ]{1,2}){9}[0-9A-Fa-f]{4}\b)"
+    r"|(?P<email>(?i:\b[a-z0-9._%+-]+@(?:[a-z0-9-]+\.)+[a-z]{2,24}\b))"
+    r"|(?P<onion>(?i:\b(?:[a-z0-9-]+\.)*[a-z2-7]{56}\.onion\b))"
+    r"|(?P<btc_bech32>\b(?:bc1|BC1)[02-9ac-hj-np-zAC-HJ-NP-Z]{11,71}\b)"
+    r"|(?P<eth>\b0x[0-9a-fA-F]{40}\b)"
+    r"|(?P<xmr>\b[48][1-9A-HJ-NP-Za-km-z]{94}(?:[1-9A-HJ-NP-Za-km-z]{11})?\b)"
+    r"|(?P<btc>\b[13][1-9A-HJ-NP-Za-km-z]{25,34}\b)"
+    r"|(?P<phone>(?<![\w+])\+\d[\d ().-]{6,20}\d\b)"
+    r"|(?P<domain>(?i:\b(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24}\b))"
+)
+
+# kind -> (validator, normalizer)
+_ARTIFACT_RULES = {
+    "pgp_fingerprint": (lambda v: True, lambda v: re.sub(r"\s+", "", v).upper()),
+    "email": (lambda v: True, str.lower),
+    "onion": (is_valid_onion_v3, str.lower),
+    "btc_bech32": (is_valid_btc_bech32, str.lower),
+    "eth": (is_valid_eth, str.lower),
+    "xmr": (is_valid_xmr, lambda v: v),
+    "btc": (is_valid_btc_base58, lambda v: v),
+    "phone": (_is_plausible_phone, lambda v: "+" + re.sub(r"\D", "", v)),
+    "domain": (_is_plausible_domain, str.lower),
+}
+
+# Report-facing artifact categories
+ARTIFACT_LABELS = {
+    "email": "Emails",
+    "btc": "Bitcoin addresses",
+    "xmr": "Monero addresses",
+    "eth": "Ethereum addresses",
+    "onion": "Onion services (v3)",
+    "domain": "Clearnet domains",
+    "phone": "Phone numbers",
+    "pgp_fingerprint": "PGP fingerprints",
+}
+
+
+def iter_artifacts(text: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield validated (kind, normalized_value) pairs from text in a single regex pass.
+    SegWit addresses are reported under the 'btc' kind alongside legacy addresses.
+    """
+    for match in _ARTIFACT_PATTERN.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+        validator, normalizer = _ARTIFACT_RULES[kind]
+        if kind == "domain":
+            value = value.lower()
+        if not validator(value):
+            continue
+        yield ("btc" if kind == "btc_bech32" else kind), normalizer(value)
+
+
+def extract_artifacts(text: str) -> Dict[str, List[str]]:
+    """
+    Return validated, de-duplicated artifacts found in text grouped by kind.
+    """
+    found: Dict[str, Dict[str, None]] = {}
+    for kind, value in iter_artifacts(text):
+        found.setdefault(kind, {})[value] = None
+    return {kind: list(values) for kind, values in found.items()}
+
+
+# --- Watchlist matching (Aho-Corasick) ---
+
+class WatchlistMatcher:
+    """
+    Case-insensitive Aho-Corasick automaton over a set of watchlist terms.
+    Matching a page costs one pass over its text regardless of watchlist size.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for term in terms:
+            term = term.strip()
+            if term and term.lower() not in {t.lower() for t in self.terms}:
+                self._add(term)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _add(self, term: str) -> None:
+        node = 0
+        for ch in term.lower():
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.terms))
+        self.terms.append(term)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (start_offset, term) for every (possibly overlapping) occurrence.
+        """
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for pos, ch in enumerate(text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term_idx in out[node]:
+                term = self.terms[term_idx]
+                yield pos - len(term) + 1, term
+
+    def match_counts(self, text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for _, term in self.finditer(text):
+            counts[term] = counts.get(term, 0) + 1
+        return counts
+
+
+def load_watchlist(path: Optional[str]) -> Optional[WatchlistMatcher]:
+    """
+    Load a watchlist file (one term per line, '#' comments allowed).
+    Returns None if no path is given or the file does not exist.
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        terms = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    return WatchlistMatcher(terms) if terms else None
+
+
+_default_watchlist: Optional[WatchlistMatcher] = None
+_default_watchlist_loaded = False
+
+
+def get_default_watchlist() -> Optional[WatchlistMatcher]:
+    """Return the watchlist configured via WATCHLIST_FILE (loaded once per process)."""
+    global _default_watchlist, _default_watchlist_loaded
+    if not _default_watchlist_loaded:
+        _default_watchlist = load_watchlist(WATCHLIST_FILE)
+        _default_watchlist_loaded = True
+    return _default_watchlist
+
+
+# --- Page-level aggregation and prompt formatting ---
+
+def extract_page_artifacts(pages: Dict[str, str], watchlist: Optional[WatchlistMatcher] = None) -> dict:
+    """
+    Run artifact extraction and watchlist matching over scrape_multiple output.
+
+    Returns {"artifacts": {kind: {value: [urls]}}, "watchlist": {term: {url: count}}}.
+    """
+    artifacts: Dict[str, Dict[str, List[str]]] = {}
+    hits: Dict[str, Dict[str, int]] = {}
+    for url, text in pages.items():
+        for kind, value in iter_artifacts(text):
+            sources = artifacts.setdefault(kind, {}).setdefault(value, [])
+            if url not in sources:
+                sources.append(url)
+        if watchlist:
+            for term, count in watchlist.match_counts(text).items():
+                hits.setdefault(term, {})[url] = count
+    return {"artifacts": artifacts, "watchlist": hits}
+
+
+def format_artifacts_for_prompt(extracted: dict, max_values_per_kind: int = 200) -> str:
+    """
+    Render extracted artifacts as a compact plain-text block for the summary prompt.
+    """
+    lines = []
+    artifacts = extracted.get("artifacts", {})
+    for kind, label in ARTIFACT_LABELS.items():
+        values = artifacts.get(kind)
+        if not values:
+            continue
+        lines.append(f"{label} ({len(values)}):")
+        for value, sources in list(values.items())[:max_values_per_kind]:
+            lines.append(f"- {value} (seen on {len(sources)} page{'s' if len(sources) != 1 else ''})")
+        if len(values) > max_values_per_kind:
+            lines.append(f"- ... {len(values) - max_values_per_kind} more")
+    watchlist = extracted.get("watchlist", {})
+    if watchlist:
+        lines.append("Watchlist hits:")
+        for term, pages in sorted(watchlist.items(), key=lambda kv: -sum(kv[1].values())):
+            lines.append(f"- {term}: {sum(pages.values())} mention(s) on {len(pages)} page(s)")
+    return "\n".join(lines) if lines else "None found."
@@ -0,0 +1,223 @@
+"""
+In-process job queue and bounded worker scheduler for running investigations
+in the background (used by the long-running service mode).
+"""
+import itertools
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.callbacks.base import BaseCallbackHandler
+
+from pipeline import PipelineCancelled, PipelineError
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(PipelineCancelled):
+    """Raised inside a running job once cancellation has been requested."""
+
+
+class Job:
+    """
+    A single investigation request and its progress.
+    Events are appended as (seq, kind, data) tuples where kind is 'status',
+    'progress', 'token' or one of the pipeline's on_event kinds ('refined',
+    'engine', 'search_results', 'filtered', 'page', 'scraped'); readers can
+    wait for new events by seq.
+    """
+
+    def __init__(self, query: str, model: str, threads: int, options: Optional[dict] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.model = model
+        self.threads = threads
+        self.options = dict(options or {})  # extra run options for the runner (e.g. adaptive concurrency)
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self._events: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def emit(self, kind: str, data) -> None:
+        with self._cond:
+            self._events.append((next(self._seq), kind, data))
+            self._cond.notify_all()
+
+    def log(self, message: str) -> None:
+        self.check_cancelled()
+        self.emit("progress", message)
+
+    def set_status(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        if status == RUNNING:
+            self.started_at = time.time()
+        elif status in FINISHED_STATES:
+            self.finished_at = time.time()
+        self.emit("status", status)
+
+    def start(self) -> bool:
+        """Move a queued job to running; False if it was cancelled first."""
+        with self._cond:
+            if self.status != QUEUED or self.cancel_event.is_set():
+                return False
+            self.set_status(RUNNING)
+            return True
+
+    def cancel(self) -> None:
+        """Request cancellation; a job that hasn't started yet is cancelled at once."""
+        with self._cond:
+            self.cancel_event.set()
+            if self.status == QUEUED:
+                self.set_status(CANCELLED)
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def events_since(self, seq: int = 0, timeout: Optional[float] = None) -> List[tuple]:
+        """
+        Return events with sequence number >= seq, waiting up to timeout for new
+        ones if none are available and the job has not finished.
+        """
+        with self._cond:
+            if timeout and not self.finished and len(self._events) <= seq:
+                self._cond.wait(timeout)
+            return self._events[seq:]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def summary(self) -> Optional[str]:
+        return (self.result or {}).get("summary")
+
+    def to_dict(self) -> dict:
+        result = self.result or {}
+        return {
+            "id": self.id,
+            "query": self.query,
+            "model": self.model,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "refined_query": result.get("refined_query"),
+            "search_results": len(result.get("search_results") or []),
+            "filtered": len(result.get("filtered") or []),
+            "scraped": len(result.get("scraped") or {}),
+            "has_summary": bool(result.get("summary")),
+        }
+
+
+class _JobTokenHandler(BaseCallbackHandler):
+    """Forward streamed summary tokens to the job's event log; aborts on cancel."""
+
+    # Let JobCancelled propagate out of the stream (LangChain logs and swallows handler errors otherwise)
+    raise_error = True
+
+    def __init__(self, job: Job):
+        self.job = job
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self.job.check_cancelled()
+        if token:
+            self.job.emit("token", token)
+
+
+class JobManager:
+    """
+    Bounded worker scheduler over a FIFO job queue.
+
+    `runner(job, token_handler)` performs the work and returns the result dict;
+    it is called on one of `workers` long-lived threads, so anything it reuses
+    (pooled LLM clients, scrape caches) stays warm between jobs.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Job, BaseCallbackHandler], dict],
+        workers: int = 2,
+        max_retained: int = 200,
+    ):
+        self.runner = runner
+        self.max_retained = max_retained
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"robin-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, query: str, model: str, threads: int, **options) -> Job:
+        job = Job(query, model, threads, options)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.emit("status", QUEUED)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel()
+        return job
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.finished]
+        overflow = len(self._jobs) - self.max_retained
+        for job in sorted(finished, key=lambda j: j.finished_at or 0)[:max(0, overflow)]:
+            self._jobs.pop(job.id, None)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.start():  # cancelled while queued
+                continue
+            try:
+                job.result = self.runner(job, _JobTokenHandler(job))
+                job.set_status(DONE)
+            except PipelineCancelled:
+                job.set_status(CANCELLED)
+            except PipelineError as e:
+                job.set_status(FAILED, str(e))
+            except Exception as e:
+                job.set_status(FAILED, str(e) or e.__class__.__name__)
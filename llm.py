@@ -1,14 +1,29 @@
 import re
+import contextvars
 import openai
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from llm_utils import _common_llm_params, resolve_model_config, get_model_choices
+from llm_utils import (
+    BufferedStreamingHandler,
+    LLMMetricsHandler,
+    _common_llm_params,
+    _llm_pool,
+    resolve_model_config,
+    get_model_choices,
+)
 from config import (
     OPENAI_API_KEY,
     ANTHROPIC_API_KEY,
     GOOGLE_API_KEY,
     OPENROUTER_API_KEY,
 )
+from governor import llm_slot
+import local_llm
+from metrics import registry
+from recording import llm_callbacks
+from ioc import extract_page_artifacts, format_artifacts_for_prompt, get_default_watchlist
 import logging
 import re
 
@@ -39,10 +54,63 @@ def get_llm(model_choice):
     # Validate that the required credentials exist before we hit the API
     _ensure_credentials(model_choice, llm_class, model_specific_params)
 
-    # Create the LLM instance using the gathered parameters
-    llm_instance = llm_class(**all_params)
+    # Ask OpenAI-compatible servers to report usage (incl. cached prompt tokens) while streaming
+    if "ChatOpenAI" in getattr(llm_class, "__name__", ""):
+        all_params.setdefault("stream_usage", True)
+
+    # Reuse a pooled instance (and its HTTP connections) for this configuration
+    return _llm_pool.get(llm_class, all_params)
+
 
-    return llm_instance
+def _invoke_config(callbacks=None, stage=None) -> dict:
+    """
+    Build the per-invocation runnable config. Streaming handlers are attached here
+    rather than to the shared LLM instance so concurrent runs don't interfere.
+    Defaults to a fresh stdout streaming handler; a metrics handler is always added.
+    """
+    if callbacks is None:
+        callbacks = [BufferedStreamingHandler(buffer_limit=60)]
+    return {"callbacks": list(callbacks) + [LLMMetricsHandler(stage or "llm")] + llm_callbacks()}
+
+
+def _cacheable_prompt(llm, system_prompt: str, user_template: str) -> ChatPromptTemplate:
+    """
+    Build a prompt whose system message is a static, non-templated prefix that is
+    byte-identical across calls, with all per-call variables in the user message.
+    This lets provider-side prefix caching work: automatic for OpenAI/Gemini, and
+    opted into with a cache-control block for Anthropic.
+    """
+    if "ChatAnthropic" in type(llm).__name__:
+        system = SystemMessage(
+            content=[
+                {
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        )
+    else:
+        system = SystemMessage(content=system_prompt)
+    return ChatPromptTemplate([system, ("user", user_template)])
+
+
+# Output tokens kept free in a local model's context window, per kind of call
+_QUERY_RESERVE = 512
+_NOTES_RESERVE = 1024
+_SUMMARY_RESERVE = 4096
+
+
+def _fit(llm, reserve: int, *texts: str):
+    """The model to call for a prompt made of texts (local models get a context window that fits)."""
+    return local_llm.fit_context(llm, local_llm.estimate_tokens(*texts), reserve)
+
+
+def _invoke(llm, chain, inputs: dict, config: dict):
+    """chain.invoke(), retried with backoff while a local server reports it is saturated."""
+    if local_llm.backend_of(llm) is None:
+        return chain.invoke(inputs, config=config)
+    return local_llm.with_backoff(lambda: chain.invoke(inputs, config=config))
 
 
 def _ensure_credentials(model_choice: str, llm_class, model_params: dict) -> None:
@@ -70,7 +138,7 @@ def _ensure_credentials(model_choice: str, llm_class, model_params: dict) -> Non
             _require(OPENAI_API_KEY, "OPENAI_API_KEY", "OpenAI")
 
 
-def refine_query(llm, user_input):
+def refine_query(llm, user_input, callbacks=None):
     system_prompt = """
     You are a Cybercrime Threat Intelligence Expert. Your task is to refine the provided user query that needs to be sent to darkweb search engines. 
     
@@ -83,14 +151,13 @@ def refine_query(llm, user_input):
 
     INPUT:
     """
-    prompt_template = ChatPromptTemplate(
-        [("system", system_prompt), ("user", "{query}")]
-    )
-    chain = prompt_template | llm | StrOutputParser()
-    return chain.invoke({"query": user_input})
+    prompt_template = _cacheable_prompt(llm, system_prompt, "{query}")
+    chain = prompt_template | _fit(llm, _QUERY_RESERVE, system_prompt, user_input) | StrOutputParser()
+    with registry.timer("stage_seconds", stage="refine"), llm_slot(llm):
+        return _invoke(llm, chain, {"query": user_input}, _invoke_config(callbacks, "refine"))
 
 
-def filter_results(llm, query, results):
+def filter_results(llm, query, results, callbacks=None):
     if not results:
         return []
 
@@ -100,24 +167,35 @@ def filter_results(llm, query, results):
     Rule:
     1. Output ONLY atmost top 20 indices (comma-separated list) no more than that that best match the input query
 
-    Search Query: {query}
-    Search Results:
+    The input contains the search query followed by the search results.
     """
 
     final_str = _generate_final_string(results)
 
-    prompt_template = ChatPromptTemplate(
-        [("system", system_prompt), ("user", "{results}")]
+    prompt_template = _cacheable_prompt(
+        llm, system_prompt, "Search Query: {query}\nSearch Results:\n{results}"
     )
-    chain = prompt_template | llm | StrOutputParser()
-    try:
-        result_indices = chain.invoke({"query": query, "results": final_str})
-    except openai.RateLimitError as e:
-        print(
-            f"Rate limit error: {e} \n Truncating to Web titles only with 30 characters"
-        )
-        final_str = _generate_final_string(results, truncate=True)
-        result_indices = chain.invoke({"query": query, "results": final_str})
+    chain = prompt_template | _fit(llm, _QUERY_RESERVE, system_prompt, query, final_str) | StrOutputParser()
+    with registry.timer("stage_seconds", stage="filter"), llm_slot(llm):
+        try:
+            result_indices = _invoke(
+                llm,
+                chain,
+                {"query": query, "results": final_str},
+                _invoke_config(callbacks, "filter"),
+            )
+        except openai.RateLimitError as e:
+            print(
+                f"Rate limit error: {e} \n Truncating to Web titles only with 30 characters"
+            )
+            final_str = _generate_final_string(results, truncate=True)
+            chain = prompt_template | _fit(llm, _QUERY_RESERVE, system_prompt, query, final_str) | StrOutputParser()
+            result_indices = _invoke(
+                llm,
+                chain,
+                {"query": query, "results": final_str},
+                _invoke_config(callbacks, "filter"),
+            )
 
     # Select top_k results using original (non-truncated) results
     parsed_indices = []
@@ -187,7 +265,19 @@ def _generate_final_string(results, truncate=False):
     return "\n".join(s for s in final_str)
 
 
-def generate_summary(llm, query, content):
+def generate_summary(llm, query, content, callbacks=None, artifacts=None):
+    """
+    Generate the investigation summary from scraped page content.
+    Deterministic artifacts (emails, wallets, onion links, ...) are extracted locally
+    and passed alongside the raw text. Pass `artifacts` (an extract_page_artifacts()
+    result over the full page text) when content has been cut to the per-page
+    budget, so artifacts outside the budget are kept; otherwise they are
+    extracted from content.
+    """
+    if artifacts is None:
+        with registry.timer("stage_seconds", stage="extract"):
+            artifacts = extract_page_artifacts(content, watchlist=get_default_watchlist())
+
     system_prompt = """
     You are an Cybercrime Threat Intelligence Expert tasked with generating context-based technical investigative insights from dark web osint search engine results.
 
@@ -202,9 +292,10 @@ def generate_summary(llm, query, content):
     8. Include suggested next steps and queries for investigating more on the topic.
     9. Be objective and analytical in your assessment.
     10. Ignore not safe for work texts from the analysis
+    11. A list of locally extracted and checksum-validated artifacts follows the raw data. Treat it as exact and complete: include every listed artifact and do not alter their values.
 
     Output Format:
-    1. Input Query: {query}
+    1. Input Query: the Input Query given at the start of the input
     2. Source Links Referenced for Analysis - this heading will include all source links used for the analysis
     3. Investigation Artifacts - this heading will include all technical artifacts identified including name, email, phone, cryptocurrency addresses, domains, darkweb markets, forum names, threat actor information, malware names, etc.
     4. Key Insights
@@ -214,8 +305,99 @@ def generate_summary(llm, query, content):
 
     INPUT:
     """
-    prompt_template = ChatPromptTemplate(
-        [("system", system_prompt), ("user", "{content}")]
+    artifacts_text = format_artifacts_for_prompt(artifacts)
+    budget = local_llm.prompt_budget(llm, _SUMMARY_RESERVE)
+    if budget is not None and isinstance(content, dict):
+        # A local model's window may not hold every page: condense them into notes first
+        budget -= local_llm.estimate_tokens(system_prompt, query, artifacts_text)
+        if local_llm.estimate_tokens(str(content)) > budget:
+            content = _condense_pages(llm, query, content, budget)
+
+    prompt_template = _cacheable_prompt(
+        llm,
+        system_prompt,
+        "Input Query: {query}\n\n{content}\n\nLOCALLY EXTRACTED ARTIFACTS:\n{artifacts}",
     )
-    chain = prompt_template | llm | StrOutputParser()
-    return chain.invoke({"query": query, "content": content})
+    model = _fit(llm, _SUMMARY_RESERVE, system_prompt, query, str(content), artifacts_text)
+    chain = prompt_template | model | StrOutputParser()
+    with registry.timer("stage_seconds", stage="summarize"), llm_slot(llm):
+        return _invoke(
+            llm,
+            chain,
+            {
+                "query": query,
+                "content": content,
+                "artifacts": artifacts_text,
+            },
+            _invoke_config(callbacks, "summarize"),
+        )
+
+
+def _pack(pieces, budget: int) -> list:
+    """Greedily join text pieces into chunks of at most `budget` estimated tokens."""
+    chunks, current = [], []
+    for piece in pieces:
+        if current and local_llm.estimate_tokens(*current, piece) > budget:
+            chunks.append("\n\n".join(current))
+            current = []
+        current.append(piece)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _condense_pages(llm, query, pages: dict, budget: int) -> str:
+    """
+    Map step for local models whose context window can't hold all pages: pack
+    the pages into chunks that fit, have the model write notes on each chunk
+    (concurrently, up to the server's parallel slots) and return the notes in
+    place of the pages. Notes that still don't fit are condensed again.
+    """
+    system_prompt = """
+    You are a Cybercrime Threat Intelligence Expert. You are given part of the dark web pages collected for an investigation, as links with their raw text (or notes already taken on such pages).
+    Write concise notes for the analyst who will write the final report:
+    1. For every page relevant to the query, give its link and what it contains.
+    2. List every technical artifact (name, email, phone, cryptocurrency address, domain, market, forum, threat actor, malware, TTP) with its context and source link.
+    3. Copy links and artifact values exactly.
+    4. Skip irrelevant pages and not safe for work texts.
+    """
+    chunk_budget = max(local_llm.prompt_budget(llm, _NOTES_RESERVE) - local_llm.estimate_tokens(system_prompt, query), _NOTES_RESERVE)
+    pieces = [f"Link: {url}\nText: {text}" for url, text in pages.items()]
+    for _ in range(3):
+        chunks = _pack(pieces, chunk_budget)
+        if len(chunks) < 2:
+            break  # one oversized piece: nothing left to split
+        pieces = _write_notes(llm, query, system_prompt, chunks)
+        if local_llm.estimate_tokens(*pieces) <= budget:
+            break
+    return "\n\n".join(pieces)
+
+
+def _write_notes(llm, query, system_prompt: str, chunks: list) -> list:
+    prompt_template = _cacheable_prompt(llm, system_prompt, "Input Query: {query}\n\n{content}")
+    chain = prompt_template | _fit(llm, _NOTES_RESERVE, system_prompt, query, max(chunks, key=len)) | StrOutputParser()
+
+    def write(chunk):
+        with llm_slot(llm):
+            return _invoke(llm, chain, {"query": query, "content": chunk}, _invoke_config([], "summarize_map"))
+
+    notes = [None] * len(chunks)
+    saturated = []
+    slots = local_llm.server_slots(llm) or 1
+    with registry.timer("stage_seconds", stage="summarize_map"):
+        with ThreadPoolExecutor(max_workers=min(slots, len(chunks))) as pool:
+            # Copy the context so calls keep the caller's governor session
+            futures = {
+                pool.submit(contextvars.copy_context().run, write, chunk): i for i, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                try:
+                    notes[futures[future]] = future.result()
+                except Exception as e:
+                    if not local_llm.is_saturated(e):
+                        raise
+                    saturated.append(futures[future])
+        # Still busy after backing off: finish those chunks one at a time
+        for i in sorted(saturated):
+            notes[i] = write(chunks[i])
+    return notes
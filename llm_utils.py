@@ -1,4 +1,7 @@
+import sys
+import time
 import requests
+import threading
 from urllib.parse import urljoin
 from langchain_openai import ChatOpenAI
 from langchain_ollama import ChatOllama
@@ -6,6 +9,7 @@ from typing import Callable, Optional, List
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.callbacks.base import BaseCallbackHandler
+from metrics import registry, record_error
 import os
 from config import (
     OLLAMA_BASE_URL,
@@ -15,6 +19,7 @@ from config import (
     OPENAI_API_KEY,
     ANTHROPIC_API_KEY,
     LLAMA_CPP_BASE_URL,
+    LOCAL_KEEP_ALIVE,
 )
 
 
@@ -40,15 +45,236 @@ class BufferedStreamingHandler(BaseCallbackHandler):
             self.buffer = ""
 
 
+class StreamingFileSink(BaseCallbackHandler):
+    """
+    Per-run streaming sink: writes tokens incrementally to an output file (and
+    optionally stdout), flushing on newline boundaries so a crash or Ctrl-C late
+    in generation still leaves a usable partial summary on disk.
+    Also records time-to-first-token, tokens per second and total generation time.
+    """
+
+    def __init__(self, path: str, echo: bool = True, buffer_limit: int = 60):
+        self.path = path
+        self.echo = echo
+        self.buffer = ""
+        self.buffer_limit = buffer_limit
+        self.token_count = 0
+        self.started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _mark_start(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        self._mark_start()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        self._mark_start()
+
+    def _flush(self) -> None:
+        if not self.buffer:
+            return
+        self._file.write(self.buffer)
+        self._file.flush()
+        if self.echo:
+            sys.stdout.write(self.buffer)
+            sys.stdout.flush()
+        self.buffer = ""
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self._mark_start()
+        if not token:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.token_count += 1
+        self.buffer += token
+        if "\n" in token or len(self.buffer) >= self.buffer_limit:
+            self._flush()
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        if not self.token_count:
+            # Non-streaming backend: write the full completion at once
+            try:
+                self.buffer += response.generations[0][0].text
+            except (AttributeError, IndexError):
+                pass
+        self._flush()
+        self.ended_at = time.perf_counter()
+
+    def on_llm_error(self, error, **kwargs) -> None:
+        self._flush()
+        self.ended_at = time.perf_counter()
+
+    def close(self) -> None:
+        self._flush()
+        if not self._file.closed:
+            self._file.close()
+
+    def stats(self) -> dict:
+        """Return generation timing for this run (seconds; None where not available)."""
+        end = self.ended_at or time.perf_counter()
+        ttft = (
+            self.first_token_at - self.started_at
+            if self.first_token_at and self.started_at
+            else None
+        )
+        total = end - self.started_at if self.started_at else None
+        stream_time = end - self.first_token_at if self.first_token_at else None
+        tps = self.token_count / stream_time if stream_time else None
+        return {
+            "time_to_first_token_s": ttft,
+            "tokens": self.token_count,
+            "tokens_per_s": tps,
+            "total_generation_s": total,
+        }
+
+
+def _response_usage(response) -> List[dict]:
+    """Collect usage_metadata dicts from an LLMResult (one per generation that has it)."""
+    usages = []
+    for generations in getattr(response, "generations", None) or []:
+        for gen in generations:
+            usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if usage:
+                usages.append(usage)
+    return usages
+
+
+class TokenUsageTracker(BaseCallbackHandler):
+    """
+    Accumulate token usage across LLM calls, including provider prompt-cache hits
+    (input_token_details.cache_read) so cached-prefix hit rates can be reported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        usages = _response_usage(response)
+        with self._lock:
+            self.calls += 1
+            for usage in usages:
+                details = usage.get("input_token_details") or {}
+                self.input_tokens += usage.get("input_tokens") or 0
+                self.output_tokens += usage.get("output_tokens") or 0
+                self.cache_read_tokens += details.get("cache_read") or 0
+                self.cache_creation_tokens += details.get("cache_creation") or 0
+
+    def cache_hit_rate(self) -> Optional[float]:
+        if not self.input_tokens:
+            return None
+        return self.cache_read_tokens / self.input_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "cache_creation_tokens": self.cache_creation_tokens,
+                "cache_hit_rate": self.cache_hit_rate(),
+            }
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Record per-call LLM latency, time-to-first-token, token usage and errors
+    into the metrics registry, labelled by pipeline stage and model.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._calls = {}
+
+    def _start(self, run_id, kwargs) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        self._calls[run_id] = {"start": time.perf_counter(), "first": None, "model": model}
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs) -> None:
+        self._start(run_id, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id=None, **kwargs) -> None:
+        call = self._calls.get(run_id)
+        if call and call["first"] is None:
+            call["first"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs) -> None:
+        call = self._calls.pop(run_id, None)
+        if not call:
+            return
+        labels = {"stage": self.stage, "model": call["model"]}
+        registry.observe("llm_call_seconds", time.perf_counter() - call["start"], **labels)
+        if call["first"] is not None:
+            registry.observe("llm_time_to_first_token_seconds", call["first"] - call["start"], **labels)
+        for usage in _response_usage(response):
+            details = usage.get("input_token_details") or {}
+            registry.inc("llm_tokens_total", usage.get("input_tokens") or 0, type="input", **labels)
+            registry.inc("llm_tokens_total", usage.get("output_tokens") or 0, type="output", **labels)
+            registry.inc("llm_tokens_total", details.get("cache_read") or 0, type="cache_read", **labels)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs) -> None:
+        call = self._calls.pop(run_id, None)
+        model = call["model"] if call else "unknown"
+        record_error("llm", error, stage=self.stage, model=model)
+
+
+class LLMClientPool:
+    """
+    Thread-safe cache of chat model instances keyed by class and constructor params.
+    Reusing an instance reuses its underlying HTTP client, so keep-alive connections
+    to the provider survive across chain calls, runs and concurrent UI sessions.
+    Instances carry no callbacks; streaming handlers are passed per invocation.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(llm_class, params: dict):
+        return (
+            getattr(llm_class, "__module__", ""),
+            getattr(llm_class, "__qualname__", str(llm_class)),
+            tuple(sorted((k, repr(v)) for k, v in params.items())),
+        )
+
+    def get(self, llm_class, params: dict):
+        key = self._key(llm_class, params)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = llm_class(**params)
+                self._clients[key] = client
+            return client
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
 # --- Configuration Data ---
-# Instantiate common dependencies once
-_common_callbacks = [BufferedStreamingHandler(buffer_limit=60)]
+# Process-wide pool of chat model clients
+_llm_pool = LLMClientPool()
 
 # Define common parameters for most LLMs
+# Callbacks are deliberately not part of the shared instance; attach them per call.
 _common_llm_params = {
     "temperature": 0,
     "streaming": True,
-    "callbacks": _common_callbacks,
 }
 
 # Map input model choices (lowercased) to their configuration
@@ -330,7 +556,12 @@ def resolve_model_config(model_choice: str):
         if _normalize_model_name(ollama_model) == model_choice_lower:
             return {
                 "class": ChatOllama,
-                "constructor_params": {"model": ollama_model, "base_url": OLLAMA_BASE_URL},
+                # keep_alive stops Ollama unloading the model between pipeline stages
+                "constructor_params": {
+                    "model": ollama_model,
+                    "base_url": OLLAMA_BASE_URL,
+                    "keep_alive": LOCAL_KEEP_ALIVE,
+                },
             }
 
     return None
\ No newline at end of file
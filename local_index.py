@@ -0,0 +1,178 @@
+"""
+Embedded full-text index (SQLite FTS5) over everything collected by past runs:
+search-result titles and scraped page text. Updated after each run and queried
+by `robin local-search` and the local-first option of get_search_results.
+"""
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from config import LOCAL_INDEX_PATH
+from records import SearchResult
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    query TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    scraped_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, body, content='documents', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE OF title, body ON documents
+WHEN old.title != new.title OR old.body != new.body BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    INSERT INTO documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO documents (url, title, body, query, first_seen, last_seen, scraped_at)
+VALUES (:url, :title, :body, :query, :now, :now, :scraped_at)
+ON CONFLICT(url) DO UPDATE SET
+    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE documents.title END,
+    body = CASE WHEN excluded.body != '' THEN excluded.body ELSE documents.body END,
+    query = excluded.query,
+    last_seen = excluded.last_seen,
+    scraped_at = COALESCE(excluded.scraped_at, documents.scraped_at)
+"""
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text (or a refined search query like 'a+b') into a safe FTS5
+    expression: every word quoted and OR-ed, so bm25 ranks pages matching more terms first.
+    """
+    terms = dict.fromkeys(t.lower() for t in re.findall(r"\w+", text or "") if len(t) > 1)
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+class LocalIndex:
+    """
+    Thread-safe handle on the index database. One connection is shared behind a
+    lock; WAL mode lets a concurrent `robin local-search` read while a run writes.
+    """
+
+    def __init__(self, path: str = LOCAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_documents(self, docs: List[dict], query: str = "") -> int:
+        """
+        Upsert documents given as {"url", "title"?, "body"?}. Existing text is kept
+        when a document arrives without it (e.g. a search hit for a scraped page).
+        """
+        now = time.time()
+        rows = [
+            {
+                "url": d["url"],
+                "title": d.get("title") or "",
+                "body": d.get("body") or "",
+                "query": query,
+                "now": now,
+                "scraped_at": now if d.get("body") else None,
+            }
+            for d in docs
+            if d.get("url")
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def add_run(self, query: str, search_results: List[dict], pages: Dict[str, str]) -> int:
+        """Index one run: every search hit (title only) and every scraped page (title + text)."""
+        titles = {r.get("link"): r.get("title", "") for r in search_results}
+        docs = [{"url": link, "title": title} for link, title in titles.items() if link not in pages]
+        # scrape_single falls back to the bare title when a fetch fails; don't index that as page text
+        docs += [
+            {"url": url, "title": titles.get(url, ""), "body": text if text != titles.get(url) else ""}
+            for url, text in pages.items()
+        ]
+        return self.add_documents(docs, query=query)
+
+    def search(self, text: str, limit: int = 20) -> List[dict]:
+        """Best-matching documents for free text, ranked by bm25 (titles weighted up)."""
+        expression = fts_query(text)
+        if not expression:
+            return []
+        sql = """
+            SELECT d.url, d.title, d.query, d.first_seen, d.last_seen, d.scraped_at,
+                   snippet(documents_fts, 1, '[', ']', '…', 12) AS snippet,
+                   bm25(documents_fts, 4.0, 1.0) AS score
+            FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+            ORDER BY score
+            LIMIT ?
+        """
+        with self._lock:
+            cursor = self._conn.execute(sql, (expression, limit))
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def search_results(self, refined_query: str, limit: int = 50) -> List[dict]:
+        """Matches as SearchResults, like get_search_results returns."""
+        return [
+            SearchResult(hit["url"], hit["title"] or hit["url"])
+            for hit in self.search(refined_query.replace("+", " "), limit=limit)
+        ]
+
+    def recent_hosts(self, limit: int = 20, since: float = 0.0) -> List[str]:
+        """Distinct onion hosts of documents seen since `since`, most recent first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM documents WHERE last_seen >= ? ORDER BY last_seen DESC LIMIT ?",
+                (since, limit * 50),
+            ).fetchall()
+        hosts: Dict[str, None] = {}
+        for (url,) in rows:
+            host = urlparse(url).hostname or ""
+            if host.endswith(".onion"):
+                hosts.setdefault(host)
+                if len(hosts) >= limit:
+                    break
+        return list(hosts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total, scraped = self._conn.execute(
+                "SELECT COUNT(*), COUNT(scraped_at) FROM documents"
+            ).fetchone()
+        return {"documents": total, "scraped": scraped}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_index: Optional[LocalIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """Process-wide index at LOCAL_INDEX_PATH, or None when indexing is disabled (empty path)."""
+    global _default_index
+    if not LOCAL_INDEX_PATH:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            _default_index = LocalIndex(LOCAL_INDEX_PATH)
+        return _default_index
@@ -0,0 +1,172 @@
+"""
+Local inference mode for models served by Ollama (OLLAMA_BASE_URL) or a
+llama.cpp server (LLAMA_CPP_BASE_URL).
+
+A local server is not a cloud API: it runs a fixed number of parallel slots,
+unloads idle models, and Ollama silently truncates prompts beyond a small
+default context window. For local models this module
+  - reads the server's parallel slot count and per-request context size
+    (llama.cpp /props, Ollama /api/show; ROBIN_LOCAL_LLM_SLOTS overrides the
+    slot count) so LLM call slots and map-reduce fan-out match the server,
+  - sizes Ollama's num_ctx to the packed prompt, growing in powers of two and
+    never shrinking, so the model is reloaded at most a few times per process
+    (keep_alive, set in llm_utils, keeps it loaded between stages),
+  - recognizes "server busy" replies so callers can back off and retry.
+Pooled model instances are reused throughout, so requests share one
+keep-alive HTTP client per model.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from config import LLAMA_CPP_BASE_URL, LOCAL_LLM_SLOTS, LOCAL_MAX_CTX
+from metrics import registry
+
+
+# Conservative estimate for scraped dark web text (mixed scripts, URLs, markup)
+CHARS_PER_TOKEN = 3.0
+_MIN_CTX = 4096
+# How long a server that couldn't be probed is assumed to have the defaults before asking again
+_PROBE_RETRY_SECONDS = 60.0
+
+_http = requests.Session()
+
+
+@dataclass
+class ServerInfo:
+    backend: str
+    slots: int
+    context: int  # largest context one request may use
+    num_ctx: int = 0  # Ollama window requested so far (high-water mark)
+
+
+_servers: Dict[Tuple[str, str, str], ServerInfo] = {}
+_retry_at: Dict[Tuple[str, str, str], float] = {}  # servers holding fallback info, and when to probe again
+_lock = threading.Lock()
+
+
+def _llama_cpp_root(url: str) -> str:
+    url = url.rstrip("/")
+    return url[:-3] if url.endswith("/v1") else url
+
+
+def backend_of(llm) -> Optional[str]:
+    """'ollama' or 'llama.cpp' for local models, None for everything else."""
+    name = type(llm).__name__
+    if "ChatOllama" in name:
+        return "ollama"
+    base_url = getattr(llm, "openai_api_base", None)
+    if "ChatOpenAI" in name and LLAMA_CPP_BASE_URL and base_url:
+        if _llama_cpp_root(base_url) == _llama_cpp_root(LLAMA_CPP_BASE_URL):
+            return "llama.cpp"
+    return None
+
+
+def _probe(backend: str, base_url: str, model: str) -> ServerInfo:
+    if backend == "llama.cpp":
+        props = _http.get(f"{_llama_cpp_root(base_url)}/props", timeout=3)
+        props.raise_for_status()
+        props = props.json()
+        slots = props.get("total_slots") or 1
+        context = (props.get("default_generation_settings") or {}).get("n_ctx") or LOCAL_MAX_CTX
+    else:
+        show = _http.post(f"{base_url.rstrip('/')}/api/show", json={"model": model}, timeout=3)
+        show.raise_for_status()
+        model_info = show.json().get("model_info") or {}
+        trained = next((v for k, v in model_info.items() if k.endswith(".context_length")), None)
+        # Ollama doesn't report its parallelism; use the server's setting if it is shared with us
+        slots = int(os.getenv("OLLAMA_NUM_PARALLEL") or 1)
+        context = min(LOCAL_MAX_CTX, trained or LOCAL_MAX_CTX)
+    return ServerInfo(backend, LOCAL_LLM_SLOTS or int(slots), int(context))
+
+
+def server_info(llm) -> Optional[ServerInfo]:
+    """Slots and context size of a local model's server (cached), or None for cloud models."""
+    backend = backend_of(llm)
+    if backend is None:
+        return None
+    base_url = str(getattr(llm, "base_url", None) or getattr(llm, "openai_api_base", None) or "")
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or ""
+    key = (backend, base_url, model)
+    with _lock:
+        info = _servers.get(key)
+        if info is not None and time.monotonic() < _retry_at.get(key, float("inf")):
+            return info
+        if info is not None:
+            _retry_at[key] = time.monotonic() + _PROBE_RETRY_SECONDS  # one caller re-probes
+    try:
+        probed = _probe(backend, base_url, model)
+    except (requests.RequestException, ValueError):
+        # Unknown server: assume one slot and the configured window until the next probe
+        with _lock:
+            if key not in _servers:
+                _servers[key] = ServerInfo(backend, LOCAL_LLM_SLOTS or 1, LOCAL_MAX_CTX)
+                _retry_at[key] = time.monotonic() + _PROBE_RETRY_SECONDS
+            return _servers[key]
+    with _lock:
+        if info is not None:
+            probed.num_ctx = min(info.num_ctx, probed.context)  # keep the window already requested
+        if key in _retry_at or key not in _servers:
+            _servers[key] = probed
+            _retry_at.pop(key, None)
+        return _servers[key]
+
+
+def server_slots(llm) -> Optional[int]:
+    info = server_info(llm)
+    return info.slots if info else None
+
+
+def estimate_tokens(*texts: str) -> int:
+    return int(sum(len(t) for t in texts) / CHARS_PER_TOKEN) + 1
+
+
+def prompt_budget(llm, reserve: int) -> Optional[int]:
+    """Prompt tokens that fit one request with `reserve` tokens left for output; None for cloud models."""
+    info = server_info(llm)
+    return max(info.context - reserve, 0) if info else None
+
+
+def fit_context(llm, prompt_tokens: int, reserve: int):
+    """
+    The model to call for a prompt of prompt_tokens: for Ollama a copy with
+    num_ctx large enough for the prompt plus reserve (sharing the pooled
+    client); other models are returned unchanged.
+    """
+    info = server_info(llm)
+    if info is None or info.backend != "ollama":
+        return llm
+    needed = prompt_tokens + reserve
+    with _lock:
+        size = max(info.num_ctx, _MIN_CTX)
+        while size < needed and size < info.context:
+            size *= 2
+        if min(size, info.context) > info.num_ctx:
+            info.num_ctx = min(size, info.context)
+            registry.observe("local_num_ctx", info.num_ctx, model=llm.model)
+        size = info.num_ctx
+    if getattr(llm, "num_ctx", None) == size:
+        return llm
+    return llm.model_copy(update={"num_ctx": size})
+
+
+def is_saturated(exc: BaseException) -> bool:
+    """Whether an LLM error means the server is busy (all slots and its queue full)."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status in (429, 503) or "server busy" in str(exc).lower()
+
+
+def with_backoff(call: Callable, attempts: int = 4, delay: float = 1.0):
+    """Run call(), retrying with exponential backoff while the server reports it is saturated."""
+    for attempt in range(attempts):
+        try:
+            return call()
+        except Exception as e:
+            if not is_saturated(e) or attempt == attempts - 1:
+                raise
+            registry.inc("llm_saturated_total")
+            time.sleep(delay * 2 ** attempt)
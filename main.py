@@ -1,11 +1,29 @@
+import os
+import re
 import sys
+import json
+import time
 import click
+import threading
 from yaspin import yaspin
 from datetime import datetime
-from scrape import scrape_multiple
-from search import get_search_results
-from llm import get_llm, refine_query, filter_results, generate_summary
-from llm_utils import get_model_choices
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from scrape import ScrapeCache
+from pipeline import PipelineError, gather, run_investigation
+from llm import get_llm, generate_summary
+from metrics import write_run_report
+from local_index import LocalIndex, get_local_index
+from artifact_index import ArtifactIndex, get_artifact_index
+import recording
+from checkpoint import RunCheckpoint, new_run_id
+from export import RunExporter
+import governor
+from llm_utils import (
+    BufferedStreamingHandler,
+    StreamingFileSink,
+    TokenUsageTracker,
+    get_model_choices,
+)
 
 MODEL_CHOICES = get_model_choices()
 
@@ -23,61 +41,501 @@ def robin():
     type=click.Choice(MODEL_CHOICES),
     help="Select LLM model to use (e.g., ChatGPT models, Claude models, Gemini models, Ollama models, Openrouter models)",
 )
-@click.option("--query", "-q", required=True, type=str, help="Dark web search query")
-@click.option("--threads", "-t", default=5, show_default=True, type=int, help="Number of threads (Default: 5)")
+@click.option("--query", "-q", type=str, help="Dark web search query (not needed with --resume)")
+@click.option("--threads", "-t", default=5, show_default=True, type=int, help="Number of threads (Default: 5); the starting point when adaptive")
+@click.option("--adaptive/--fixed", default=True, show_default=True, help="Tune search/scrape concurrency to Tor throughput, or keep --threads fixed")
+@click.option("--min-threads", type=int, help="Lower bound for adaptive concurrency (default: ROBIN_MIN_THREADS or 1)")
+@click.option("--max-threads", type=int, help="Upper bound for adaptive concurrency (default: ROBIN_MAX_THREADS or 32)")
 @click.option("--output", "-o", type=str, help="Filename to save the final summary.")
-def cli(model, query, threads, output):
+@click.option("--metrics", "metrics_path", type=str, help="Write a JSON run report here (plus a Prometheus .prom file next to it).")
+@click.option("--record", "record_dir", type=str, help="Record every search response, scraped page and LLM response into this directory (the local index is not searched).")
+@click.option("--replay", "replay_dir", type=str, help="Run offline from a directory made with --record (no network access).")
+@click.option("--local-first", is_flag=True, help="Search the local index of past runs first and skip Tor search when it has enough hits.")
+@click.option("--crawl-depth", default=0, show_default=True, type=int, help="Follow onion links found on scraped pages this many hops (0 disables crawling)")
+@click.option("--crawl-pages", default=60, show_default=True, type=int, help="Total page budget when crawling")
+@click.option("--resume", "resume_id", type=str, help="Resume an interrupted run by its run ID, skipping completed stages.")
+@click.option("--export", "export_data", is_flag=True, help="Export search hits, selections, pages and artifacts to ROBIN_EXPORT_DIR (JSONL, then Parquet).")
+def cli(model, query, threads, adaptive, min_threads, max_threads, output, metrics_path, record_dir, replay_dir,
+        local_first, crawl_depth, crawl_pages, resume_id, export_data):
     """Run Robin in CLI mode."""
+    if record_dir and replay_dir:
+        raise click.UsageError("--record and --replay cannot be used together.")
+    if not query and not resume_id:
+        raise click.UsageError("Missing option '--query' / '-q'.")
+    sink = None
+    usage = TokenUsageTracker()
+    checkpoint = None
+    exporter = None
+    if resume_id:
+        try:
+            checkpoint = RunCheckpoint.open(resume_id)
+        except FileNotFoundError as e:
+            click.echo(f"[ERROR] {e}")
+            sys.exit(1)
+        meta = checkpoint.meta
+        query = meta["query"]
+        # The run keeps its original model, threads and crawl settings unless overridden
+        ctx = click.get_current_context()
+        if ctx.get_parameter_source("model") == click.core.ParameterSource.DEFAULT:
+            model = meta.get("model", model)
+        if ctx.get_parameter_source("threads") == click.core.ParameterSource.DEFAULT:
+            threads = meta.get("threads", threads)
+        crawl_depth = meta.get("crawl_depth", crawl_depth)
+        crawl_pages = meta.get("crawl_pages", crawl_pages)
+        export_data = export_data or meta.get("export", False)
+        click.echo(f"🔹 Resuming run {resume_id}: '{query}' (done: {', '.join(checkpoint.completed_stages()) or 'nothing'})")
+    elif not replay_dir:
+        checkpoint = RunCheckpoint.create({
+            "query": query,
+            "model": model,
+            "threads": threads,
+            "crawl_depth": crawl_depth,
+            "crawl_pages": crawl_pages,
+            "export": export_data,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        })
+        click.echo(f"🔹 Run ID: {checkpoint.run_id} (resume with --resume {checkpoint.run_id})")
     try:
-        llm = get_llm(model)
+        if checkpoint is not None and checkpoint.has("summary"):
+            click.echo(f"[OUTPUT] Run already finished; summary saved to {checkpoint.load('summary')['output']}")
+            return
+        if replay_dir:
+            recording.activate("replay", replay_dir)
+            click.echo(f"🔹 Replaying recorded run from {replay_dir}")
+            llm = recording.ReplayChatModel(streaming=True)
+        else:
+            llm = get_llm(model)
+            if record_dir:
+                recording.activate("record", record_dir, meta={"query": query, "model": model, "threads": threads})
+                click.echo(f"🔹 Recording run to {record_dir}")
+        if (record_dir or replay_dir) and local_first:
+            # Local hits would change the filter prompt between recording and replay
+            click.echo("🔹 --local-first ignored: the local index is not searched when recording or replaying")
+        if export_data:
+            exporter = RunExporter(checkpoint.run_id if checkpoint else new_run_id(), query)
 
         # Show spinner while processing
         with yaspin(text="Processing...", color="cyan") as sp:
             sp.write(f"🔹 Initializing with model: {model}")
-            
-            refined_query = refine_query(llm, query)
-            sp.write(f"🔹 Refined Query: {refined_query}")
-
-            search_results = get_search_results(refined_query, max_workers=threads)
-            if not search_results:
-                sp.fail("✖")
-                click.echo("\n[ERROR] No search results found. Tor may be unstable or query returned 0 hits.")
-                return
-
-            sp.write(f"🔹 Found {len(search_results)} raw results. Filtering...")
-            search_filtered = filter_results(llm, refined_query, search_results)
-            
-            sp.write(f"🔹 Scraping {len(search_filtered)} relevant sites...")
-            scraped_results = scrape_multiple(search_filtered, max_workers=threads)
-            
-            if not scraped_results:
+            try:
+                gathered = gather(
+                    llm,
+                    query,
+                    threads=threads,
+                    progress=sp.write,
+                    callbacks=[BufferedStreamingHandler(), usage],
+                    local_index=None if replay_dir else get_local_index(),
+                    local_first=local_first and not (record_dir or replay_dir),
+                    artifact_index=None if replay_dir else get_artifact_index(),
+                    crawl_depth=crawl_depth,
+                    crawl_pages=crawl_pages,
+                    checkpoint=checkpoint,
+                    adaptive=adaptive,
+                    min_threads=min_threads,
+                    max_threads=max_threads,
+                    exporter=exporter,
+                )
+            except PipelineError as e:
                 sp.fail("✖")
-                click.echo("\n[ERROR] Failed to scrape any content. Check Tor connection.")
+                click.echo(f"\n[ERROR] {e}")
+                _echo_resume_hint(checkpoint)
                 return
-                
+            scraped_results = gathered["scraped"]
             sp.ok("✔")
 
-        # Generate summary
-        click.echo("\n🔹 Generating Intelligence Summary...")
-        summary = generate_summary(llm, query, scraped_results)
-
-        # Save output
+        # Resolve output path up front so the summary is streamed straight to disk
         if not output:
             now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"summary_{now}.md"
         else:
             filename = output + ".md"
 
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(summary)
-            click.echo(f"\n[OUTPUT] Final intelligence summary saved to {filename}")
+        # Generate summary
+        click.echo("\n🔹 Generating Intelligence Summary...")
+        sink = StreamingFileSink(filename)
+        summary = generate_summary(
+            llm, query, scraped_results, callbacks=[sink, usage], artifacts=gathered["artifacts"]
+        )
+        sink.close()
+        if checkpoint is not None:
+            checkpoint.save("summary", {"summary": summary, "output": filename})
+        click.echo(f"\n[OUTPUT] Final intelligence summary saved to {filename}")
+        _echo_generation_stats(sink.stats())
+        _echo_usage_stats(usage.stats())
 
     except KeyboardInterrupt:
         click.echo("\n\n[!] Operation cancelled by user. Exiting.")
+        if sink and sink.token_count:
+            click.echo(f"[OUTPUT] Partial summary saved to {sink.path}")
+        _echo_resume_hint(checkpoint)
         sys.exit(0)
     except Exception as e:
         click.echo(f"\n[ERROR] An unexpected error occurred: {e}")
+        if sink and sink.token_count:
+            click.echo(f"[OUTPUT] Partial summary saved to {sink.path}")
+        _echo_resume_hint(checkpoint)
         sys.exit(1)
+    finally:
+        if sink:
+            sink.close()
+        if exporter is not None:
+            _close_exporter(exporter)
+        recording.deactivate()
+        if metrics_path:
+            _write_metrics(metrics_path, {"mode": "cli", "model": model, "query": query})
+
+
+def _close_exporter(exporter) -> str:
+    parquet_path = exporter.close()
+    if parquet_path:
+        click.echo(f"[OUTPUT] Run data ({exporter.records} records) exported to {parquet_path}")
+        return parquet_path
+    click.echo(f"[OUTPUT] Run data ({exporter.records} records) exported to {exporter.jsonl_path} (install pyarrow for Parquet)")
+    return exporter.jsonl_path
+
+
+def _echo_resume_hint(checkpoint) -> None:
+    if checkpoint is not None:
+        click.echo(f"[!] Completed stages are checkpointed; continue with: robin cli --resume {checkpoint.run_id}")
+
+
+def _write_metrics(path: str, extra: dict) -> None:
+    try:
+        json_path, prom_path = write_run_report(path, extra)
+        click.echo(f"[METRICS] Run report saved to {json_path} (Prometheus: {prom_path})")
+    except OSError as e:
+        click.echo(f"[ERROR] Could not write metrics report: {e}")
+
+
+def _echo_generation_stats(stats: dict) -> None:
+    def _fmt(value, unit):
+        return f"{value:.2f}{unit}" if value is not None else "n/a"
+
+    click.echo(
+        "[METRICS] time to first token: {} | {} tokens at {} | total generation: {}".format(
+            _fmt(stats["time_to_first_token_s"], "s"),
+            stats["tokens"],
+            _fmt(stats["tokens_per_s"], " tok/s"),
+            _fmt(stats["total_generation_s"], "s"),
+        )
+    )
+
+
+def _echo_usage_stats(stats: dict) -> None:
+    if not stats["input_tokens"]:
+        return
+    rate = stats["cache_hit_rate"] or 0.0
+    click.echo(
+        "[METRICS] tokens in/out: {}/{} | prompt cache hits: {} tokens ({:.0%})".format(
+            stats["input_tokens"],
+            stats["output_tokens"],
+            stats["cache_read_tokens"],
+            rate,
+        )
+    )
+
+
+def _slugify(text: str, max_len: int = 40) -> str:
+    slug = re.sub(r"[^a-zA-Z0-9]+", "_", text).strip("_").lower()
+    return slug[:max_len] or "query"
+
+
+@robin.command()
+@click.option(
+    "--model", "-m",
+    default="gpt-5-mini",
+    show_default=True,
+    type=click.Choice(MODEL_CHOICES),
+    help="Select LLM model to use for every query in the batch",
+)
+@click.option(
+    "--input", "-i", "input_file",
+    default="-",
+    show_default=True,
+    type=click.File("r", encoding="utf-8"),
+    help="File with one query per line ('-' reads stdin; blank lines and '#' comments are skipped)",
+)
+@click.option("--concurrency", "-c", default=3, show_default=True, type=int, help="Number of queries run at once")
+@click.option("--threads", "-t", default=5, show_default=True, type=int, help="Search/scrape threads per query")
+@click.option("--output-dir", "-o", default="batch_output", show_default=True, type=str, help="Directory for per-query summaries and index.jsonl")
+@click.option("--metrics", "metrics_path", type=str, help="Write a JSON run report here (plus a Prometheus .prom file next to it).")
+@click.option("--local-first", is_flag=True, help="Search the local index of past runs first and skip Tor search when it has enough hits.")
+@click.option("--export", "export_data", is_flag=True, help="Export each query's run data to ROBIN_EXPORT_DIR (JSONL, then Parquet).")
+def batch(model, input_file, concurrency, threads, output_dir, metrics_path, local_first, export_data):
+    """Run many queries concurrently, sharing LLM clients and scraped pages."""
+    queries = [
+        line.strip() for line in input_file
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+    if not queries:
+        click.echo("[ERROR] No queries provided.")
+        sys.exit(1)
+
+    try:
+        llm = get_llm(model)
+    except Exception as e:
+        click.echo(f"[ERROR] {e}")
+        sys.exit(1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, "index.jsonl")
+    # The index describes this batch only (summaries from an earlier batch may be overwritten)
+    open(index_path, "w", encoding="utf-8").close()
+    index_lock = threading.Lock()
+    # One cache for the whole batch: overlapping URLs are scraped only once
+    scrape_cache = ScrapeCache()
+    local_index = get_local_index()
+    artifact_index = get_artifact_index()
+    usage = TokenUsageTracker()
+
+    def _run_one(position: int, query: str) -> dict:
+        started = time.perf_counter()
+        filename = os.path.join(output_dir, f"{position:03d}_{_slugify(query)}.md")
+        record = {"query": query, "output": None, "status": "ok", "error": None}
+        exporter = None
+        if export_data:
+            exporter = RunExporter(new_run_id(), query)
+            record["run_id"] = exporter.run_id
+        try:
+            # Concurrent queries share one Tor pool and take turns fairly
+            with governor.session(f"batch-{position}"):
+                result = run_investigation(
+                    llm,
+                    query,
+                    threads=threads,
+                    callbacks=[usage],
+                    scrape_cache=scrape_cache,
+                    local_index=local_index,
+                    local_first=local_first,
+                    artifact_index=artifact_index,
+                    exporter=exporter,
+                )
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(result["summary"])
+            record.update(
+                output=filename,
+                refined_query=result["refined_query"],
+                search_results=len(result["search_results"]),
+                filtered=len(result["filtered"]),
+                scraped=len(result["scraped"]),
+            )
+        except PipelineError as e:
+            record.update(status="empty", error=str(e), stage=e.stage)
+        except Exception as e:
+            record.update(status="error", error=str(e) or e.__class__.__name__)
+        finally:
+            if exporter is not None:
+                record["export"] = exporter.close() or exporter.jsonl_path
+        record["elapsed_s"] = round(time.perf_counter() - started, 3)
+        with index_lock:
+            with open(index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    click.echo(f"🔹 Running {len(queries)} queries ({concurrency} at a time) with model: {model}")
+    failures = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = [
+            executor.submit(_run_one, position, query)
+            for position, query in enumerate(queries, start=1)
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            if record["status"] == "ok":
+                click.echo(f"✔ {record['query']} -> {record['output']} ({record['elapsed_s']}s)")
+            else:
+                failures += 1
+                click.echo(f"✖ {record['query']}: {record['error']}")
+        executor.shutdown(wait=True)
+    except KeyboardInterrupt:
+        # Drop queued queries instead of running them all before exiting
+        executor.shutdown(wait=False, cancel_futures=True)
+        click.echo("\n\n[!] Batch cancelled by user. Completed queries are in the index.")
+        sys.exit(0)
+    finally:
+        if metrics_path:
+            _write_metrics(metrics_path, {"mode": "batch", "model": model, "queries": len(queries)})
+
+    click.echo(
+        f"\n[OUTPUT] {len(queries) - failures}/{len(queries)} summaries written to {output_dir} "
+        f"(index: {index_path}); {len(scrape_cache)} unique pages scraped."
+    )
+    _echo_usage_stats(usage.stats())
+
+
+@robin.command()
+@click.option(
+    "--model", "-m",
+    default="gpt-5-mini",
+    show_default=True,
+    type=click.Choice(MODEL_CHOICES),
+    help="Default LLM model for submitted jobs (jobs may override it)",
+)
+@click.option("--host", default="127.0.0.1", show_default=True, type=str, help="Address for the HTTP API")
+@click.option("--port", default=8765, show_default=True, type=int, help="Port for the HTTP API")
+@click.option("--workers", "-w", default=2, show_default=True, type=int, help="Number of investigations run at once")
+@click.option("--threads", "-t", default=5, show_default=True, type=int, help="Default search/scrape threads per job")
+def serve(model, host, port, workers, threads):
+    """Run Robin as a long-running service with a local HTTP job API."""
+    from service import RobinService, create_server
+
+    try:
+        get_llm(model)  # warm the default client and validate credentials
+    except Exception as e:
+        click.echo(f"[ERROR] {e}")
+        sys.exit(1)
+
+    service = RobinService(model, default_threads=threads, workers=workers)
+    server = create_server(service, host=host, port=port)
+    click.echo(f"🔹 Robin service listening on http://{host}:{port} ({workers} workers, default model: {model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("\n\n[!] Shutting down service.")
+    finally:
+        service.jobs.shutdown()
+        server.server_close()
+
+
+@robin.command()
+@click.option(
+    "--model", "-m",
+    default="gpt-5-mini",
+    show_default=True,
+    type=click.Choice(MODEL_CHOICES),
+    help="Select LLM model to use",
+)
+@click.option("--query", "-q", required=True, type=str, help="Dark web search query to monitor")
+@click.option("--interval", "-i", default=60.0, show_default=True, type=float, help="Minutes between ticks")
+@click.option("--threads", "-t", default=5, show_default=True, type=int, help="Number of threads (Default: 5)")
+@click.option("--state", "state_path", type=str, help="State file (default: watch_state/<query>.json)")
+@click.option("--output-dir", "-o", type=str, help="Directory for delta reports (default: watch_output/<query>)")
+@click.option("--once", is_flag=True, help="Run a single tick and exit (e.g. from cron)")
+def watch(model, query, interval, threads, state_path, output_dir, once):
+    """Re-run a query on a schedule, scraping and summarizing only what changed."""
+    from watch import run_watch
+
+    slug = _slugify(query)
+    state_path = state_path or os.path.join("watch_state", f"{slug}.json")
+    output_dir = output_dir or os.path.join("watch_output", slug)
+    try:
+        llm = get_llm(model)
+        click.echo(f"🔹 Watching '{query}' every {interval:g} min (state: {state_path})")
+        run_watch(
+            llm,
+            query,
+            state_path,
+            output_dir,
+            interval=interval * 60,
+            threads=threads,
+            once=once,
+            progress=click.echo,
+        )
+    except KeyboardInterrupt:
+        click.echo("\n\n[!] Watch stopped by user. State is saved after every tick.")
+        sys.exit(0)
+    except Exception as e:
+        click.echo(f"\n[ERROR] An unexpected error occurred: {e}")
+        sys.exit(1)
+
+
+def _fmt_ts(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+
+
+@robin.command(name="local-search")
+@click.option("--query", "-q", required=True, type=str, help="Terms to look up in previously collected pages")
+@click.option("--limit", "-n", default=20, show_default=True, type=int, help="Maximum number of hits")
+@click.option("--index", "index_path", type=str, help="Index database (default: LOCAL_INDEX_PATH or robin_index.db)")
+@click.option("--json", "as_json", is_flag=True, help="Print hits as JSON lines")
+def local_search(query, limit, index_path, as_json):
+    """Search pages and titles collected by earlier runs, without touching Tor."""
+    if index_path and not os.path.exists(index_path):
+        click.echo(f"[ERROR] No index at {index_path}")
+        sys.exit(1)
+    index = LocalIndex(index_path) if index_path else get_local_index()
+    if index is None:
+        click.echo("[ERROR] Local index is disabled (LOCAL_INDEX_PATH is empty).")
+        sys.exit(1)
+    started = time.perf_counter()
+    hits = index.search(query, limit=limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        if as_json:
+            click.echo(json.dumps(hit, ensure_ascii=False))
+            continue
+        click.echo(f"🔹 {hit['title'] or '(untitled)'}\n   {hit['url']}  (last seen {_fmt_ts(hit['last_seen'])}, query: {hit['query']})")
+        if hit["snippet"]:
+            click.echo(f"   {hit['snippet']}")
+    if not as_json:
+        stats = index.stats()
+        click.echo(f"\n[OUTPUT] {len(hits)} hits in {elapsed_ms:.1f} ms from {stats['documents']} indexed documents")
+
+
+@robin.command()
+@click.argument("value")
+@click.option("--limit", "-n", default=20, show_default=True, type=int, help="Maximum sightings / co-occurring artifacts shown")
+@click.option("--index", "index_path", type=str, help="Index database (default: LOCAL_INDEX_PATH or robin_index.db)")
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON")
+def pivot(value, limit, index_path, as_json):
+    """Look up an artifact (wallet, email, onion, ...) across all past runs."""
+    if index_path and not os.path.exists(index_path):
+        click.echo(f"[ERROR] No index at {index_path}")
+        sys.exit(1)
+    index = ArtifactIndex(index_path) if index_path else get_artifact_index()
+    if index is None:
+        click.echo("[ERROR] Local index is disabled (LOCAL_INDEX_PATH is empty).")
+        sys.exit(1)
+    started = time.perf_counter()
+    matches = index.lookup(value, limit=limit)
+    related = index.cooccurring(value, limit=limit) if matches else []
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if as_json:
+        click.echo(json.dumps({"matches": matches, "cooccurring": related}, ensure_ascii=False, indent=2))
+        return
+    if not matches:
+        click.echo(f"[OUTPUT] '{value}' has not been seen in any indexed run.")
+        return
+    for match in matches:
+        click.echo(
+            f"🔹 {match['kind']}: {match['value']}\n"
+            f"   first seen {_fmt_ts(match['first_seen'])}, last seen {_fmt_ts(match['last_seen'])}, "
+            f"{match['runs']} runs, {match['queries']} distinct queries"
+        )
+        for sighting in match["sightings"]:
+            click.echo(f"   - {sighting['url']}  ({_fmt_ts(sighting['seen_at'])}, query: {sighting['query']})")
+    if related:
+        click.echo("\n🔹 Seen on the same pages:")
+        for item in related:
+            click.echo(f"   - {item['kind']}: {item['value']} ({item['shared_pages']} pages)")
+    click.echo(f"\n[OUTPUT] Pivot answered in {elapsed_ms:.1f} ms")
+
+
+@robin.command()
+@click.option("--timeout", default=180.0, show_default=True, type=float, help="Seconds to wait for Tor to finish bootstrapping")
+@click.option("--hot-hosts", default=20, show_default=True, type=int, help="Also prewarm this many recently seen hosts from the local index (0 disables)")
+@click.option("--no-prewarm", is_flag=True, help="Only wait for the bootstrap, don't open circuits to onions")
+def warmup(timeout, hot_hosts, no_prewarm):
+    """Wait for Tor to bootstrap, then open circuits to search engines and recent hosts."""
+    import tor_ready
+
+    started = time.perf_counter()
+    if not tor_ready.wait_for_bootstrap(timeout=timeout, progress=click.echo):
+        click.echo(f"[ERROR] Tor did not finish bootstrapping within {timeout:g}s.")
+        sys.exit(1)
+    click.echo(f"🔹 Tor bootstrapped in {time.perf_counter() - started:.1f}s")
+    if no_prewarm:
+        return
+
+    engines = tor_ready.engine_hosts()
+    hosts = engines + [h for h in tor_ready.hot_hosts(limit=hot_hosts) if h not in engines]
+    click.echo(f"🔹 Prewarming {len(engines)} search engines and {len(hosts) - len(engines)} recent hosts...")
+    results = tor_ready.prewarm(hosts)
+    reachable = [seconds for ok, seconds in results.values() if ok]
+    slowest = f", slowest {max(reachable):.1f}s" if reachable else ""
+    click.echo(f"[OUTPUT] Prewarmed {len(reachable)}/{len(hosts)} hosts in {time.perf_counter() - started:.1f}s{slowest}")
 
 
 @robin.command()
@@ -0,0 +1,230 @@
+"""
+Lightweight, thread-safe run instrumentation.
+
+Counters and timings are recorded into a process-wide registry by search.py,
+scrape.py and the LLM callbacks, and can be exported as a JSON run report or in
+the Prometheus text exposition format.
+"""
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+
+_MAX_SAMPLES = 1024
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _labels_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def quantile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class _Timing:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        # Reservoir sampling keeps quantile estimates bounded in memory
+        if len(self.samples) < _MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < _MAX_SAMPLES:
+                self.samples[slot] = value
+
+
+class MetricsRegistry:
+    """Process-wide store of labelled counters and timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[tuple, float] = {}
+        self._timings: Dict[tuple, _Timing] = {}
+        self.started_at = time.time()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = _Timing()
+            timing.add(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels_key(labels)), 0.0)
+
+    def timing_stats(self, name: str, **labels) -> Optional[dict]:
+        with self._lock:
+            timing = self._timings.get((name, _labels_key(labels)))
+            return self._timing_dict(timing) if timing else None
+
+    def aggregate_timing(self, name: str) -> Optional[dict]:
+        """Combine a timing across all of its label sets (e.g. every fetched host)."""
+        merged = _Timing()
+        with self._lock:
+            for (n, _), timing in self._timings.items():
+                if n != name:
+                    continue
+                merged.count += timing.count
+                merged.total += timing.total
+                merged.max = max(merged.max, timing.max)
+                merged.samples.extend(timing.samples)
+        return self._timing_dict(merged) if merged.count else None
+
+    @staticmethod
+    def _timing_dict(timing: _Timing) -> dict:
+        stats = {
+            "count": timing.count,
+            "sum": timing.total,
+            "max": timing.max,
+            "mean": timing.total / timing.count if timing.count else None,
+        }
+        for q in _QUANTILES:
+            stats[f"p{int(q * 100)}"] = quantile(timing.samples, q)
+        return stats
+
+    def snapshot(self) -> dict:
+        """JSON-serializable view of every counter and timing."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            timings = [
+                {"name": name, "labels": dict(labels), **self._timing_dict(timing)}
+                for (name, labels), timing in sorted(self._timings.items())
+            ]
+        return {
+            "started_at": self.started_at,
+            "elapsed_s": time.time() - self.started_at,
+            "counters": counters,
+            "timings": timings,
+        }
+
+    def to_prometheus(self, prefix: str = "robin_") -> str:
+        """Render the registry in the Prometheus text exposition format."""
+
+        def _fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (
+                '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                for k, v in pairs
+            )
+            return "{" + ",".join(escaped) + "}"
+
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{prefix}{name}{_fmt_labels(labels)} {value:g}")
+            timing_names = sorted({name for name, _ in self._timings})
+            for name in timing_names:
+                lines.append(f"# TYPE {prefix}{name} summary")
+                for (n, labels), timing in sorted(self._timings.items()):
+                    if n != name:
+                        continue
+                    for q in _QUANTILES:
+                        value = quantile(timing.samples, q)
+                        lines.append(
+                            f"{prefix}{name}{_fmt_labels(labels, [('quantile', q)])} {value:g}"
+                        )
+                    lines.append(f"{prefix}{name}_sum{_fmt_labels(labels)} {timing.total:g}")
+                    lines.append(f"{prefix}{name}_count{_fmt_labels(labels)} {timing.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def categorize_error(exc: BaseException) -> str:
+    """Map an exception to a coarse, low-cardinality error category."""
+    name = type(exc).__name__.lower()
+    text = str(exc).lower()
+    if isinstance(exc, requests.exceptions.Timeout) or "timeout" in name or "timed out" in text:
+        return "timeout"
+    if isinstance(exc, requests.exceptions.ProxyError) or "socks" in name or "socks" in text:
+        return "proxy"
+    if isinstance(exc, requests.exceptions.SSLError):
+        return "tls"
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return "connection"
+    if isinstance(exc, requests.exceptions.TooManyRedirects):
+        return "redirects"
+    if isinstance(exc, requests.exceptions.RequestException):
+        return "request"
+    if isinstance(exc, (UnicodeError, ValueError, AttributeError, KeyError)):
+        return "parse"
+    return "other"
+
+
+def record_error(component: str, exc: BaseException, **labels) -> str:
+    category = categorize_error(exc)
+    registry.inc("errors_total", component=component, category=category, **labels)
+    return category
+
+
+def write_run_report(path: str, extra: Optional[dict] = None) -> Tuple[str, str]:
+    """
+    Write the JSON run report to `path` and the Prometheus text file next to it
+    (same name, .prom extension). Returns both paths.
+    """
+    base, ext = os.path.splitext(path)
+    if ext == ".prom":
+        path = base + ".json"
+    report = registry.snapshot()
+    if extra:
+        report.update(extra)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    prom_path = os.path.splitext(path)[0] + ".prom"
+    with open(prom_path, "w", encoding="utf-8") as f:
+        f.write(registry.to_prometheus())
+    return path, prom_path
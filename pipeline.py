@@ -0,0 +1,296 @@
+"""
+Reusable investigation pipeline (refine -> search -> filter -> scrape -> summarize)
+shared by the CLI, batch and other long-running entry points.
+"""
+from typing import Callable, List, Optional
+
+from adaptive import get_limiter
+from crawl import crawl
+from records import PageStore
+from scrape import scrape_multiple, truncate_content
+from search import get_search_results
+from llm import refine_query, filter_results, generate_summary
+from ioc import extract_page_artifacts, get_default_watchlist
+from metrics import registry
+
+
+class PipelineError(Exception):
+    """Raised when a stage produces nothing usable for the following stages."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+class PipelineCancelled(Exception):
+    """Raised between stages once the run's cancel event has been set."""
+
+
+def gather(
+    llm,
+    query: str,
+    threads: int = 5,
+    progress: Optional[Callable[[str], None]] = None,
+    callbacks: Optional[List] = None,
+    scrape_cache=None,
+    local_index=None,
+    local_first: bool = False,
+    artifact_index=None,
+    crawl_depth: int = 0,
+    crawl_pages: int = 60,
+    checkpoint=None,
+    on_event: Optional[Callable[[str, object], None]] = None,
+    cancel_event=None,
+    adaptive: bool = False,
+    min_threads: Optional[int] = None,
+    max_threads: Optional[int] = None,
+    exporter=None,
+) -> dict:
+    """
+    Run the refine, search, filter and scrape stages for a query.
+    Returns a dict with refined_query, search_results, filtered, scraped and the
+    artifacts extracted from the full text of the scraped pages.
+    Raises PipelineError if search or scrape yields nothing.
+    With a LocalIndex, this run is indexed afterwards; past pages are searched only
+    with local_first, so results don't depend on earlier runs unless asked to.
+    With an ArtifactIndex, artifacts found in the full page text are recorded.
+    With crawl_depth > 0, onion links on scraped pages are followed that many hops
+    (up to crawl_pages fetches in total) instead of scraping only the filtered results.
+    With a RunCheckpoint, each stage's output is saved as it completes and stages
+    already present in the checkpoint are loaded instead of re-run.
+    on_event(kind, data) receives results as they arrive: 'refined', 'engine'
+    (per search engine), 'search_results', 'filtered' and 'page' (per page).
+    Setting cancel_event abandons in-flight fetches and raises PipelineCancelled.
+    With adaptive, search and scrape concurrency start at threads and are tuned
+    by the process-wide adaptive limiters, within min_threads..max_threads.
+    With a RunExporter, search hits, selections, pages and artifacts produced by
+    this call are streamed to it (stages loaded from a checkpoint are not re-exported).
+    """
+    report = progress or (lambda msg: None)
+    emit = on_event or (lambda kind, data: None)
+
+    def check_cancel():
+        if cancel_event is not None and cancel_event.is_set():
+            raise PipelineCancelled("Run cancelled")
+
+    def stage(name, run):
+        # Load a checkpointed stage output, or run the stage and checkpoint it
+        if checkpoint is not None and checkpoint.has(name):
+            report(f"🔹 Resuming: {name} stage loaded from checkpoint")
+            return checkpoint.load(name)
+        output = run()
+        check_cancel()
+        if checkpoint is not None and output:
+            checkpoint.save(name, output)
+        return output
+
+    search_limiter = scrape_limiter = None
+    if adaptive:
+        search_limiter = get_limiter("search", threads, min_threads, max_threads)
+        scrape_limiter = get_limiter("scrape", threads, min_threads, max_threads)
+
+    def run_refine():
+        refined = refine_query(llm, query, callbacks=callbacks)
+        if exporter is not None:
+            exporter.run_info(refined_query=refined)
+        return refined
+
+    def on_results(engine, results):
+        emit("engine", {"engine": engine, "results": len(results)})
+        if exporter is not None:
+            exporter.search_hits(engine, results)
+
+    def run_filter():
+        selected = filter_results(llm, refined_query, search_results, callbacks=callbacks)
+        if exporter is not None:
+            exporter.selections(selected)
+        return selected
+
+    refined_query = stage("refine", run_refine)
+    report(f"🔹 Refined Query: {refined_query}")
+    emit("refined", refined_query)
+
+    search_results = stage("search", lambda: get_search_results(
+        refined_query,
+        max_workers=threads,
+        local_index=local_index if local_first else None,
+        local_first=local_first,
+        on_results=on_results,
+        cancel=cancel_event,
+        limiter=search_limiter,
+    ))
+    emit("search_results", len(search_results))
+    if not search_results:
+        raise PipelineError(
+            "search",
+            "No search results found. Tor may be unstable or query returned 0 hits.",
+        )
+
+    report(f"🔹 Found {len(search_results)} raw results. Filtering...")
+    filtered = stage("filter", run_filter)
+    emit("filtered", [dict(r) for r in filtered])
+
+    # Full page text for artifacts, the indexes and checkpoint, kept compressed (and spilled past a budget)
+    full_pages = PageStore()
+    fresh_pages = set()
+    try:
+        def on_page(url, text):
+            full_pages[url] = text
+            if checkpoint is not None:
+                checkpoint.add_page(url, text)
+            if exporter is not None:
+                exporter.page(url, text)
+                fresh_pages.add(url)
+            emit("page", {"url": url, "chars": len(text)})
+
+        # A page that comes back as just its search result title failed to scrape
+        titles = {r["link"]: r.get("title") for r in filtered}
+        scrape_done = checkpoint is not None and checkpoint.has("scrape")
+
+        def load_checkpointed_pages():
+            # Pages scraped successfully before; title-only ones failed and are fetched again
+            checkpoint.pages(store=full_pages)
+            for url in list(full_pages):
+                if full_pages[url] == titles.get(url):
+                    del full_pages[url]
+            return set(full_pages)
+
+        if crawl_depth > 0 and not scrape_done:
+            # An interrupted crawl continues from the pages it fetched and the links they had
+            crawled = {}
+            if checkpoint is not None:
+                links = checkpoint.links()
+                crawled = {url: links.get(url, (0, [])) for url in load_checkpointed_pages()}
+                if crawled:
+                    report(f"🔹 Resuming: {len(crawled)} pages already crawled")
+            report(f"🔹 Crawling from {len(filtered)} relevant sites (depth {crawl_depth}, up to {crawl_pages} pages)...")
+            scraped = crawl(
+                filtered,
+                refined_query,
+                max_workers=threads,
+                max_depth=crawl_depth,
+                max_pages=max(crawl_pages, len(filtered)),
+                on_page=on_page,
+                cancel=cancel_event,
+                limiter=scrape_limiter,
+                done=crawled,
+                on_links=checkpoint.add_links if checkpoint is not None else None,
+                cache=scrape_cache,
+            )
+            scraped.update({url: truncate_content(full_pages[url], url=url) for url in crawled})
+        else:
+            # Pages scraped successfully before an interruption (or by a finished crawl) are not fetched again
+            done = set()
+            if checkpoint is not None:
+                done = load_checkpointed_pages()
+                if scrape_done:
+                    report("🔹 Resuming: scrape stage loaded from checkpoint")
+                elif done:
+                    report(f"🔹 Resuming: {len(done)} of {len(filtered)} pages already scraped")
+            remaining = [r for r in filtered if r["link"] not in done]
+            scraped = {}
+            if remaining:
+                report(f"🔹 Scraping {len(remaining)} relevant sites...")
+                scraped = scrape_multiple(
+                    remaining,
+                    max_workers=threads,
+                    cache=scrape_cache,
+                    on_page=on_page,
+                    cancel=cancel_event,
+                    limiter=scrape_limiter,
+                )
+            scraped.update({url: truncate_content(full_pages[url], url=url) for url in done})
+        if cancel_event is not None and cancel_event.is_set():
+            raise PipelineCancelled("Run cancelled")
+        emit("scraped", len(scraped))
+        if adaptive:
+            report(f"🔹 Adaptive concurrency now: search {search_limiter.limit}, scrape {scrape_limiter.limit}")
+        # Only a scrape that produced real content is final; otherwise resuming scrapes again
+        if checkpoint is not None and not scrape_done:
+            pages_ok = sum(1 for url, text in full_pages.items() if text != titles.get(url))
+            if pages_ok:
+                checkpoint.save("scrape", {"pages": pages_ok})
+        if local_index is not None:
+            local_index.add_run(query, search_results, full_pages)
+        # Artifacts come from the full page text, not the per-page budget the summary prompt sees
+        with registry.timer("stage_seconds", stage="extract"):
+            extracted = extract_page_artifacts(full_pages, watchlist=get_default_watchlist())
+        if full_pages:
+            if artifact_index is not None:
+                artifact_index.add_run(query, extracted, run_key=checkpoint.run_id if checkpoint else None)
+            if exporter is not None:
+                exporter.artifacts(extracted, urls=fresh_pages)
+        if not scraped:
+            raise PipelineError("scrape", "Failed to scrape any content. Check Tor connection.")
+
+        return {
+            "query": query,
+            "refined_query": refined_query,
+            "search_results": search_results,
+            "filtered": filtered,
+            "scraped": scraped,
+            "artifacts": extracted,
+        }
+    finally:
+        full_pages.close()
+
+
+def run_investigation(
+    llm,
+    query: str,
+    threads: int = 5,
+    progress: Optional[Callable[[str], None]] = None,
+    callbacks: Optional[List] = None,
+    summary_callbacks: Optional[List] = None,
+    scrape_cache=None,
+    local_index=None,
+    local_first: bool = False,
+    artifact_index=None,
+    crawl_depth: int = 0,
+    crawl_pages: int = 60,
+    checkpoint=None,
+    on_event: Optional[Callable[[str, object], None]] = None,
+    cancel_event=None,
+    adaptive: bool = False,
+    min_threads: Optional[int] = None,
+    max_threads: Optional[int] = None,
+    exporter=None,
+) -> dict:
+    """
+    Run the full pipeline for a query and return the gather() result plus 'summary'.
+    on_event, cancel_event, exporter and the adaptive options are passed to gather();
+    cancelling the summary stream is up to summary_callbacks.
+    """
+    result = gather(
+        llm,
+        query,
+        threads=threads,
+        progress=progress,
+        callbacks=callbacks,
+        scrape_cache=scrape_cache,
+        local_index=local_index,
+        local_first=local_first,
+        artifact_index=artifact_index,
+        crawl_depth=crawl_depth,
+        crawl_pages=crawl_pages,
+        checkpoint=checkpoint,
+        on_event=on_event,
+        cancel_event=cancel_event,
+        adaptive=adaptive,
+        min_threads=min_threads,
+        max_threads=max_threads,
+        exporter=exporter,
+    )
+    if checkpoint is not None and checkpoint.has("summary"):
+        result["summary"] = checkpoint.load("summary")["summary"]
+        return result
+    result["summary"] = generate_summary(
+        llm,
+        query,
+        result["scraped"],
+        callbacks=summary_callbacks if summary_callbacks is not None else callbacks,
+        artifacts=result["artifacts"],
+    )
+    if checkpoint is not None:
+        checkpoint.save("summary", {"summary": result["summary"]})
+    return result
@@ -0,0 +1,226 @@
+"""
+Record and replay of pipeline I/O for deterministic offline runs.
+
+While recording, every HTTP response fetched through the Tor sessions (search
+engine pages and scraped pages) and every LLM completion is appended to a
+gzip-compressed JSONL archive (DIR/archive.jsonl.gz). While replaying, the same
+sessions are served from that archive in memory and the LLM is replaced by a
+model that returns the recorded completions, so the full pipeline runs with no
+network access.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from langchain_core.callbacks.base import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+ARCHIVE_NAME = "archive.jsonl.gz"
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Location")
+
+
+def _messages_digest(messages) -> str:
+    payload = json.dumps(
+        [(getattr(m, "type", ""), m.content if isinstance(m.content, str) else json.dumps(m.content, sort_keys=True))
+         for m in messages],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _system_digest(messages) -> str:
+    system = [m for m in messages if getattr(m, "type", "") == "system"]
+    return _messages_digest(system[:1])
+
+
+class RunArchive:
+    """Append-only archive of recorded records, loaded fully into memory for replay."""
+
+    def __init__(self, directory: str, mode: str):
+        self.directory = directory
+        self.mode = mode
+        self.path = os.path.join(directory, ARCHIVE_NAME)
+        self._lock = threading.Lock()
+        self._records = {}
+        self._llm_by_system = defaultdict(deque)
+        self._file = None
+        if mode == "record":
+            os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(self.path, "at", encoding="utf-8", compresslevel=6)
+        else:
+            if not os.path.isfile(self.path):
+                raise FileNotFoundError(f"No recording found at {self.path}")
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._records[(record["kind"], record["key"])] = record["value"]
+                    if record["kind"] == "llm":
+                        self._llm_by_system[record["value"].get("system")].append(record["value"])
+
+    def put(self, kind: str, key: str, value: dict) -> None:
+        line = json.dumps({"kind": kind, "key": key, "value": value}, ensure_ascii=False)
+        with self._lock:
+            self._records[(kind, key)] = value
+            if self._file:
+                self._file.write(line + "\n")
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        return self._records.get((kind, key))
+
+    def next_llm_for_system(self, system_digest: str) -> Optional[dict]:
+        with self._lock:
+            queue = self._llm_by_system.get(system_digest)
+            return queue.popleft() if queue else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+_archive: Optional[RunArchive] = None
+
+
+def activate(mode: str, directory: str, meta: Optional[dict] = None) -> RunArchive:
+    """Start recording to or replaying from `directory` ('record' or 'replay')."""
+    global _archive
+    deactivate()
+    _archive = RunArchive(directory, mode)
+    if mode == "record":
+        _archive.put("meta", str(time.time()), meta or {})
+    return _archive
+
+
+def deactivate() -> None:
+    global _archive
+    if _archive:
+        _archive.close()
+    _archive = None
+
+
+def active_mode() -> Optional[str]:
+    return _archive.mode if _archive else None
+
+
+def _http_key(request) -> str:
+    return f"{request.method} {request.url}"
+
+
+class _RecordingAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        archive = _archive
+        if archive and archive.mode == "record":
+            archive.put("http", _http_key(request), {
+                "status": response.status_code,
+                "reason": response.reason,
+                "url": response.url,
+                "headers": {h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers},
+                "encoding": response.encoding,
+                # latin-1 round-trips arbitrary bytes through JSON losslessly
+                "body": response.content.decode("latin-1"),
+            })
+        return response
+
+
+class _ReplayAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        record = _archive.get("http", _http_key(request)) if _archive else None
+        if record is None:
+            raise requests.exceptions.ConnectionError(f"Not in recording: {request.url}")
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.reason = record.get("reason")
+        response.url = record.get("url") or request.url
+        response.headers = CaseInsensitiveDict(record.get("headers") or {})
+        response.encoding = record.get("encoding")
+        response._content = record["body"].encode("latin-1")
+        response.request = request
+        return response
+
+
+def make_adapter(**kwargs) -> HTTPAdapter:
+    """
+    HTTP adapter for Tor sessions: records, replays or (default) just fetches.
+    Accepts the same keyword arguments as requests' HTTPAdapter.
+    """
+    mode = active_mode()
+    if mode == "record":
+        return _RecordingAdapter(**kwargs)
+    if mode == "replay":
+        return _ReplayAdapter()
+    return HTTPAdapter(**kwargs)
+
+
+class _LLMRecorder(BaseCallbackHandler):
+    def __init__(self, archive: RunArchive):
+        self.archive = archive
+        self._prompts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs) -> None:
+        batch = messages[0] if messages else []
+        self._prompts[run_id] = (_messages_digest(batch), _system_digest(batch))
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs) -> None:
+        prompt = self._prompts.pop(run_id, None)
+        if not prompt:
+            return
+        try:
+            text = response.generations[0][0].text
+        except (AttributeError, IndexError):
+            return
+        self.archive.put("llm", prompt[0], {"system": prompt[1], "text": text})
+
+
+def llm_callbacks() -> list:
+    """Extra per-invocation callbacks needed while recording (empty otherwise)."""
+    if _archive and _archive.mode == "record":
+        return [_LLMRecorder(_archive)]
+    return []
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model that answers from the active recording. Exact prompt matches are
+    preferred; otherwise the next recorded answer for the same system prompt is
+    used (e.g. when search results arrive in a different order).
+    """
+
+    streaming: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _lookup(self, messages) -> str:
+        if _archive is None:
+            raise RuntimeError("ReplayChatModel used without an active replay archive")
+        record = _archive.get("llm", _messages_digest(messages))
+        if record is None:
+            record = _archive.next_llm_for_system(_system_digest(messages))
+        if record is None:
+            raise RuntimeError("No recorded LLM response matches this prompt")
+        return record["text"]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._lookup(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        text = self._lookup(messages)
+        for line in text.splitlines(keepends=True):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=line))
+            if run_manager:
+                run_manager.on_llm_new_token(line, chunk=chunk)
+            yield chunk
@@ -0,0 +1,176 @@
+"""
+Compact in-memory representations for large runs (crawl, batch, service).
+
+SearchResult replaces the per-result {"title", "link"} dict: it has fixed slots,
+shares one interned "scheme://host" prefix per onion service, and still reads
+like the dict it replaces (r["link"], r.get("title"), dict(r)).
+
+PageStore holds page text zlib-compressed and, past a memory budget, appends it
+to a spill file that is read back through mmap, so full-text page sets stay
+small no matter how many pages a run collects.
+"""
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import zlib
+from collections.abc import Mapping, MutableMapping
+from typing import Iterable, Iterator, List, Optional
+
+
+class SearchResult(Mapping):
+    """One search hit. Mapping keys are "title" and "link", like the old dicts."""
+
+    __slots__ = ("_prefix", "_path", "title")
+    _KEYS = ("title", "link")
+
+    def __init__(self, link: str, title: str = ""):
+        scheme_end = link.find("://")
+        path_start = link.find("/", scheme_end + 3 if scheme_end >= 0 else 0)
+        if path_start < 0:
+            path_start = len(link)
+        self._prefix = sys.intern(link[:path_start])
+        self._path = link[path_start:]
+        self.title = title
+
+    @property
+    def link(self) -> str:
+        return self._prefix + self._path
+
+    @property
+    def host(self) -> str:
+        return self._prefix.split("://", 1)[-1].split(":", 1)[0].lower()
+
+    def dedup_key(self) -> tuple:
+        # Same service and path, ignoring a trailing slash
+        return (self._prefix, self._path.rstrip("/"))
+
+    def __getitem__(self, key: str) -> str:
+        if key == "link":
+            return self.link
+        if key == "title":
+            return self.title
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return f"SearchResult(link={self.link!r}, title={self.title!r})"
+
+    def __getstate__(self):
+        return (self.link, self.title)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def to_dict(self) -> dict:
+        return {"title": self.title, "link": self.link}
+
+
+def dedupe_results(results: Iterable[Mapping]) -> List[SearchResult]:
+    """
+    First occurrence of every distinct link (trailing slash ignored), as
+    SearchResults. Plain {"title", "link"} dicts are converted on the way.
+    """
+    seen = set()
+    unique = []
+    for res in results:
+        if not isinstance(res, SearchResult):
+            res = SearchResult(res.get("link") or "", res.get("title") or "")
+        key = res.dedup_key()
+        if key not in seen:
+            seen.add(key)
+            unique.append(res)
+    return unique
+
+
+class PageStore(MutableMapping):
+    """
+    url -> page text mapping that keeps text compressed. Once the compressed
+    in-memory total exceeds max_memory_bytes, further pages are appended to a
+    spill file and served via mmap. Thread-safe; call close() to drop the spill file.
+    """
+
+    def __init__(self, max_memory_bytes: int = 64 * 1024 * 1024, spill_dir: Optional[str] = None, level: int = 6):
+        self.max_memory_bytes = max_memory_bytes
+        self.level = level
+        self._spill_dir = spill_dir
+        self._index = {}  # url -> bytes (in memory) or (offset, length) in the spill file
+        self._memory_bytes = 0
+        self._spill_file = None
+        self._spill_path = None
+        self._spill_size = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+
+    def _spill(self, blob: bytes) -> tuple:
+        if self._spill_file is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix="robin_pages_", suffix=".bin", dir=self._spill_dir)
+            self._spill_file = os.fdopen(fd, "w+b")
+        offset = self._spill_size
+        self._spill_file.seek(offset)
+        self._spill_file.write(blob)
+        self._spill_size += len(blob)
+        return offset, len(blob)
+
+    def _read_spilled(self, offset: int, length: int) -> bytes:
+        if self._mmap is None or len(self._mmap) < offset + length:
+            self._spill_file.flush()
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._spill_file.fileno(), self._spill_size, access=mmap.ACCESS_READ)
+        return self._mmap[offset:offset + length]
+
+    def __setitem__(self, url: str, text: str) -> None:
+        blob = zlib.compress(text.encode("utf-8"), self.level)
+        with self._lock:
+            old = self._index.pop(url, None)
+            if isinstance(old, bytes):
+                self._memory_bytes -= len(old)
+            if self._memory_bytes + len(blob) <= self.max_memory_bytes:
+                self._index[url] = blob
+                self._memory_bytes += len(blob)
+            else:
+                self._index[url] = self._spill(blob)
+
+    def __getitem__(self, url: str) -> str:
+        with self._lock:
+            entry = self._index[url]
+            blob = entry if isinstance(entry, bytes) else self._read_spilled(*entry)
+        return zlib.decompress(blob).decode("utf-8")
+
+    def __delitem__(self, url: str) -> None:
+        with self._lock:
+            entry = self._index.pop(url)
+            if isinstance(entry, bytes):
+                self._memory_bytes -= len(entry)
+
+    def __contains__(self, url) -> bool:
+        # Membership must not decompress the page (Mapping's default would)
+        return url in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def stats(self) -> dict:
+        return {"pages": len(self._index), "memory_bytes": self._memory_bytes, "spilled_bytes": self._spill_size}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+                os.remove(self._spill_path)
+            self._index.clear()
+            self._memory_bytes = self._spill_size = 0
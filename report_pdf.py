@@ -1,21 +1,270 @@
 """
-Generate a simple PDF report with an 'EY NOX REPORT' heading and
-the investigation summary as body text. Logo support is intentionally
-disabled to keep dependencies and layout minimal.
+Generate a PDF report with an 'EY NOX REPORT' heading and the investigation
+summary as the body. Logo support is intentionally disabled to keep
+dependencies and layout minimal.
+
+The summary markdown is converted to ReportLab flowables in a single pass:
+headings, paragraphs, nested bullet/numbered lists, pipe tables, fenced code,
+block quotes, rules and inline **bold**, *italic*, `code` and [links](url).
+Rendered PDFs are cached by summary hash and built on a small worker pool, so
+callers such as the UI can start a render and pick up the bytes when ready.
 """
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import BytesIO
+from typing import List, Optional
 
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import (
+    HRFlowable,
+    ListFlowable,
+    ListItem,
+    Paragraph,
+    Preformatted,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
 
+from metrics import registry
 
-def build_report_pdf(summary_markdown: str, logo_path=None) -> bytes:
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+_TABLE_SEP = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_QUOTE = re.compile(r"^\s*>\s?(.*)$")
+
+# Code spans and links are taken out before emphasis so their contents stay literal
+_INLINE_TOKEN = re.compile(r"(`+)(.+?)\1|\[([^\]]+)\]\(([^)\s]+)\)")
+_BOLD = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__")
+_ITALIC = re.compile(r"(?<![\*\w])\*(?=\S)(.+?)(?<=\S)\*(?!\*)|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)")
+
+_HEADING_STYLES = {1: "Heading1", 2: "Heading2", 3: "Heading3", 4: "Heading4", 5: "Heading5", 6: "Heading6"}
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _emphasis(text: str) -> str:
+    text = _BOLD.sub(lambda m: f"<b>{m.group(1) or m.group(2)}</b>", _escape(text))
+    return _ITALIC.sub(lambda m: f"<i>{m.group(1) or m.group(2)}</i>", text)
+
+
+def inline_markup(text: str) -> str:
+    """Markdown inline syntax -> ReportLab paragraph markup (text is escaped)."""
+    parts = []
+    last = 0
+    for match in _INLINE_TOKEN.finditer(text):
+        parts.append(_emphasis(text[last:match.start()]))
+        if match.group(1):
+            parts.append(f'<font face="Courier">{_escape(match.group(2))}</font>')
+        else:
+            href = _escape(match.group(4)).replace('"', "%22")
+            parts.append(f'<link href="{href}" color="blue">{_emphasis(match.group(3))}</link>')
+        last = match.end()
+    parts.append(_emphasis(text[last:]))
+    return "".join(parts)
+
+
+def _paragraph(text: str, style) -> Paragraph:
     """
-    Build a PDF report with 'EY NOX REPORT' heading and summary content.
-    Returns the PDF as raw bytes.
+    Paragraph from markdown text (lines joined with line breaks). Emphasis that
+    overlaps ("**a *b** c*") yields mismatched tags ReportLab can't parse; such
+    text is set plain instead of failing the whole report.
     """
+    lines = text.split("\n")
+    try:
+        return Paragraph("<br/>".join(inline_markup(line) for line in lines), style)
+    except ValueError:
+        registry.inc("report_markup_fallbacks_total")
+        return Paragraph("<br/>".join(_escape(line) for line in lines), style)
+
+
+def _split_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+def report_styles() -> dict:
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(name="ReportTitle", parent=styles["Heading1"], fontSize=18, spaceAfter=12),
+        "body": ParagraphStyle(name="ReportBody", parent=styles["Normal"], fontSize=10, leading=14, spaceAfter=6),
+        "cell": ParagraphStyle(name="ReportCell", parent=styles["Normal"], fontSize=8.5, leading=11),
+        "head_cell": ParagraphStyle(name="ReportHeadCell", parent=styles["Normal"], fontSize=8.5, leading=11,
+                                    fontName="Helvetica-Bold"),
+        "quote": ParagraphStyle(name="ReportQuote", parent=styles["Normal"], fontSize=10, leading=14,
+                                leftIndent=18, textColor=colors.HexColor("#555555"), spaceAfter=6),
+        "code": ParagraphStyle(name="ReportCode", parent=styles["Code"], fontSize=8, leading=10, spaceAfter=6),
+        "headings": {level: styles[name] for level, name in _HEADING_STYLES.items()},
+    }
+
+
+def _list_flowable(items: list, styles: dict):
+    # items: [(indent, ordered, start, text, children)] of one nesting level
+    ordered = items[0][1]
+    entries = []
+    for _, _, _, text, children in items:
+        content = [_paragraph(text, styles["body"])]
+        if children:
+            content.append(_list_flowable(children, styles))
+        entries.append(ListItem(content))
+    kwargs = {"bulletType": "1", "start": items[0][2]} if ordered else {"bulletType": "bullet", "start": "•"}
+    return ListFlowable(entries, leftIndent=14, bulletFontSize=9, **kwargs)
+
+
+def _nest(flat: list) -> list:
+    """[(indent, ordered, start, text)] -> top-level items with nested children lists."""
+    root: list = []
+    stack = [(-1, root)]
+    for indent, ordered, start, text in flat:
+        while len(stack) > 1 and indent <= stack[-1][0]:
+            stack.pop()
+        item = (indent, ordered, start, text, [])
+        stack[-1][1].append(item)
+        stack.append((indent, item[4]))
+    return root
+
+
+def markdown_to_flowables(markdown: str, styles: Optional[dict] = None, width: float = A4[0] - 2 * inch) -> list:
+    """Convert summary markdown into a list of flowables in one pass over its lines."""
+    styles = styles or report_styles()
+    story = []
+    lines = markdown.replace("\r\n", "\n").split("\n")
+    paragraph: List[str] = []
+    list_items: list = []
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            story.append(_paragraph("\n".join(paragraph), styles["body"]))
+            paragraph.clear()
+
+    def flush_list():
+        if list_items:
+            nested = _nest(list_items)
+            # A switch between bullets and numbers at the top level starts a new list
+            run = [nested[0]]
+            for item in nested[1:]:
+                if item[1] != run[0][1]:
+                    story.append(_list_flowable(run, styles))
+                    run = []
+                run.append(item)
+            story.append(_list_flowable(run, styles))
+            story.append(Spacer(1, 4))
+            list_items.clear()
+
+    def flush():
+        flush_paragraph()
+        flush_list()
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if not stripped:
+            flush_paragraph()
+            i += 1
+            continue
+
+        if _FENCE.match(line):
+            flush()
+            fence = _FENCE.match(line).group(1)
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence):
+                code.append(lines[i])
+                i += 1
+            story.append(Preformatted("\n".join(code), styles["code"], maxLineLength=95))
+            i += 1
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            story.append(_paragraph(heading.group(2), styles["headings"][level]))
+            i += 1
+            continue
+
+        if "|" in stripped and i + 1 < len(lines) and _TABLE_SEP.match(lines[i + 1]):
+            flush()
+            header = _split_row(stripped)
+            rows = []
+            i += 2
+            while i < len(lines) and "|" in lines[i] and lines[i].strip():
+                rows.append(_split_row(lines[i]))
+                i += 1
+            columns = len(header)
+            data = [[_paragraph(cell, styles["head_cell"]) for cell in header]]
+            for row in rows:
+                row = (row + [""] * columns)[:columns]
+                data.append([_paragraph(cell, styles["cell"]) for cell in row])
+            table = Table(data, colWidths=[width / columns] * columns, repeatRows=1)
+            table.setStyle(TableStyle([
+                ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#999999")),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#EEEEEE")),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                ("LEFTPADDING", (0, 0), (-1, -1), 4),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+            ]))
+            story.append(table)
+            story.append(Spacer(1, 8))
+            continue
+
+        if _RULE.match(stripped):
+            flush()
+            story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor("#999999"),
+                                    spaceBefore=4, spaceAfter=4))
+            i += 1
+            continue
+
+        item = _LIST_ITEM.match(line)
+        if item:
+            flush_paragraph()
+            marker = item.group(2)
+            ordered = marker[0].isdigit()
+            list_items.append((len(item.group(1).expandtabs(4)), ordered, int(marker[:-1]) if ordered else 1, item.group(3)))
+            i += 1
+            continue
+
+        if list_items and not paragraph and line[:1].isspace():
+            # Indented continuation of the previous list item
+            indent, ordered, start, text = list_items[-1]
+            list_items[-1] = (indent, ordered, start, f"{text} {stripped}")
+            i += 1
+            continue
+
+        quote = _QUOTE.match(line)
+        if quote:
+            flush()
+            story.append(_paragraph(quote.group(1), styles["quote"]))
+            i += 1
+            continue
+
+        flush_list()
+        paragraph.append(stripped)
+        i += 1
+
+    flush()
+    return story
+
+
+def _render_pdf(summary_markdown: str) -> bytes:
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -25,51 +274,48 @@ def build_report_pdf(summary_markdown: str, logo_path=None) -> bytes:
         topMargin=inch,
         bottomMargin=inch,
     )
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        name="ReportTitle",
-        parent=styles["Heading1"],
-        fontSize=18,
-        spaceAfter=12,
-    )
-    body_style = ParagraphStyle(
-        name="ReportBody",
-        parent=styles["Normal"],
-        fontSize=10,
-        leading=14,
-    )
-
-    story = []
+    styles = report_styles()
     # Header without logo
-    story.append(Paragraph("EY NOX REPORT", title_style))
+    story = [Paragraph("EY NOX REPORT", styles["title"]), Spacer(1, 0.25 * inch)]
+    with registry.timer("stage_seconds", stage="report"):
+        story += markdown_to_flowables(summary_markdown, styles, width=doc.width)
+        doc.build(story)
+    return buffer.getvalue()
 
-    story.append(Spacer(1, 0.25 * inch))
 
-    # Body: summary text (markdown as plain paragraphs)
-    for block in summary_markdown.split("\n\n"):
-        block = block.strip()
-        if not block:
-            continue
-        # Simple handling: treat lines starting with ### or ## or # as headings
-        lines = block.split("\n")
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("### "):
-                story.append(Paragraph(line[4:], styles["Heading3"]))
-            elif line.startswith("## "):
-                story.append(Paragraph(line[3:], styles["Heading2"]))
-            elif line.startswith("# "):
-                story.append(Paragraph(line[2:], styles["Heading1"]))
-            elif line.startswith("|") and "---" not in line:
-                # Table row – render as plain text for simplicity
-                story.append(Paragraph(line.replace("|", " &bull; "), body_style))
-            else:
-                # Escape XML for ReportLab
-                escaped = line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                story.append(Paragraph(escaped, body_style))
-        story.append(Spacer(1, 6))
-
-    doc.build(story)
-    return buffer.getvalue()
+_CACHE_SIZE = 16
+_cache: "OrderedDict[str, Future]" = OrderedDict()
+_cache_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="robin-pdf")
+
+
+def report_cache_key(summary_markdown: str) -> str:
+    return hashlib.sha256(summary_markdown.encode("utf-8")).hexdigest()
+
+
+def render_report_async(summary_markdown: str, logo_path=None) -> Future:
+    """
+    Start (or reuse) rendering of a summary on the PDF worker pool and return a
+    Future for the bytes. Renders are cached by summary hash, failed ones too,
+    so callers that poll (the UI) don't resubmit a render that can't succeed.
+    """
+    key = report_cache_key(summary_markdown)
+    with _cache_lock:
+        future = _cache.get(key)
+        if future is not None:
+            _cache.move_to_end(key)
+            registry.inc("report_cache_hits_total")
+            return future
+        future = _executor.submit(_render_pdf, summary_markdown)
+        _cache[key] = future
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return future
+
+
+def build_report_pdf(summary_markdown: str, logo_path=None) -> bytes:
+    """
+    Build a PDF report with 'EY NOX REPORT' heading and summary content.
+    Returns the PDF as raw bytes (from the render cache when already built).
+    """
+    return render_report_async(summary_markdown, logo_path).result()
@@ -1,10 +1,16 @@
+import time
 import random
 import requests
 import threading
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from config import TOR_SOCKS_PROXY
+from content import extract_text, fill_budget
+from adaptive import note_failure
+from governor import make_executor
+from metrics import registry, record_error
+from recording import make_adapter
 
 import warnings
 warnings.filterwarnings("ignore")
@@ -22,6 +28,10 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36 Edg/135.0.3179.54"
 ]
 
+# Per-page character budget passed on to the LLM (increased slightly for better context)
+MAX_CONTENT_CHARS = 2000
+
+
 def get_tor_session():
     """
     Creates a requests Session with Tor SOCKS proxy and automatic retries.
@@ -34,73 +44,209 @@ def get_tor_session():
         backoff_factor=0.3,
         status_forcelist=[500, 502, 503, 504]
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = make_adapter(max_retries=retry)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     
     session.proxies = {
-        "http": "socks5h://127.0.0.1:9050",
-        "https": "socks5h://127.0.0.1:9050"
+        "http": TOR_SOCKS_PROXY,
+        "https": TOR_SOCKS_PROXY
     }
     return session
 
-def scrape_single(url_data, rotate=False, rotate_interval=5, control_port=9051, control_password=None):
+def _get(url, headers):
     """
-    Scrapes a single URL using a robust Tor session.
-    Returns a tuple (url, scraped_text).
+    GET a URL through Tor for onion hosts (direct for clearweb).
+    Records per-host fetch latency, bytes and non-200 statuses.
     """
-    url = url_data['link']
-    use_tor = ".onion" in url
-    
-    headers = {
-        "User-Agent": random.choice(USER_AGENTS)
-    }
-    
+    host = urlparse(url).hostname or "unknown"
+    start = time.perf_counter()
     try:
-        if use_tor:
+        if ".onion" in url:
             session = get_tor_session()
             # Increased timeout for Tor latency
             response = session.get(url, headers=headers, timeout=45)
         else:
             # Fallback for clearweb if needed, though tool focuses on dark web
-            response = requests.get(url, headers=headers, timeout=30)
-
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, "html.parser")
-            # Clean up text: remove scripts/styles
-            for script in soup(["script", "style"]):
-                script.extract()
-            text = soup.get_text(separator=' ')
-            # Normalize whitespace
-            text = ' '.join(text.split())
-            scraped_text = f"{url_data['title']} - {text}"
-        else:
-            scraped_text = url_data['title']
+            session = requests.Session()
+            session.mount("http://", make_adapter())
+            session.mount("https://", make_adapter())
+            response = session.get(url, headers=headers, timeout=30)
+    except Exception:
+        # Timeouts and circuit/connection errors count against adaptive concurrency
+        note_failure()
+        raise
+    finally:
+        registry.observe("fetch_seconds", time.perf_counter() - start, host=host)
+    registry.inc("fetch_bytes_total", len(response.content), host=host)
+    if response.status_code not in (200, 304):
+        registry.inc("errors_total", component="scrape", category=f"http_{response.status_code}")
+        if response.status_code >= 500:
+            note_failure()
+    return response
+
+
+def html_to_text(html, url=None):
+    """
+    Extract visible text from HTML, one text block per line (scripts/styles dropped,
+    whitespace normalized). Passing the page URL lets its host's template be learned.
+    """
+    return extract_text(html, url)
+
+
+def fetch_html(url):
+    """
+    GET a page with a random user agent (through Tor for onions).
+    Returns its HTML, or None if the request failed or the status wasn't 200.
+    """
+    try:
+        response = _get(url, {"User-Agent": random.choice(USER_AGENTS)})
     except Exception as e:
+        record_error("scrape", e)
+        return None
+    return response.text if response.status_code == 200 else None
+
+
+def scrape_single(url_data, rotate=False, rotate_interval=5, control_port=9051, control_password=None):
+    """
+    Scrapes a single URL using a robust Tor session.
+    Returns a tuple (url, scraped_text).
+    """
+    url = url_data['link']
+    html = fetch_html(url)
+    if html is None:
         # Return title only on failure, so we don't lose the reference
-        scraped_text = url_data['title']
-    
-    return url, scraped_text
+        return url, url_data['title']
+    return url, f"{url_data['title']}\n{html_to_text(html, url)}"
+
+
+def scrape_conditional(url_data, etag=None, last_modified=None):
+    """
+    Scrape a URL with a conditional GET (If-None-Match / If-Modified-Since).
+    Returns a dict with url, status ('ok', 'not_modified' or 'failed'), text,
+    etag and last_modified. text is None unless the page was (re)fetched.
+    """
+    url = url_data['link']
+    headers = {"User-Agent": random.choice(USER_AGENTS)}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    page = {"url": url, "status": "failed", "text": None, "etag": etag, "last_modified": last_modified}
+    try:
+        response = _get(url, headers)
+    except Exception as e:
+        record_error("scrape", e)
+        return page
+
+    if response.status_code == 304:
+        page["status"] = "not_modified"
+    elif response.status_code == 200:
+        page.update(
+            status="ok",
+            text=f"{url_data['title']}\n{html_to_text(response.text, url)}",
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return page
+
 
-def scrape_multiple(urls_data, max_workers=5):
+class ScrapeCache:
+    """
+    Thread-safe in-process cache of scraped pages, shared across runs (e.g. batch).
+    Concurrent requests for the same URL are coalesced so each URL is fetched once.
+    Pages are stored without their title line, and each caller gets its own
+    search result title back; failed (title-only) fetches are not kept.
+    Optional ttl (seconds) and max_entries bound staleness and memory for long-lived
+    processes; the oldest entries are evicted first.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fetch(self, url_data, scrape_fn=None):
+        """
+        scrape_fn(url_data) (scrape_single by default) through the cache. It returns
+        (url, text, ...) with text being the title, then the page's text blocks.
+        """
+        scrape_fn = scrape_fn or scrape_single
+        key = (scrape_fn, url_data['link'].rstrip('/'))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                entry = None
+            owner = entry is None
+            if owner:
+                entry = (Future(), now)
+                self._entries.pop(key, None)
+                self._entries[key] = entry
+                while self.max_entries and len(self._entries) > self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+        future = entry[0]
+        if owner:
+            try:
+                url, text, *rest = scrape_fn(url_data)
+                title = url_data['title']
+                # Keep the caller's title out of the shared value; None marks a failed fetch
+                body = None if text == title else text[len(title) + 1:] if text.startswith(title + "\n") else text
+                future.set_result((url, body, rest))
+            except BaseException as e:
+                future.set_exception(e)
+            if future.exception() is not None or future.result()[1] is None:
+                # Don't cache failures; let a later caller retry
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        self._entries.pop(key, None)
+        url, body, rest = future.result()
+        title = url_data['title']
+        return (url, title if body is None else f"{title}\n{body}", *rest)
+
+
+def truncate_content(content, max_chars=MAX_CONTENT_CHARS, url=None):
+    """
+    Fit page text to the per-page budget used for the summary prompt, keeping the
+    title and the highest-value text blocks (see content.fill_budget) rather than
+    the first max_chars characters.
+    """
+    return fill_budget(content, max_chars, url)
+
+
+def scrape_multiple(urls_data, max_workers=5, cache=None, on_page=None, cancel=None, limiter=None):
     """
     Scrapes multiple URLs concurrently using a thread pool.
+    If a ScrapeCache is given, URLs already fetched (or in flight) are reused.
+    on_page(url, content), if given, receives each page's full text before it is
+    fitted to the per-page budget.
+    Setting the cancel event drops queued URLs and abandons in-flight fetches;
+    the pages scraped so far are returned.
+    With an AdaptiveLimiter, concurrency follows it instead of max_workers.
     """
     results = {}
-    max_chars = 2000  # Increased limit slightly for better context
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {
-            executor.submit(scrape_single, url_data): url_data
-            for url_data in urls_data
-        }
-        for future in as_completed(future_to_url):
-            try:
-                url, content = future.result()
-                if len(content) > max_chars:
-                    content = content[:max_chars] + "...(truncated)"
-                results[url] = content
-            except Exception:
-                continue
-                
+    fetch = cache.fetch if cache is not None else scrape_single
+
+    with registry.timer("stage_seconds", stage="scrape"):
+        executor = make_executor(max_workers, limiter=limiter)
+        pending = {executor.submit(fetch, url_data) for url_data in urls_data}
+        try:
+            while pending and not (cancel is not None and cancel.is_set()):
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        url, content = future.result()
+                        if on_page is not None:
+                            on_page(url, content)
+                        results[url] = truncate_content(content, url=url)
+                    except Exception as e:
+                        record_error("scrape", e)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     return results
@@ -2,10 +2,17 @@ import requests
 import random, re
 import json
 import os
+import time
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from requests.adapters import HTTPAdapter
+from concurrent.futures import wait
 from urllib3.util.retry import Retry
+from config import TOR_SOCKS_PROXY
+from adaptive import note_failure
+from governor import make_executor
+from metrics import registry, record_error
+from recording import make_adapter
+from records import SearchResult, dedupe_results
 
 import warnings
 warnings.filterwarnings("ignore")
@@ -50,62 +57,100 @@ def get_tor_session():
         backoff_factor=0.5,
         status_forcelist=[500, 502, 503, 504]
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = make_adapter(max_retries=retry)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     session.proxies = {
-        "http": "socks5h://127.0.0.1:9050",
-        "https": "socks5h://127.0.0.1:9050"
+        "http": TOR_SOCKS_PROXY,
+        "https": TOR_SOCKS_PROXY
     }
     return session
 
+def _engine_label(endpoint):
+    return urlparse(endpoint).hostname or endpoint
+
 def fetch_search_results(endpoint, query):
     url = endpoint.format(query=query)
     headers = {"User-Agent": random.choice(USER_AGENTS)}
     session = get_tor_session()
+    engine = _engine_label(endpoint)
+    start = time.perf_counter()
     
     try:
         response = session.get(url, headers=headers, timeout=40)
+        registry.inc("search_bytes_total", len(response.content), engine=engine)
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, "html.parser")
             links = []
             # Generic parsing for standard search engine layouts
             for a in soup.find_all('a'):
-                try:
-                    href = a['href']
-                    title = a.get_text(strip=True)
-                    # Extract onion links
-                    link = re.findall(r'https?:\/\/[a-z0-9\.]+\.onion.*', href)
-                    if len(link) != 0:
-                        # Basic filtering to avoid self-referential links
-                        if "search" not in link[0] and len(title) > 3:
-                            links.append({"title": title, "link": link[0]})
-                except:
+                href = a.get('href')
+                if not href:
                     continue
+                title = a.get_text(strip=True)
+                # Extract onion links
+                link = re.findall(r'https?:\/\/[a-z0-9\.]+\.onion.*', href)
+                if len(link) != 0:
+                    # Basic filtering to avoid self-referential links
+                    if "search" not in link[0] and len(title) > 3:
+                        links.append(SearchResult(link[0], title))
+            registry.inc("search_results_total", len(links), engine=engine)
             return links
         else:
+            registry.inc("errors_total", component="search", category=f"http_{response.status_code}", engine=engine)
+            if response.status_code >= 500:
+                note_failure()
             return []
-    except:
+    except Exception as e:
+        record_error("search", e, engine=engine)
+        note_failure()
         return []
+    finally:
+        registry.observe("search_engine_seconds", time.perf_counter() - start, engine=engine)
 
-def get_search_results(refined_query, max_workers=5):
+def get_search_results(refined_query, max_workers=5, local_index=None, local_first=False, min_local_hits=10,
+                       on_results=None, cancel=None, limiter=None):
+    """
+    Fan the query out to every search engine over Tor and return deduplicated results.
+    With a LocalIndex, matches from previously collected pages are listed first;
+    with local_first, the Tor fan-out is skipped when at least min_local_hits match.
+    on_results(engine, results) is called as each engine answers. Setting the
+    cancel event stops waiting: queued engines are dropped and in-flight
+    requests are abandoned, returning what has arrived so far.
+    With an AdaptiveLimiter, engine concurrency follows it instead of max_workers.
+    """
     results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(fetch_search_results, endpoint, refined_query)
-                   for endpoint in DEFAULT_SEARCH_ENGINES]
-        for future in as_completed(futures):
-            result_urls = future.result()
-            results.extend(result_urls)
+    if local_index is not None:
+        with registry.timer("stage_seconds", stage="local_search"):
+            results.extend(local_index.search_results(refined_query))
+        registry.inc("local_search_hits_total", len(results))
+        if on_results is not None and results:
+            on_results("local", results)
+        if local_first and len(results) >= min_local_hits:
+            return results
+    with registry.timer("stage_seconds", stage="search"):
+        def _report(future, engine):
+            if not future.cancelled():
+                on_results(engine, future.result())
+
+        executor = make_executor(max_workers, limiter=limiter)
+        futures = []
+        for endpoint in DEFAULT_SEARCH_ENGINES:
+            future = executor.submit(fetch_search_results, endpoint, refined_query)
+            if on_results is not None:
+                future.add_done_callback(lambda f, engine=_engine_label(endpoint): _report(f, engine))
+            futures.append(future)
+        try:
+            pending = set(futures)
+            while pending and not (cancel is not None and cancel.is_set()):
+                _, pending = wait(pending, timeout=0.25)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        # Collect in engine order (not completion order) so the result list,
+        # and the filter prompt built from it, is stable across runs and replays
+        for future in futures:
+            if future.done() and not future.cancelled():
+                results.extend(future.result())
 
-    # Deduplicate results
-    seen_links = set()
-    unique_results = []
-    for res in results:
-        link = res.get("link")
-        # Remove trailing slashes for better deduplication
-        clean_link = link.rstrip('/')
-        if clean_link not in seen_links:
-            seen_links.add(clean_link)
-            unique_results.append(res)
-            
-    return unique_results
+    # Deduplicate results (trailing slashes ignored)
+    return dedupe_results(results)
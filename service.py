@@ -0,0 +1,174 @@
+"""
+Long-running service mode: a small local HTTP API over an in-process job queue.
+
+Endpoints (JSON unless noted):
+    GET    /health                  liveness plus queue depth
+    GET    /metrics                 Prometheus text metrics (text/plain)
+    POST   /jobs                    {"query": ..., "model"?: ..., "threads"?: ...} -> 202 job
+    GET    /jobs                    list known jobs
+    GET    /jobs/<id>               job status
+    GET    /jobs/<id>/events        server-sent events: status, progress, pipeline results and summary tokens
+    GET    /jobs/<id>/summary       final summary (text/markdown; 409 until done)
+    DELETE /jobs/<id>               cancel a queued or running job
+"""
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import governor
+from jobs import Job, JobManager, DONE
+from artifact_index import get_artifact_index
+from local_index import get_local_index
+from llm import get_llm
+from metrics import registry
+from pipeline import run_investigation
+from scrape import ScrapeCache
+
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)(/events|/summary)?/?$")
+
+
+class RobinService:
+    """
+    Holds the warm state shared by all jobs: the job manager and its workers,
+    a scrape cache, and (through get_llm) the pooled LLM clients.
+    """
+
+    def __init__(self, default_model: str, default_threads: int = 5, workers: int = 2,
+                 scrape_ttl: float = 900, scrape_max_entries: int = 5000):
+        self.default_model = default_model
+        self.default_threads = default_threads
+        self.scrape_cache = ScrapeCache(ttl=scrape_ttl, max_entries=scrape_max_entries)
+        self.jobs = JobManager(self._run_job, workers=workers)
+
+    def _run_job(self, job: Job, token_handler) -> dict:
+        llm = get_llm(job.model)
+        with governor.session(job.id):
+            return run_investigation(
+                llm,
+                job.query,
+                threads=job.threads,
+                progress=job.log,
+                callbacks=[],
+                summary_callbacks=[token_handler],
+                scrape_cache=self.scrape_cache,
+                local_index=get_local_index(),
+                artifact_index=get_artifact_index(),
+                on_event=job.emit,
+                cancel_event=job.cancel_event,
+            )
+
+    def submit(self, payload: dict) -> Job:
+        query = str(payload.get("query") or "").strip()
+        if not query:
+            raise ValueError("'query' is required")
+        model = str(payload.get("model") or self.default_model)
+        threads = int(payload.get("threads") or self.default_threads)
+        # Fail fast on unknown models / missing keys instead of inside the worker
+        get_llm(model)
+        return self.jobs.submit(query, model, max(1, threads))
+
+
+def _make_handler(service: RobinService):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "RobinService/1.0"
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # keep the console quiet
+            pass
+
+        def _send(self, status: int, body, content_type: str = "application/json") -> None:
+            if content_type == "application/json":
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            else:
+                data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _job_or_404(self, job_id: str) -> Optional[Job]:
+            job = service.jobs.get(job_id)
+            if job is None:
+                self._send(404, {"error": f"unknown job '{job_id}'"})
+            return job
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path in ("/health", "/health/"):
+                return self._send(200, {"status": "ok", "queued": service.jobs.queue_depth()})
+            if path in ("/metrics", "/metrics/"):
+                return self._send(200, registry.to_prometheus(), content_type="text/plain; version=0.0.4")
+            if path in ("/jobs", "/jobs/"):
+                return self._send(200, {"jobs": [j.to_dict() for j in service.jobs.list()]})
+            match = _JOB_PATH.match(path)
+            if not match:
+                return self._send(404, {"error": "not found"})
+            job = self._job_or_404(match.group(1))
+            if job is None:
+                return
+            suffix = match.group(2)
+            if suffix == "/summary":
+                if job.status != DONE:
+                    return self._send(409, {"error": f"job is {job.status}", "job": job.to_dict()})
+                return self._send(200, job.summary or "", content_type="text/markdown")
+            if suffix == "/events":
+                return self._stream_events(job)
+            return self._send(200, job.to_dict())
+
+        def _stream_events(self, job: Job) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            seq = 0
+            try:
+                while True:
+                    events = job.events_since(seq, timeout=15)
+                    if not events:
+                        if job.finished:
+                            break
+                        self.wfile.write(b": keep-alive\n\n")
+                    for event_seq, kind, data in events:
+                        payload = json.dumps({"seq": event_seq, "data": data}, ensure_ascii=False)
+                        self.wfile.write(f"event: {kind}\ndata: {payload}\n\n".encode("utf-8"))
+                        seq = event_seq + 1
+                    self.wfile.flush()
+                    if job.finished and not job.events_since(seq):
+                        break
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_POST(self):
+            if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("request body must be a JSON object")
+                job = service.submit(payload)
+            except (ValueError, TypeError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(202, job.to_dict())
+
+        def do_DELETE(self):
+            match = _JOB_PATH.match(self.path.split("?", 1)[0])
+            if not match or match.group(2):
+                return self._send(404, {"error": "not found"})
+            job = service.jobs.cancel(match.group(1))
+            if job is None:
+                return self._send(404, {"error": f"unknown job '{match.group(1)}'"})
+            self._send(202, job.to_dict())
+
+    return Handler
+
+
+def create_server(service: RobinService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    return server
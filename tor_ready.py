@@ -0,0 +1,200 @@
+"""
+Tor startup readiness: wait for the bootstrap to finish, then prewarm onions.
+
+A listening SOCKS port does not mean Tor can build circuits yet, so readiness
+is read from the control port (GETINFO status/bootstrap-phase) until PROGRESS
+reaches 100. Prewarming then requests the root of every default search engine
+(plus hosts recently seen in the local index) concurrently, so Tor fetches
+their onion descriptors and opens rendezvous circuits before the first query
+needs them. `robin warmup` runs both; entrypoint.sh calls it before starting
+Robin.
+
+The control client speaks just enough of the control protocol for this
+(PROTOCOLINFO, AUTHENTICATE with cookie, password or no auth, GETINFO), so no
+extra dependency is needed.
+"""
+import re
+import socket
+import time
+from concurrent.futures import as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from config import TOR_CONTROL_PASSWORD, TOR_CONTROL_PORT, TOR_SOCKS_PROXY
+from governor import make_executor
+from local_index import get_local_index
+from metrics import registry, record_error
+from search import DEFAULT_SEARCH_ENGINES, USER_AGENTS
+
+
+class TorControlError(Exception):
+    pass
+
+
+class TorControl:
+    """Minimal synchronous client for Tor's control port."""
+
+    def __init__(self, host: Optional[str] = None, port: int = TOR_CONTROL_PORT, timeout: float = 5.0):
+        self.host = host or urlparse(TOR_SOCKS_PROXY).hostname or "127.0.0.1"
+        self.port = port
+        self._sock = socket.create_connection((self.host, port), timeout=timeout)
+        self._file = self._sock.makefile("rb")
+
+    def close(self) -> None:
+        try:
+            self._file.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def command(self, line: str) -> List[Tuple[str, str]]:
+        """
+        Send one command and return its reply as [(status, text)] lines, with
+        data blocks ("250+key=" ... ".") folded into their line. Raises
+        TorControlError on a non-2xx reply.
+        """
+        self._sock.sendall(line.encode("ascii") + b"\r\n")
+        reply = []
+        while True:
+            raw = self._file.readline()
+            if not raw:
+                raise TorControlError("control connection closed")
+            text = raw.decode("utf-8", "replace").rstrip("\r\n")
+            status, kind, rest = text[:3], text[3:4], text[4:]
+            if kind == "+":
+                data = []
+                while True:
+                    raw = self._file.readline()
+                    if not raw or raw.rstrip(b"\r\n") == b".":
+                        break
+                    data.append(raw.decode("utf-8", "replace").rstrip("\r\n"))
+                rest = rest + "\n".join(data)
+            reply.append((status, rest))
+            if kind == " ":
+                break
+        if not reply[-1][0].startswith("2"):
+            raise TorControlError(f"{line.split()[0]} failed: {reply[-1][0]} {reply[-1][1]}")
+        return reply
+
+    def authenticate(self, password: Optional[str] = TOR_CONTROL_PASSWORD) -> None:
+        """Authenticate with the cookie file, the password, or nothing, as Tor allows."""
+        info = " ".join(text for _, text in self.command("PROTOCOLINFO 1"))
+        methods = re.search(r"METHODS=(\S+)", info)
+        methods = set(methods.group(1).split(",")) if methods else set()
+        cookie_file = re.search(r'COOKIEFILE="((?:[^"\\]|\\.)*)"', info)
+        if password and "HASHEDPASSWORD" in methods:
+            escaped = password.replace("\\", "\\\\").replace('"', '\\"')
+            self.command(f'AUTHENTICATE "{escaped}"')
+        elif "COOKIE" in methods and cookie_file:
+            path = cookie_file.group(1).replace('\\"', '"').replace("\\\\", "\\")
+            with open(path, "rb") as f:
+                self.command(f"AUTHENTICATE {f.read().hex()}")
+        else:
+            self.command("AUTHENTICATE")
+
+    def getinfo(self, key: str) -> str:
+        for _, text in self.command(f"GETINFO {key}"):
+            if text.startswith(key + "="):
+                return text[len(key) + 1:]
+        raise TorControlError(f"GETINFO {key} returned no value")
+
+
+def parse_bootstrap_phase(value: str) -> dict:
+    """'NOTICE BOOTSTRAP PROGRESS=85 TAG=ap_conn SUMMARY="..."' -> {progress, tag, summary}."""
+    fields = dict(re.findall(r'(\w+)=("(?:[^"\\]|\\.)*"|\S+)', value))
+    return {
+        "progress": int(fields.get("PROGRESS", 0)),
+        "tag": fields.get("TAG", ""),
+        "summary": fields.get("SUMMARY", "").strip('"'),
+        "warning": fields.get("WARNING", "").strip('"') or None,
+    }
+
+
+def bootstrap_status(port: int = TOR_CONTROL_PORT) -> dict:
+    with TorControl(port=port) as control:
+        control.authenticate()
+        return parse_bootstrap_phase(control.getinfo("status/bootstrap-phase"))
+
+
+def wait_for_bootstrap(timeout: float = 120.0, port: int = TOR_CONTROL_PORT, interval: float = 1.0,
+                       progress: Optional[Callable[[str], None]] = None) -> bool:
+    """
+    Poll the control port until Tor reports 100% bootstrapped. Returns False on
+    timeout. Connection and authentication errors are retried until the
+    deadline, since the control port comes up slightly after Tor starts.
+    """
+    deadline = time.monotonic() + timeout
+    started = time.perf_counter()
+    last = None
+    while True:
+        try:
+            status = bootstrap_status(port)
+        except (OSError, TorControlError) as e:
+            status = {"progress": -1, "summary": f"control port not ready ({e})", "warning": None}
+        if status["progress"] >= 100:
+            registry.observe("tor_bootstrap_wait_seconds", time.perf_counter() - started)
+            return True
+        if progress and status["summary"] != last:
+            note = f" (warning: {status['warning']})" if status["warning"] else ""
+            shown = f"{status['progress']}% " if status["progress"] >= 0 else ""
+            progress(f"🔹 Tor bootstrap: {shown}{status['summary']}{note}")
+            last = status["summary"]
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def engine_hosts() -> List[str]:
+    return [urlparse(endpoint).hostname for endpoint in DEFAULT_SEARCH_ENGINES]
+
+
+def hot_hosts(limit: int = 20, max_age: float = 7 * 86400) -> List[str]:
+    """Onion hosts with the most recently seen documents in the local index."""
+    index = get_local_index()
+    if index is None or limit <= 0:
+        return []
+    return index.recent_hosts(limit=limit, since=time.time() - max_age)
+
+
+def _touch(host: str, timeout: float) -> Tuple[bool, float]:
+    # Any HTTP answer means the descriptor was fetched and a circuit is open
+    session = requests.Session()
+    session.proxies = {"http": TOR_SOCKS_PROXY, "https": TOR_SOCKS_PROXY}
+    start = time.perf_counter()
+    try:
+        response = session.get(f"http://{host}/", headers={"User-Agent": USER_AGENTS[0]},
+                               timeout=timeout, stream=True)
+        response.close()
+        return True, time.perf_counter() - start
+    except Exception as e:
+        record_error("prewarm", e)
+        return False, time.perf_counter() - start
+    finally:
+        session.close()
+
+
+def prewarm(hosts: Iterable[str], max_workers: int = 16, timeout: float = 45.0) -> Dict[str, Tuple[bool, float]]:
+    """Open circuits to all hosts at once; returns {host: (reachable, seconds)}."""
+    hosts = list(dict.fromkeys(h for h in hosts if h))
+    results = {}
+    if not hosts:
+        return results
+    with registry.timer("stage_seconds", stage="prewarm"):
+        executor = make_executor(min(max_workers, len(hosts)))
+        try:
+            futures = {executor.submit(_touch, host, timeout): host for host in hosts}
+            for future in as_completed(futures):
+                ok, elapsed = future.result()
+                results[futures[future]] = (ok, elapsed)
+                registry.observe("prewarm_seconds", elapsed, ok=str(ok).lower())
+        finally:
+            executor.shutdown(wait=True)
+    return results
@@ -2,11 +2,16 @@ import base64
 import os
 import streamlit as st
 from datetime import datetime
-from scrape import scrape_multiple
-from search import get_search_results
-from llm_utils import BufferedStreamingHandler, get_model_choices
-from llm import get_llm, refine_query, filter_results, generate_summary
-from report_pdf import build_report_pdf
+from artifact_index import get_artifact_index
+import governor
+from jobs import CANCELLED, DONE, FAILED, JobManager
+from llm_utils import get_model_choices
+from llm import get_llm
+from local_index import get_local_index
+from pipeline import run_investigation
+from report_pdf import render_report_async
+from scrape import ScrapeCache
+from search import DEFAULT_SEARCH_ENGINES
 
 
 def _render_pipeline_error(stage: str, err: Exception) -> None:
@@ -37,15 +42,176 @@ def _render_pipeline_error(stage: str, err: Exception) -> None:
     st.stop()
 
 
-# Cache expensive backend calls
-@st.cache_data(ttl=200, show_spinner=False)
-def cached_search_results(refined_query: str, threads: int):
-    return get_search_results(refined_query.replace(" ", "+"), max_workers=threads)
+# Investigations run as background jobs on worker threads shared by all sessions,
+# so a rerun of this script never blocks on Tor or the LLM. Tor fetches of every
+# job go through the governor's shared pool (scheduled fairly across jobs, capped
+# at ROBIN_MAX_TOR_STREAMS) and LLM calls are capped per provider.
+@st.cache_resource(show_spinner=False)
+def get_scrape_cache() -> ScrapeCache:
+    return ScrapeCache(ttl=200, max_entries=5000)
 
 
-@st.cache_data(ttl=200, show_spinner=False)
-def cached_scrape_multiple(filtered: list, threads: int):
-    return scrape_multiple(filtered, max_workers=threads)
+@st.cache_resource(show_spinner=False)
+def get_shared_governor() -> governor.Governor:
+    return governor.get_governor()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_llm(model_choice: str):
+    return get_llm(model_choice)
+
+
+def _run_ui_job(job, token_handler) -> dict:
+    with governor.session(job.id):
+        return run_investigation(
+            get_shared_llm(job.model),
+            job.query,
+            threads=job.threads,
+            progress=job.log,
+            callbacks=[],
+            summary_callbacks=[token_handler],
+            scrape_cache=get_scrape_cache(),
+            local_index=get_local_index(),
+            artifact_index=get_artifact_index(),
+            on_event=job.emit,
+            cancel_event=job.cancel_event,
+            **job.options,
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager() -> JobManager:
+    return JobManager(_run_ui_job, workers=8)
+
+
+def _reset_job_state(job_id=None) -> None:
+    st.session_state.job_id = job_id
+    st.session_state.event_seq = 0
+    st.session_state.progress = ""
+    st.session_state.refined = None
+    st.session_state.engines = {}
+    st.session_state.results = None
+    st.session_state.filtered = None
+    st.session_state.pages = 0
+    st.session_state.streamed_summary = ""
+
+
+def _fold_events(job) -> None:
+    # Apply only the events that arrived since the last poll
+    state = st.session_state
+    for seq, kind, data in job.events_since(state.event_seq):
+        state.event_seq = seq + 1
+        if kind == "progress":
+            state.progress = data
+        elif kind == "refined":
+            state.refined = data
+        elif kind == "engine":
+            state.engines[data["engine"]] = data["results"]
+        elif kind == "search_results":
+            state.results = data
+        elif kind == "filtered":
+            state.filtered = data
+        elif kind == "page":
+            state.pages += 1
+        elif kind == "token":
+            state.streamed_summary += data
+
+
+def _card(slot, title: str, body) -> None:
+    slot.container(border=True).markdown(
+        f"<div class='colHeight'><p class='pTitle'>{title}</p><p>{body}</p></div>",
+        unsafe_allow_html=True,
+    )
+
+
+def _render_downloads(summary: str) -> None:
+    now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    fname_md = f"summary_{now}.md"
+    fname_pdf = f"EY_NOX_report_{now}.pdf"
+    b64 = base64.b64encode(summary.encode()).decode()
+    href = f'<div class="aStyle">📥 <a href="data:file/markdown;base64,{b64}" download="{fname_md}">Download .md</a></div>'
+    st.markdown(href, unsafe_allow_html=True)
+    # The PDF renders on a worker (cached by summary hash); the view polls until it is ready
+    pdf = render_report_async(summary, logo_path=_logo_path)
+    if not pdf.done():
+        st.caption("⏳ Preparing PDF...")
+        return
+    if pdf.exception() is not None:
+        st.caption(f"⚠️ PDF report unavailable ({pdf.exception()})")
+        return
+    st.download_button(
+        label="Download PDF",
+        data=pdf.result(),
+        file_name=fname_pdf,
+        mime="application/pdf",
+        key="download_pdf_report",
+    )
+
+
+def _is_active(job) -> bool:
+    """Whether the view still has to poll: the job is running or its PDF is rendering."""
+    if job is None:
+        return False
+    if not job.finished:
+        return True
+    return job.status == DONE and bool(job.summary) and not render_report_async(job.summary).done()
+
+
+def job_view(polling: bool) -> None:
+    """
+    Render the session's job from its event log. While the job runs this is a
+    fragment polled every run_every seconds; once it finishes (and its PDF is
+    rendered), the whole app is rerun so the final view renders without polling.
+    """
+    manager = get_job_manager()
+    job = manager.get(st.session_state.get("job_id") or "")
+    if job is None:
+        return
+    _fold_events(job)
+    state = st.session_state
+
+    status_slot = st.empty()
+    p1, p2, p3 = [col.empty() for col in st.columns(3)]
+
+    if state.refined is not None:
+        _card(p1, "Refined Query", state.refined)
+    if state.results is not None:
+        _card(p2, "Search Results", state.results)
+    elif state.engines:
+        answered = sum(state.engines.values())
+        _card(p2, "Search Results", f"{answered}<br><small>{len(state.engines)}/{len(DEFAULT_SEARCH_ENGINES)} engines</small>")
+    if state.filtered is not None:
+        scraped = f"<br><small>{state.pages}/{len(state.filtered)} pages scraped</small>" if not job.finished else ""
+        _card(p3, "Filtered Results", f"{len(state.filtered)}{scraped}")
+
+    summary = job.summary if job.status == DONE else state.streamed_summary
+    if summary:
+        hdr_col, btn_col = st.columns([4, 1], vertical_alignment="center")
+        with hdr_col:
+            st.subheader(":red[Investigation Summary]", anchor=None, divider="gray")
+        st.markdown(summary)
+        if job.status == DONE:
+            with btn_col:
+                _render_downloads(summary)
+
+    if not job.finished:
+        with status_slot.container():
+            info_col, cancel_col = st.columns([5, 1], vertical_alignment="center")
+            info_col.info(f"⏳ {state.progress or 'Queued...'}")
+            if job.cancel_event.is_set():
+                cancel_col.caption("Cancelling...")
+            elif cancel_col.button("Cancel", key="cancel_job"):
+                manager.cancel(job.id)
+        return
+    if polling and not _is_active(job):
+        st.rerun()
+    if job.status == DONE:
+        status_slot.success("✔️ Pipeline completed successfully!")
+    elif job.status == CANCELLED:
+        status_slot.warning("⏹️ Investigation cancelled.")
+    elif job.status == FAILED:
+        with status_slot.container():
+            _render_pipeline_error("complete the investigation", RuntimeError(job.error or "unknown error"))
 
 
 # Streamlit page configuration
@@ -110,7 +276,27 @@ model = st.sidebar.selectbox(
 )
 if any(name not in {"gpt4o", "gpt-4.1", "claude-3-5-sonnet-latest", "llama3.1", "gemini-2.5-flash"} for name in model_options):
     st.sidebar.caption("Locally detected Ollama models are automatically added to this list.")
-threads = st.sidebar.slider("Scraping Threads", 1, 16, 4, key="thread_slider")
+adaptive = st.sidebar.toggle(
+    "Adaptive Threads", value=True, key="adaptive_toggle",
+    help="Tune search/scrape concurrency to current Tor throughput and error rates.",
+)
+threads = st.sidebar.slider(
+    "Starting Threads" if adaptive else "Scraping Threads", 1, 16, 4, key="thread_slider",
+    help=(
+        "Where adaptive concurrency starts until a limit has been learned; later runs continue from it."
+        if adaptive else "Per-run limit; all sessions share one capped pool of Tor streams."
+    ),
+)
+if adaptive:
+    min_threads, max_threads = st.sidebar.slider(
+        "Thread Bounds", 1, 32, (1, 16), key="thread_bounds",
+        help="Bounds for this run only; the learned limit is shared by all sessions.",
+    )
+    run_options = {"adaptive": True, "min_threads": min_threads, "max_threads": max_threads}
+else:
+    run_options = {}
+_pool = get_shared_governor().pool
+st.sidebar.caption(f"Shared Tor pool: {_pool.workers} streams, {sum(_pool.queued().values())} fetches queued.")
 
 
 # Main UI - logo and input
@@ -129,108 +315,18 @@ with st.form("search_form", clear_on_submit=True):
     )
     run_button = col_button.form_submit_button("Run")
 
-# Display a status message
-status_slot = st.empty()
-# Pre-allocate three placeholders-one per card
-cols = st.columns(3)
-p1, p2, p3 = [col.empty() for col in cols]
-# Summary placeholders
-summary_container_placeholder = st.empty()
-
-
-# Process the query
+# Start a new investigation; a job this session already has running is cancelled
 if run_button and query:
-    # clear old state
-    for k in ["refined", "results", "filtered", "scraped", "streamed_summary"]:
-        st.session_state.pop(k, None)
-
-    # Stage 1 - Load LLM
-    with status_slot.container():
-        with st.spinner("🔄 Loading LLM..."):
-            try:
-                llm = get_llm(model)
-            except Exception as e:
-                _render_pipeline_error("load the selected LLM", e)
-
-    # Stage 2 - Refine query
-    with status_slot.container():
-        with st.spinner("🔄 Refining query..."):
-            try:
-                st.session_state.refined = refine_query(llm, query)
-            except Exception as e:
-                _render_pipeline_error("refine the query", e)
-    p1.container(border=True).markdown(
-        f"<div class='colHeight'><p class='pTitle'>Refined Query</p><p>{st.session_state.refined}</p></div>",
-        unsafe_allow_html=True,
-    )
-
-    # Stage 3 - Search dark web
-    with status_slot.container():
-        with st.spinner("🔍 Searching dark web..."):
-            st.session_state.results = cached_search_results(
-                st.session_state.refined, threads
-            )
-    p2.container(border=True).markdown(
-        f"<div class='colHeight'><p class='pTitle'>Search Results</p><p>{len(st.session_state.results)}</p></div>",
-        unsafe_allow_html=True,
-    )
-
-    # Stage 4 - Filter results
-    with status_slot.container():
-        with st.spinner("🗂️ Filtering results..."):
-            st.session_state.filtered = filter_results(
-                llm, st.session_state.refined, st.session_state.results
-            )
-    p3.container(border=True).markdown(
-        f"<div class='colHeight'><p class='pTitle'>Filtered Results</p><p>{len(st.session_state.filtered)}</p></div>",
-        unsafe_allow_html=True,
-    )
-
-    # Stage 5 - Scrape content
-    with status_slot.container():
-        with st.spinner("📜 Scraping content..."):
-            st.session_state.scraped = cached_scrape_multiple(
-                st.session_state.filtered, threads
-            )
-
-    # Stage 6 - Summarize
-    # 6a) Prepare session state for streaming text
-    st.session_state.streamed_summary = ""
-
-    # 6c) UI callback for each chunk
-    def ui_emit(chunk: str):
-        st.session_state.streamed_summary += chunk
-        summary_slot.markdown(st.session_state.streamed_summary)
-
-    with summary_container_placeholder.container():  # border=True, height=450):
-        hdr_col, btn_col = st.columns([4, 1], vertical_alignment="center")
-        with hdr_col:
-            st.subheader(":red[Investigation Summary]", anchor=None, divider="gray")
-        summary_slot = st.empty()
-
-    # 6d) Inject your two callbacks and invoke exactly as before
-    with status_slot.container():
-        with st.spinner("✍️ Generating summary..."):
-            stream_handler = BufferedStreamingHandler(ui_callback=ui_emit)
-            llm.callbacks = [stream_handler]
-            _ = generate_summary(llm, query, st.session_state.scraped)
-
-    with btn_col:
-        now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        fname_md = f"summary_{now}.md"
-        fname_pdf = f"EY_NOX_report_{now}.pdf"
-        b64 = base64.b64encode(st.session_state.streamed_summary.encode()).decode()
-        href = f'<div class="aStyle">📥 <a href="data:file/markdown;base64,{b64}" download="{fname_md}">Download .md</a></div>'
-        st.markdown(href, unsafe_allow_html=True)
+    with st.spinner("🔄 Loading LLM..."):
         try:
-            pdf_bytes = build_report_pdf(st.session_state.streamed_summary, logo_path=_logo_path)
-            st.download_button(
-                label="Download PDF",
-                data=pdf_bytes,
-                file_name=fname_pdf,
-                mime="application/pdf",
-                key="download_pdf_report",
-            )
-        except Exception:
-            pass  # If reportlab fails (e.g. missing), only MD download is shown
-    status_slot.success("✔️ Pipeline completed successfully!")
+            get_shared_llm(model)  # fail fast on unknown models / missing keys
+        except Exception as e:
+            _render_pipeline_error("load the selected LLM", e)
+    manager = get_job_manager()
+    if st.session_state.get("job_id"):
+        manager.cancel(st.session_state.job_id)
+    _reset_job_state(manager.submit(query, model, threads, **run_options).id)
+
+current_job = get_job_manager().get(st.session_state.get("job_id") or "")
+active = _is_active(current_job)
+st.fragment(job_view, run_every=0.75 if active else None)(polling=active)
@@ -0,0 +1,173 @@
+"""
+Incremental watch mode: re-run a monitoring query on a schedule, scraping only
+pages that are new or have changed since the last tick and summarizing only
+that delta.
+
+State (per query) is a small JSON file holding the refined query, every link
+seen in search results, and for each selected page its content hash plus the
+ETag/Last-Modified validators used for conditional requests.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from ioc import extract_page_artifacts, get_default_watchlist
+from llm import refine_query, filter_results, generate_summary
+from scrape import scrape_conditional, truncate_content
+from search import get_search_results
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+
+
+def _clean_link(link: str) -> str:
+    return link.rstrip("/")
+
+
+def load_state(path: str, query: str) -> dict:
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("query") == query:
+            return state
+    return {"query": query, "refined_query": None, "last_run": None, "seen_links": [], "pages": {}}
+
+
+def save_state(path: str, state: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def watch_tick(
+    llm,
+    state: dict,
+    threads: int = 5,
+    progress: Optional[Callable[[str], None]] = None,
+    callbacks=None,
+) -> dict:
+    """
+    Run one incremental cycle and update `state` in place.
+
+    Returns {"new": [...urls], "changed": [...urls], "unchanged": int,
+    "failed": int, "delta": {url: text}, "summary": str or None}.
+    """
+    report = progress or (lambda msg: None)
+    query = state["query"]
+
+    # Reuse the stored refinement so successive result sets stay comparable
+    if not state.get("refined_query"):
+        state["refined_query"] = refine_query(llm, query, callbacks=callbacks)
+    refined = state["refined_query"]
+    report(f"🔹 Refined Query: {refined}")
+
+    results = get_search_results(refined, max_workers=threads)
+    seen = set(state.get("seen_links") or [])
+    pages = state.setdefault("pages", {})
+    fresh = [r for r in results if _clean_link(r["link"]) not in seen]
+    known = [r for r in results if _clean_link(r["link"]) in pages]
+    report(f"🔹 {len(results)} results: {len(fresh)} new links, {len(known)} tracked pages")
+
+    # Only never-seen links go through the (token-costly) relevance filter
+    selected = filter_results(llm, refined, fresh, callbacks=callbacks) if fresh else []
+
+    def _fetch(url_data):
+        previous = pages.get(_clean_link(url_data["link"])) or {}
+        return url_data, scrape_conditional(
+            url_data, etag=previous.get("etag"), last_modified=previous.get("last_modified")
+        )
+
+    report(f"🔹 Checking {len(selected)} new and {len(known)} tracked pages...")
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        fetched = list(executor.map(_fetch, selected + known))
+
+    now = datetime.now().isoformat(timespec="seconds")
+    outcome = {"new": [], "changed": [], "unchanged": 0, "failed": 0, "delta": {}, "summary": None}
+    failed = set()
+    delta_text = {}  # full text of new and changed pages, for artifact extraction
+    for url_data, page in fetched:
+        key = _clean_link(url_data["link"])
+        previous = pages.get(key)
+        if page["status"] == "not_modified":
+            outcome["unchanged"] += 1
+            continue
+        if page["status"] != "ok":
+            outcome["failed"] += 1
+            failed.add(key)
+            continue
+        digest = _content_hash(page["text"])
+        pages[key] = {
+            "title": url_data.get("title"),
+            "hash": digest,
+            "etag": page["etag"],
+            "last_modified": page["last_modified"],
+            "checked_at": now,
+            "changed_at": now if not previous or previous.get("hash") != digest else previous.get("changed_at"),
+        }
+        if previous and previous.get("hash") == digest:
+            outcome["unchanged"] += 1
+            continue
+        outcome["changed" if previous else "new"].append(page["url"])
+        outcome["delta"][page["url"]] = truncate_content(page["text"], url=page["url"])
+        delta_text[page["url"]] = page["text"]
+
+    # New selections that failed to fetch stay unseen, so the next tick filters and fetches them again
+    state["seen_links"] = sorted(seen | ({_clean_link(r["link"]) for r in results} - failed))
+    previous_run = state.get("last_run")
+    state["last_run"] = now
+
+    if outcome["delta"]:
+        report(
+            f"🔹 Summarizing delta: {len(outcome['new'])} new, {len(outcome['changed'])} changed pages..."
+        )
+        since = f" (new or changed since {previous_run})" if previous_run else ""
+        artifacts = extract_page_artifacts(delta_text, watchlist=get_default_watchlist())
+        outcome["summary"] = generate_summary(
+            llm, f"{query}{since}", outcome["delta"], callbacks=callbacks, artifacts=artifacts
+        )
+    return outcome
+
+
+def run_watch(
+    llm,
+    query: str,
+    state_path: str,
+    output_dir: str,
+    interval: float = 3600,
+    threads: int = 5,
+    once: bool = False,
+    progress: Optional[Callable[[str], None]] = None,
+    callbacks=None,
+) -> None:
+    """
+    Run watch ticks forever (or once), writing a delta report whenever something changed.
+    """
+    report = progress or print
+    while True:
+        started = time.monotonic()
+        state = load_state(state_path, query)
+        outcome = watch_tick(llm, state, threads=threads, progress=report, callbacks=callbacks)
+        save_state(state_path, state)
+
+        if outcome["summary"]:
+            os.makedirs(output_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            filename = os.path.join(output_dir, f"watch_{stamp}.md")
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(outcome["summary"])
+            report(f"[OUTPUT] Delta report saved to {filename}")
+        else:
+            report(
+                f"🔹 No changes ({outcome['unchanged']} unchanged, {outcome['failed']} unreachable)."
+            )
+
+        if once:
+            return
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))